@@ -0,0 +1,216 @@
+"""
+Compression Middleware
+Negotiates zstd, brotli or gzip from Accept-Encoding and compresses JSON,
+NDJSON, CSV and other text responses above a minimum size. Streaming
+responses are compressed chunk by chunk as they go out, never buffered
+whole. zstd and brotli are offered only when the zstandard / brotli
+packages are installed; gzip always is. Per-route bytes in and out and the
+CPU time spent compressing are kept for /api/admin/compression.
+"""
+
+from collections import Counter
+from typing import Callable, Dict, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from api.route_templates import route_template
+import os
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MINIMUM_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))  # 1-9
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))  # 0-11
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))  # 1-22
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/xml", "application/javascript", "text/")
+
+# A compressor is a (compress(chunk) -> bytes, finish() -> bytes) pair
+Compressor = Tuple[Callable[[bytes], bytes], Callable[[], bytes]]
+
+def gzip_compressor() -> Compressor:
+    obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return obj.compress, obj.flush
+
+def brotli_compressor() -> Compressor:
+    obj = brotli.Compressor(quality=BROTLI_QUALITY)
+    return obj.process, obj.finish
+
+def zstd_compressor() -> Compressor:
+    obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return obj.compress, obj.flush
+
+# In order of preference when the client rates several equally
+COMPRESSORS: Dict[str, Callable[[], Compressor]] = {}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = zstd_compressor
+if brotli is not None:
+    COMPRESSORS["br"] = brotli_compressor
+COMPRESSORS["gzip"] = gzip_compressor
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The best available encoding the client accepts, or None for identity"""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for name in COMPRESSORS:
+        q = qualities.get(name, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+class CompressionStats:
+    def __init__(self):
+        self.routes: Dict[str, Counter] = {}
+
+    def record(self, route: str, **counts):
+        self.routes.setdefault(route, Counter()).update(counts)
+
+    def report(self) -> list:
+        """Per-route totals, most bytes saved first"""
+        rows = []
+        for route, counts in self.routes.items():
+            bytes_in, bytes_out = counts["bytes_in"], counts["bytes_out"]
+            saved = bytes_in - bytes_out
+            cpu_ms = counts["cpu_us"] / 1000
+            rows.append({
+                "route": route,
+                "responses": counts["responses"],
+                "compressed": counts["compressed"],
+                "skipped_small": counts["skipped_small"],
+                "skipped_type": counts["skipped_type"],
+                "encodings": {k[9:]: v for k, v in counts.items() if k.startswith("encoding_")},
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+                "bytes_saved": saved,
+                "ratio": round(bytes_out / bytes_in, 3) if bytes_in else None,
+                "cpu_ms": round(cpu_ms, 2),
+                "cpu_ms_per_mb_saved": round(cpu_ms / (saved / 1e6), 2) if saved > 0 else None
+            })
+        rows.sort(key=lambda row: row["bytes_saved"], reverse=True)
+        return rows
+
+    def reset(self):
+        self.routes.clear()
+
+compression_stats = CompressionStats()
+
+class CompressionResponder:
+    """Wraps one response's send(): holds the start message until the body shows whether to compress"""
+
+    def __init__(self, scope, send, encoding: str, minimum_size: int):
+        self.scope = scope
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Optional[dict] = None
+        self.passthrough = False
+        self.pending = []  # body chunks held back while the size is still under the minimum
+        self.pending_size = 0
+        self.compressor: Optional[Compressor] = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if "content-encoding" in headers or message["status"] in (204, 304):
+                self.passthrough = True
+            elif not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+                self.passthrough = True
+                compression_stats.record(route_template(self.scope), responses=1, skipped_type=1)
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            self.pending.append(body)
+            self.pending_size += len(body)
+            if self.pending_size < self.minimum_size:
+                if more_body:
+                    return
+                # Finished under the minimum: not worth compressing
+                compression_stats.record(route_template(self.scope), responses=1, skipped_small=1)
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": b"".join(self.pending)})
+                return
+            body = b"".join(self.pending)
+            self.pending = []
+            self.compressor = COMPRESSORS[self.encoding]()
+
+        compress, finish = self.compressor
+        started = time.thread_time()
+        out = compress(body)
+        if not more_body:
+            out += finish()
+        self.cpu_seconds += time.thread_time() - started
+        self.bytes_in += len(body)
+        self.bytes_out += len(out)
+
+        if self.start is not None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["content-length"]
+            else:
+                headers["content-length"] = str(len(out))
+            etag = headers.get("etag")
+            if etag is not None and not etag.startswith("W/"):
+                # The encoded bytes differ, so a strong tag no longer describes them
+                headers["etag"] = f"W/{etag}"
+            await self.send(self.start)
+            self.start = None
+        if out or not more_body:
+            await self.send({"type": "http.response.body", "body": out, "more_body": more_body})
+        if not more_body:
+            compression_stats.record(
+                route_template(self.scope),
+                responses=1,
+                compressed=1,
+                bytes_in=self.bytes_in,
+                bytes_out=self.bytes_out,
+                cpu_us=round(self.cpu_seconds * 1e6),
+                **{f"encoding_{self.encoding}": 1}
+            )
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        encoding = negotiate(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, CompressionResponder(scope, send, encoding, self.minimum_size))
@@ -0,0 +1,60 @@
+"""
+Fast JSON Responses
+Opt-in path for large list endpoints: trusted internal records (store dicts
+or ORM rows) are projected onto the response model's fields and encoded with
+orjson, skipping FastAPI's per-item validation and re-serialization. Routes
+keep their response_model, so the OpenAPI schema is unchanged. Values go out
+as stored, without coercion, so only use it for records the API itself wrote.
+"""
+
+from operator import attrgetter, itemgetter
+from typing import Any, Dict, Iterable, List, Type
+from fastapi.responses import Response
+from pydantic import BaseModel
+import orjson
+import os
+
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_RESPONSES", "1") != "0"
+
+class RecordEncoder:
+    """A response model's field list, compiled once, for projecting records onto it"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.fields = tuple(model.__fields__)
+        self.defaults = {name: field.default for name, field in model.__fields__.items() if not field.required}
+        items, attrs = itemgetter(*self.fields), attrgetter(*self.fields)
+        if len(self.fields) == 1:
+            # A single-name getter returns the value itself rather than a 1-tuple
+            self.get_items, self.get_attrs = (lambda r: (items(r),)), (lambda r: (attrs(r),))
+        else:
+            self.get_items, self.get_attrs = items, attrs
+
+    def row(self, record: Any) -> dict:
+        if isinstance(record, dict):
+            try:
+                return dict(zip(self.fields, self.get_items(record)))
+            except KeyError:
+                return {name: record.get(name, self.defaults.get(name)) for name in self.fields}
+        return dict(zip(self.fields, self.get_attrs(record)))
+
+    def encode(self, records: Iterable[Any]) -> bytes:
+        # orjson writes dates, datetimes and enums natively, in the same forms pydantic would
+        return orjson.dumps([self.row(record) for record in records])
+
+record_encoders: Dict[type, RecordEncoder] = {}
+
+def get_record_encoder(model: Type[BaseModel]) -> RecordEncoder:
+    encoder = record_encoders.get(model)
+    if encoder is None:
+        encoder = record_encoders[model] = RecordEncoder(model)
+    return encoder
+
+def fast_json_list(model: Type[BaseModel], records: List[Any]) -> Any:
+    """
+    Return value for a route with response_model=List[model]: the records
+    encoded directly, or the records themselves (validated by FastAPI as
+    usual) when FAST_JSON_RESPONSES=0
+    """
+    if not FAST_JSON_ENABLED:
+        return records
+    return Response(content=get_record_encoder(model).encode(records), media_type="application/json")
@@ -0,0 +1,209 @@
+"""
+Memory Accounting
+Record counts and approximate deep sizes for the in-memory stores, exposed
+as the inmemory_store_records / inmemory_store_bytes gauges and at
+/api/admin/memory, plus tracemalloc snapshots that can be taken and diffed
+to find what is allocating.
+
+A store's size is the container plus everything reachable from its records,
+each object counted once. Stores with more than MEMORY_SAMPLE_RECORDS
+records are sized from a random sample and extrapolated. A measurement is
+reused until the store's version changes, so scrapes of an idle store cost
+nothing.
+"""
+
+from collections import OrderedDict, deque
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Callable, Dict, Optional, Tuple
+from api.metrics import Metric, format_value, registry
+from api.store_versions import get_store_version
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+MEMORY_SAMPLE_RECORDS = int(os.getenv("MEMORY_SAMPLE_RECORDS", "1000"))
+TRACEMALLOC_SNAPSHOTS_KEEP = 10
+
+# Shared by every record rather than owned by one
+SKIP_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+def deep_size(obj, seen: set) -> int:
+    """Bytes reachable from obj, skipping objects already in seen (ids) and adding the ones it counts"""
+    size = 0
+    pending = [obj]
+    while pending:
+        o = pending.pop()
+        if id(o) in seen or isinstance(o, SKIP_TYPES):
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, dict):
+            pending.extend(o.keys())
+            pending.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            pending.extend(o)
+        elif not isinstance(o, (str, bytes, int, float, complex, bool)):
+            # Plain objects and pydantic models: their __dict__ and any slots
+            attrs = getattr(o, "__dict__", None)
+            if attrs is not None:
+                pending.append(attrs)
+            for cls in type(o).__mro__:
+                for slot in cls.__dict__.get("__slots__", ()):
+                    if slot not in ("__dict__", "__weakref__"):
+                        value = getattr(o, slot, None)
+                        if value is not None:
+                            pending.append(value)
+    return size
+
+class TrackedStore:
+    def __init__(self, name: str, get: Callable[[], object], version: str):
+        # get, not the container itself: some routes rebind their store on delete
+        self.name = name
+        self.get = get
+        self.version = get_store_version(version)
+        self.measured_at: Optional[Tuple[str, int]] = None
+        self.measurement: dict = {}
+
+    def measure(self) -> dict:
+        version = (self.version.epoch, self.version.version)
+        if self.measured_at == version:
+            return self.measurement
+        started = time.perf_counter()
+        container = self.get()
+        records = list(container.values()) if isinstance(container, dict) else list(container)
+        sampled = len(records) > MEMORY_SAMPLE_RECORDS
+        sample = random.sample(records, MEMORY_SAMPLE_RECORDS) if sampled else records
+        seen = {id(container)}
+        record_bytes = sum(deep_size(record, seen) for record in sample)
+        if isinstance(container, dict):
+            record_bytes += sum(deep_size(key, seen) for key in container)  # keys are small; size them all
+        if sampled:
+            record_bytes = record_bytes * len(records) / len(sample)
+        total = sys.getsizeof(container) + int(record_bytes)
+        self.measurement = {
+            "records": len(records),
+            "bytes": total,
+            "bytes_per_record": round(total / len(records)) if records else 0,
+            "sampled": sampled,
+            "measure_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+        self.measured_at = version
+        return self.measurement
+
+tracked_stores: Dict[str, TrackedStore] = {}
+
+def track_store(name: str, get: Callable[[], object], version: Optional[str] = None):
+    """Account for a store; version names its StoreVersion when that differs from name"""
+    tracked_stores[name] = TrackedStore(name, get, version or name)
+
+def store_report() -> Dict[str, dict]:
+    return {name: store.measure() for name, store in sorted(tracked_stores.items())}
+
+def resident_bytes() -> Optional[int]:
+    """The process's resident set size, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+class StoreGauge(Metric):
+    """A gauge per tracked store, measured when scraped"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, field: str):
+        super().__init__(name, help, ("store",))
+        self.field = field
+
+    def collect(self):
+        for name, measurement in store_report().items():
+            yield f"{self.name}{self.label_text((name,))} {format_value(measurement[self.field])}"
+
+class ResidentGauge(Metric):
+    kind = "gauge"
+
+    def collect(self):
+        rss = resident_bytes()
+        if rss is not None:
+            yield f"{self.name} {rss}"
+
+registry.register(StoreGauge("inmemory_store_records", "Records in each in-memory store", "records"))
+registry.register(StoreGauge("inmemory_store_bytes", "Approximate deep size of each in-memory store", "bytes"))
+registry.register(ResidentGauge("process_resident_memory_bytes", "Resident memory of the API process"))
+
+class TracemallocSnapshots:
+    """Numbered tracemalloc snapshots, the newest TRACEMALLOC_SNAPSHOTS_KEEP kept"""
+
+    def __init__(self):
+        self.snapshots: "OrderedDict[int, Tuple[float, tracemalloc.Snapshot]]" = OrderedDict()
+        self.next_id = 1
+
+    def start(self, frames: int = 1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        tracemalloc.stop()
+        self.snapshots.clear()
+
+    def status(self) -> dict:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "snapshots": [{"id": i, "taken_at": taken_at} for i, (taken_at, _) in self.snapshots.items()]
+        }
+
+    def take(self) -> int:
+        """Raises RuntimeError when tracemalloc isn't tracing"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        snapshot_id = self.next_id
+        self.next_id += 1
+        self.snapshots[snapshot_id] = (time.time(), snapshot)
+        while len(self.snapshots) > TRACEMALLOC_SNAPSHOTS_KEEP:
+            self.snapshots.popitem(last=False)
+        return snapshot_id
+
+    def get(self, snapshot_id: int) -> Optional[tracemalloc.Snapshot]:
+        entry = self.snapshots.get(snapshot_id)
+        return entry[1] if entry else None
+
+    def top(self, snapshot_id: int, group_by: str = "lineno", limit: int = 20) -> Optional[list]:
+        snapshot = self.get(snapshot_id)
+        if snapshot is None:
+            return None
+        return [
+            {"location": format_traceback(stat.traceback), "bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(group_by)[:limit]
+        ]
+
+    def diff(self, snapshot_id: int, against: int, group_by: str = "lineno", limit: int = 20) -> Optional[list]:
+        """Allocation growth from snapshot `against` to `snapshot_id`, largest change first"""
+        snapshot, base = self.get(snapshot_id), self.get(against)
+        if snapshot is None or base is None:
+            return None
+        return [
+            {
+                "location": format_traceback(stat.traceback),
+                "bytes": stat.size,
+                "bytes_diff": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff
+            }
+            for stat in snapshot.compare_to(base, group_by)[:limit]
+        ]
+
+def format_traceback(traceback: tracemalloc.Traceback) -> str:
+    # Most recent frame first, as tracemalloc orders them
+    return " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in traceback)
+
+tracemalloc_snapshots = TracemallocSnapshots()
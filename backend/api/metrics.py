@@ -0,0 +1,261 @@
+"""
+Metrics
+Request counts, in-flight requests, latency and response size histograms per
+route template and status, database query time and outbound HTTP time,
+exposed in Prometheus text format at /metrics.
+
+Every metric keeps one shard per thread: a thread only ever writes its own
+shard, so recording takes no lock, and a scrape sums the shards. Work done
+for a request (database queries in the threadpool, outbound calls) is also
+totalled on the request's context and observed per route when it finishes.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter as StatementCounts
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from api.query_log import QUERY_DEBUG_HEADERS, check_slow_query, report_repeated_queries
+from api.route_templates import route_template
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.local = threading.local()
+        self.shards: List[dict] = []
+
+    def shard(self) -> dict:
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = self.local.shard = {}
+            self.shards.append(shard)
+        return shard
+
+    def label_text(self, values: Tuple, extra: str = "") -> str:
+        pairs = [f'{k}="{escape(str(v))}"' for k, v in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def collect(self) -> Iterator[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        shard = self.shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def totals(self) -> Dict[Tuple, float]:
+        totals: Dict[Tuple, float] = {}
+        for shard in list(self.shards):
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def collect(self) -> Iterator[str]:
+        for labels, value in sorted(self.totals().items()):
+            yield f"{self.name}{self.label_text(labels)} {format_value(value)}"
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: Tuple = ()):
+        shard = self.shard()
+        series = shard.get(labels)
+        if series is None:
+            # Per-bucket counts (the last is above every bound), then the sum
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> Iterator[str]:
+        totals: Dict[Tuple, list] = {}
+        for shard in list(self.shards):
+            for labels, series in list(shard.items()):
+                total = totals.setdefault(labels, [0] * len(series))
+                for i, value in enumerate(series):
+                    total[i] += value
+        for labels, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else format_value(bound)
+                le_label = f'le="{le}"'
+                yield f"{self.name}_bucket{self.label_text(labels, le_label)} {cumulative}"
+            yield f"{self.name}_sum{self.label_text(labels)} {format_value(series[-1])}"
+            yield f"{self.name}_count{self.label_text(labels)} {cumulative}"
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def exposition(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to the last byte of the response", ("method", "route", "status")
+))
+http_response_size = registry.register(Histogram(
+    "http_response_size_bytes", "Response body bytes as sent", ("method", "route", "status"), SIZE_BUCKETS
+))
+http_db_time = registry.register(Histogram(
+    "http_request_db_seconds", "Database query time per request", ("method", "route")
+))
+http_outbound_time = registry.register(Histogram(
+    "http_request_outbound_seconds", "Outbound HTTP time per request", ("method", "route")
+))
+db_queries = registry.register(Histogram(
+    "db_query_duration_seconds", "Database query time per statement, including background work"
+))
+outbound_requests = registry.register(Histogram(
+    "outbound_request_duration_seconds", "Outbound HTTP calls by service and outcome", ("service", "outcome")
+))
+
+class RequestTimings:
+    """Time spent on a request's behalf, totalled wherever the work runs"""
+    __slots__ = ("where", "db_seconds", "db_queries", "statements", "outbound_seconds")
+
+    def __init__(self, where: str = ""):
+        self.where = where  # "METHOD /path", for the query log
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.statements = StatementCounts()
+        self.outbound_seconds = 0.0
+
+# Threadpool calls and tasks started by a request inherit its context, and with it this object
+current_timings: "ContextVar[Optional[RequestTimings]]" = ContextVar("current_timings", default=None)
+
+def record_db_query(seconds: float, statement: str = ""):
+    db_queries.observe(seconds)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.db_seconds += seconds
+        timings.db_queries += 1
+        timings.statements[statement] += 1
+    check_slow_query(statement, seconds, timings.where if timings is not None else "background work")
+
+@contextmanager
+def track_outbound(service: str):
+    """Time an outbound call to `service`, recording whether it raised"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        outbound_requests.observe(elapsed, (service, outcome))
+        timings = current_timings.get()
+        if timings is not None:
+            timings.outbound_seconds += elapsed
+
+def instrument_engine(engine):
+    """Time every statement the engine runs"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        record_db_query(time.perf_counter() - conn.info["query_started"].pop(), statement)
+
+    @event.listens_for(engine, "handle_error")
+    def failed_query(context):
+        # after_cursor_execute doesn't run for a failed statement; drop its start time from the pooled connection
+        conn = context.connection
+        started = conn.info.get("query_started") if conn is not None else None
+        if started and context.statement is not None:
+            record_db_query(time.perf_counter() - started.pop(), context.statement)
+
+class MetricsMiddleware:
+    """Outermost ASGI middleware, so latency and sizes are what the client sees"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = RequestTimings(f"{scope['method']} {scope['path']}")
+        token = current_timings.set(timings)
+        status = 500
+        size = 0
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if QUERY_DEBUG_HEADERS:
+                    # Queries so far: everything a handler runs before it starts the response
+                    message = {**message, "headers": list(message.get("headers", [])) + [
+                        (b"x-db-query-count", str(timings.db_queries).encode()),
+                        (b"x-db-time-ms", f"{timings.db_seconds * 1000:.2f}".encode())
+                    ]}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            http_in_flight.dec()
+            current_timings.reset(token)
+            method, route = scope["method"], route_template(scope)
+            labels = (method, route, str(status))
+            http_requests.inc(labels)
+            http_latency.observe(time.perf_counter() - started, labels)
+            http_response_size.observe(size, labels)
+            if timings.db_queries:
+                http_db_time.observe(timings.db_seconds, (method, route))
+                report_repeated_queries(timings.statements, timings.where)
+            if timings.outbound_seconds:
+                http_outbound_time.observe(timings.outbound_seconds, (method, route))
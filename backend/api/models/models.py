@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from api.database import Base
@@ -13,6 +13,8 @@ class User(Base):
     is_professional = Column(Boolean, default=False)
     phone_number = Column(String)
 
+    farms = relationship("Farm", back_populates="user")
+
 class SensorData(Base):
     __tablename__ = "sensor_data"
 
@@ -62,10 +64,14 @@ class Farm(Base):
 
 class PumpLog(Base):
     __tablename__ = "pump_logs"
+    __table_args__ = (
+        # Range scans and per-farm/day aggregation for pump usage reports
+        Index("ix_pump_logs_farm_id_start_time", "farm_id", "start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     farm_id = Column(Integer, ForeignKey("farms.id"))
-    start_time = Column(DateTime)
+    start_time = Column(DateTime, index=True)
     end_time = Column(DateTime)
     duration = Column(Float)  # hours
     power_rating = Column(String)  # e.g., "2hp"
@@ -0,0 +1,195 @@
+"""
+Request Profiling
+A sampling profiler for single requests, so a slow endpoint can be profiled
+in place. A request is profiled when it carries the admin token in an
+X-Profile-Token header (or a _profile_token query parameter), or at random
+for PROFILE_SAMPLE_RATE of all requests. Profiles are written as collapsed
+stacks (one "frame;frame;frame count" line per stack, the input format of
+flamegraph.pl and speedscope) to PROFILE_DIR, keeping the newest
+PROFILE_KEEP, and the response names its profile in X-Profile-Id.
+
+Samples are wall-clock: while the request's task runs on the event loop its
+stack is recorded, while a worker thread runs the endpoint (sync routes) that
+thread's stack is, and while the task waits (on I/O, a lock, the threadpool)
+the coroutines it is suspended in are recorded under "[awaiting]".
+"""
+
+from itertools import count
+from typing import Dict, Optional
+from urllib.parse import parse_qsl
+import asyncio
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # unset: on-demand profiling and the profile routes are disabled
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # fraction of all requests, 0-1
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_MAX_ACTIVE = 4  # sampled (not requested) profiles running at once
+
+PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+frame_names: Dict[object, str] = {}
+
+def frame_name(code) -> str:
+    name = frame_names.get(code)
+    if name is None:
+        path = code.co_filename.replace("\\", "/").split("/")
+        name = frame_names[code] = f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+    return name
+
+def collapse(frame, codes: Optional[set] = None) -> list:
+    """Frame names from the outermost call in; codes collects every code object seen"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        if codes is not None:
+            codes.add(frame.f_code)
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+class RequestProfile:
+    """Samples one request from a background thread until stopped, then writes the profile"""
+
+    def __init__(self, profile_id: str, scope, loop, task):
+        self.profile_id = profile_id
+        self.scope = scope
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        self.task = task
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f"profile-{profile_id}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def sample(self):
+        frames = sys._current_frames()
+        if asyncio.current_task(self.loop) is self.task:
+            stacks = [collapse(frames.get(self.loop_thread))]
+        else:
+            stacks = []
+            code = getattr(self.scope.get("endpoint"), "__code__", None)
+            if code is not None:
+                for thread_id, frame in frames.items():
+                    codes = set()
+                    if thread_id != self.loop_thread and thread_id != threading.get_ident():
+                        stack = collapse(frame, codes)
+                        if code in codes:
+                            stacks.append(stack)
+            if not stacks and not self.task.done():
+                # Suspended: the coroutines it is waiting in, outermost first
+                stacks = [[frame_name(frame.f_code) for frame in self.task.get_stack()] + ["[awaiting]"]]
+        for stack in stacks:
+            if stack:
+                key = ";".join(stack)
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def run(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        while not self.stopped.wait(interval):
+            try:
+                self.sample()
+            except RuntimeError:
+                pass  # a task or frame changed under the sampler; skip this sample
+        self.write()
+
+    def write(self):
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(PROFILE_DIR, self.profile_id), "w") as f:
+                for stack, samples in sorted(self.stacks.items()):
+                    f.write(f"{stack} {samples}\n")
+            rotate_profiles()
+        except OSError:
+            logger.exception("Error writing profile %s", self.profile_id)
+
+def list_profiles() -> list:
+    """Stored profiles, newest first"""
+    try:
+        names = [name for name in os.listdir(PROFILE_DIR) if PROFILE_NAME.match(name)]
+    except FileNotFoundError:
+        return []
+    return sorted(names, reverse=True)
+
+def rotate_profiles():
+    for name in list_profiles()[PROFILE_KEEP:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            pass
+
+def read_profile(name: str) -> Optional[str]:
+    if not PROFILE_NAME.match(name):
+        return None
+    try:
+        with open(os.path.join(PROFILE_DIR, name)) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+class ProfilingMiddleware:
+    """ASGI middleware; profiles requested or sampled requests and passes the rest straight through"""
+
+    def __init__(self, app):
+        self.app = app
+        self.sequence = count()
+        self.active = 0
+
+    def requested(self, scope) -> bool:
+        if not ADMIN_TOKEN:
+            return False
+        token = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"x-profile-token"), None)
+        if token is None and b"_profile_token" in scope.get("query_string", b""):
+            token = dict(parse_qsl(scope["query_string"].decode("latin-1"))).get("_profile_token")
+        return admin_token_valid(token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.requested(scope):
+            sampled = False
+        elif PROFILE_SAMPLE_RATE > 0 and self.active < PROFILE_MAX_ACTIVE and random.random() < PROFILE_SAMPLE_RATE:
+            sampled = True
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        path = re.sub(r"[^\w-]+", "_", scope["path"]).strip("_") or "root"
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self.sequence):06d}-{scope['method']}-{path[:60]}.folded"
+        profile = RequestProfile(profile_id, scope, asyncio.get_running_loop(), asyncio.current_task())
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        if sampled:
+            self.active += 1
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.stop()
+            if sampled:
+                self.active -= 1
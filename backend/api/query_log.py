@@ -0,0 +1,49 @@
+"""
+Query Log
+Slow-query logging and per-request query accounting on top of the engine's
+statement timing. Statements slower than SLOW_QUERY_MS are logged (as warnings) with
+their normalized SQL; a request that runs the same statement many times
+(the N+1 pattern: one query per row of an earlier result) is reported
+when it finishes.
+"""
+
+from collections import Counter
+from functools import lru_cache
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+REPEATED_QUERY_THRESHOLD = int(os.getenv("REPEATED_QUERY_THRESHOLD", "10"))  # 0 disables
+# Adds X-DB-Query-Count and X-DB-Time-Ms to every response; meant for development
+QUERY_DEBUG_HEADERS = os.getenv("QUERY_DEBUG_HEADERS", "0") == "1"
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """One line, literals as ?, and IN lists of any length as (...), so variants of a query group together"""
+    sql = STRING_LITERAL.sub("?", statement)
+    sql = NUMBER_LITERAL.sub("?", sql)
+    sql = re.sub(r"%\(\w+\)s|:\w+|%s|\$\d+", "?", sql)  # driver placeholder styles
+    sql = PLACEHOLDER_LIST.sub("(...)", sql)
+    return WHITESPACE.sub(" ", sql).strip()
+
+def check_slow_query(statement: str, seconds: float, where: str):
+    elapsed_ms = seconds * 1000
+    if elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms) in %s: %s", elapsed_ms, where, normalize_sql(statement))
+
+def report_repeated_queries(statements: Counter, where: str):
+    """Log a warning for each statement one request ran at least REPEATED_QUERY_THRESHOLD times"""
+    if not REPEATED_QUERY_THRESHOLD or not statements:
+        return
+    for statement, count in statements.most_common():
+        if count < REPEATED_QUERY_THRESHOLD:
+            break
+        logger.warning("Repeated query (%dx, possible N+1) in %s: %s", count, where, normalize_sql(statement))
@@ -0,0 +1,28 @@
+"""
+Route Templates
+The path template of the route that handled a request ("/api/pumps/{pump_id}"
+rather than "/api/pumps/42"), so per-route stats and metric labels stay
+bounded however many ids appear in paths. Shared by the metrics and the
+compression stats so both name routes the same way.
+"""
+
+from typing import Dict
+
+UNMATCHED = "unmatched"
+
+# Endpoint function -> path template, filled from the app's routes on first sight of an endpoint
+templates: Dict[object, str] = {}
+
+def route_template(scope) -> str:
+    # The router records the matched endpoint on the shared scope
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED
+    path = templates.get(endpoint)
+    if path is None:
+        app = scope.get("app")
+        for route in getattr(app, "routes", ()):
+            if getattr(route, "endpoint", None) is not None:
+                templates.setdefault(route.endpoint, route.path)
+        path = templates.setdefault(endpoint, getattr(endpoint, "__name__", "unknown"))
+    return path
@@ -0,0 +1,118 @@
+"""
+Admin API Routes
+Operational views of the running server
+"""
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from api.compression import COMPRESSORS, MINIMUM_SIZE, compression_stats
+from api.memory import resident_bytes, store_report, tracemalloc_snapshots
+from api.profiling import PROFILE_DIR, PROFILE_KEEP, PROFILE_SAMPLE_RATE, admin_token_valid, list_profiles, read_profile
+
+router = APIRouter()
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@router.get("/compression", dependencies=[Depends(require_admin_token)])
+async def get_compression_stats():
+    """
+    Get per-route response compression: bytes in and out, bytes saved and the
+    CPU time spent compressing
+    """
+    return {
+        "encodings": list(COMPRESSORS),
+        "minimum_size": MINIMUM_SIZE,
+        "routes": compression_stats.report()
+    }
+
+@router.delete("/compression", dependencies=[Depends(require_admin_token)])
+async def reset_compression_stats():
+    """
+    Reset the compression counters
+    """
+    compression_stats.reset()
+    return {"message": "Compression stats reset"}
+
+@router.get("/profiles", dependencies=[Depends(require_admin_token)])
+async def get_profiles():
+    """
+    List stored request profiles, newest first. Profile a request by sending
+    the admin token in X-Profile-Token; its response names the profile in
+    X-Profile-Id
+    """
+    return {
+        "directory": PROFILE_DIR,
+        "keep": PROFILE_KEEP,
+        "sample_rate": PROFILE_SAMPLE_RATE,
+        "profiles": list_profiles()
+    }
+
+@router.get("/profiles/{name}", response_class=PlainTextResponse, dependencies=[Depends(require_admin_token)])
+async def get_profile(name: str):
+    """
+    Get a stored profile as collapsed stacks, ready for flamegraph.pl or speedscope
+    """
+    profile = read_profile(name)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile)
+
+@router.get("/memory", dependencies=[Depends(require_admin_token)])
+async def get_memory():
+    """
+    Get record counts and approximate deep sizes of the in-memory stores, the
+    process's resident memory and the tracemalloc status
+    """
+    return {
+        "resident_bytes": resident_bytes(),
+        "stores": store_report(),
+        "tracemalloc": tracemalloc_snapshots.status()
+    }
+
+@router.post("/memory/tracemalloc", dependencies=[Depends(require_admin_token)])
+async def start_tracemalloc(frames: int = 1):
+    """
+    Start tracing allocations, keeping `frames` frames of traceback each.
+    Tracing slows every allocation down; stop it when done
+    """
+    if not 1 <= frames <= 50:
+        raise HTTPException(status_code=400, detail="frames must be between 1 and 50")
+    tracemalloc_snapshots.start(frames)
+    return tracemalloc_snapshots.status()
+
+@router.delete("/memory/tracemalloc", dependencies=[Depends(require_admin_token)])
+async def stop_tracemalloc():
+    """
+    Stop tracing allocations and drop the snapshots
+    """
+    tracemalloc_snapshots.stop()
+    return tracemalloc_snapshots.status()
+
+@router.post("/memory/snapshots", dependencies=[Depends(require_admin_token)])
+async def take_memory_snapshot(limit: int = 20):
+    """
+    Take a tracemalloc snapshot and return its largest allocation sites
+    """
+    try:
+        snapshot_id = tracemalloc_snapshots.take()
+    except RuntimeError:
+        raise HTTPException(status_code=409, detail="tracemalloc is not tracing; POST /memory/tracemalloc first")
+    return {"id": snapshot_id, "top": tracemalloc_snapshots.top(snapshot_id, limit=limit)}
+
+@router.get("/memory/snapshots/{snapshot_id}/diff", dependencies=[Depends(require_admin_token)])
+async def diff_memory_snapshots(snapshot_id: int, against: Optional[int] = None, group_by: str = "lineno", limit: int = 20):
+    """
+    Compare a snapshot with an earlier one (by default the one before it):
+    allocation sites by growth, largest first
+    """
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    if against is None:
+        against = max((i for i in tracemalloc_snapshots.snapshots if i < snapshot_id), default=None)
+    diff = tracemalloc_snapshots.diff(snapshot_id, against, group_by, limit) if against is not None else None
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return {"id": snapshot_id, "against": against, "group_by": group_by, "stats": diff}
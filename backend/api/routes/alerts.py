@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from twilio.rest import Client
 import os
+from api.metrics import track_outbound
 from api.routes.auth import get_current_user
 from api.models import models
 
@@ -15,11 +16,12 @@ client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
 
 async def send_alert(severity: str, description: str, to_phone: str):
     try:
-        message = client.messages.create(
-            body=f"WATER ALERT - {severity}\n{description}",
-            from_=TWILIO_PHONE_NUMBER,
-            to=to_phone
-        )
+        with track_outbound("twilio"):
+            message = client.messages.create(
+                body=f"WATER ALERT - {severity}\n{description}",
+                from_=TWILIO_PHONE_NUMBER,
+                to=to_phone
+            )
         return {"status": "success", "message_sid": message.sid}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,17 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Awaitable, Callable, List, Optional, Dict, Any, Tuple
+from datetime import date, datetime, timedelta
 from pydantic import BaseModel
+from api.database import SessionLocal
+from api.memory import track_store
+from api.routes import farming, irrigation, pump_stats, water_usage
+from api.services.snapshot_cache import Snapshot, SnapshotCache
+from api.services.weather_client import weather_client
+from api.store_versions import get_store_version
+import asyncio
+import os
+import time
 
 router = APIRouter()
 
@@ -39,6 +49,27 @@ class DashboardCard(DashboardCardBase):
 dashboard_cards_db = {}
 card_id_counter = 1
 
+# Bumped on every card write, including each snapshot build's card values
+cards_store = get_store_version("dashboard_cards")
+track_store("dashboard_cards", lambda: dashboard_cards_db)
+
+POWER_BUDGET_KWH = 50.0  # daily
+WATER_TARGET_LITRES = 30000.0  # daily
+MOISTURE_NORMAL_RANGE = (40, 70)
+URGENT_MOISTURE_LEVEL = 30  # pending irrigations below this are urgent
+OVERVIEW_SOURCE_TIMEOUT_SECONDS = float(os.getenv("DASHBOARD_SOURCE_TIMEOUT_SECONDS", "2"))
+
+# The snapshot waits this long after a store change so bursts of writes cost one rebuild;
+# it is also rebuilt once it is this old, for the pump logs, weather and the date rolling over
+SNAPSHOT_DEBOUNCE_SECONDS = float(os.getenv("DASHBOARD_SNAPSHOT_DEBOUNCE_SECONDS", "1"))
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS", "300"))
+
+# Where the weather card's conditions come from; without both, the card is left as it is
+DASHBOARD_LOCATION = (
+    (float(os.environ["DASHBOARD_LATITUDE"]), float(os.environ["DASHBOARD_LONGITUDE"]))
+    if os.getenv("DASHBOARD_LATITUDE") and os.getenv("DASHBOARD_LONGITUDE") else None
+)
+
 # Initialize default cards
 def initialize_default_cards():
     global card_id_counter
@@ -165,6 +196,7 @@ async def create_card(card: DashboardCardCreate):
     )
     
     dashboard_cards_db[card_id_counter] = new_card
+    cards_store.bump([card_id_counter])
     card_id_counter += 1
     
     return new_card
@@ -185,6 +217,7 @@ async def update_card(card_id: int, card_update: DashboardCardUpdate):
         setattr(existing_card, field, value)
     
     existing_card.updatedAt = datetime.now()
+    cards_store.bump([card_id])
     
     return existing_card
 
@@ -197,52 +230,290 @@ async def delete_card(card_id: int):
         raise HTTPException(status_code=404, detail="Card not found")
     
     deleted_card = dashboard_cards_db.pop(card_id)
+    cards_store.bump([card_id])
     
     return {
         "message": "Card deleted successfully",
         "deleted_card": deleted_card
     }
 
+@router.get("/dashboard/power-consumption", response_model=DashboardCard)
+async def get_power_consumption_card():
+    """
+    Get the power consumption card, as of the latest dashboard snapshot
+    (today's pump logs priced with the active electricity tariff)
+    """
+    for card in dashboard_cards_db.values():
+        if card.cardType == "power-consumption":
+            return card
+    
+    raise HTTPException(status_code=404, detail="Power consumption card not found")
+
 @router.get("/dashboard/stats")
 async def get_dashboard_stats():
     """
-    Get aggregated dashboard statistics
+    Get aggregated dashboard statistics, served from the latest snapshot
+    """
+    snapshot = get_snapshot_or_503()
+    return {**snapshot.data["stats"], "snapshot": snapshot.info()}
+
+@router.get("/dashboard/snapshot")
+async def get_snapshot_status():
+    """
+    Get the dashboard snapshot's version, age and the store versions it was built from
+    """
+    return dashboard_cache.status()
+
+@router.get("/dashboard/overview")
+async def get_dashboard_overview(
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitude for the weather section"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Longitude for the weather section"),
+    timeout: float = Query(OVERVIEW_SOURCE_TIMEOUT_SECONDS, gt=0, le=30, description="Per-section timeout in seconds")
+):
+    """
+    Everything the dashboard page loads, in one call. Sections are gathered
+    concurrently, each with its own timeout; a slow or failing section comes
+    back as null with its status in meta instead of holding up the rest.
     """
-    # This would typically query your database for real-time stats
+    sources: Dict[str, Callable[[], Awaitable[Any]]] = {
+        "cards": get_all_cards,
+        "stats": get_dashboard_stats,
+        "water_usage": water_usage.get_dashboard_stats,
+        "pumps": pump_stats.get_system_stats,
+        "irrigation_today": irrigation.get_today_stats,
+        "irrigation_summary": irrigation.get_summary_stats
+    }
+    if lat is not None and lon is not None:
+        sources["weather"] = lambda: get_current_weather(lat, lon)
+    
+    started = time.perf_counter()
+    results = await asyncio.gather(*(gather_section(name, source, timeout) for name, source in sources.items()))
+    
     return {
-        "water_used_today": 12450,
-        "active_fields": 12,
-        "total_fields": 15,
-        "moisture_average": 58,
-        "pending_irrigations": 5,
-        "weather": {
-            "condition": "Partly Cloudy",
-            "temperature": 25,
-            "humidity": 65,
-            "wind_speed": 12,
-            "visibility": 10
-        },
-        "power_consumption": 23.5,
-        "power_budget": 50.0
+        "generated_at": datetime.now(),
+        "complete": all(meta["status"] == "ok" for _, _, meta in results),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "data": {name: data for name, data, _ in results},
+        "meta": {name: meta for name, _, meta in results}
     }
 
 @router.post("/dashboard/refresh")
 async def refresh_dashboard():
     """
-    Refresh all dashboard card data
+    Rebuild the dashboard snapshot now instead of waiting for the next change
     """
-    # This would typically fetch fresh data from various sources
-    # For now, we'll simulate with random variations
-    import random
+    snapshot = await dashboard_cache.refresh()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Dashboard snapshot could not be built")
+    
+    return {
+        "message": "Dashboard refreshed successfully",
+        "updated_at": snapshot.built_at,
+        "snapshot": snapshot.info()
+    }
+
+async def gather_section(name: str, source: Callable[[], Awaitable[Any]], timeout: float) -> Tuple[str, Any, dict]:
+    """Run one overview section under its timeout; returns (name, data or None, timing metadata)"""
+    started = time.perf_counter()
+    data, error = None, None
+    try:
+        data = await asyncio.wait_for(source(), timeout)
+        status = "ok"
+    except asyncio.TimeoutError:
+        status, error = "timeout", f"No response within {timeout:g} s"
+    except HTTPException as e:
+        status, error = "error", e.detail
+    except Exception as e:
+        status, error = "error", str(e)
+    meta = {"status": status, "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+    if error is not None:
+        meta["error"] = error
+    return name, data, meta
+
+async def get_current_weather(lat: float, lon: float) -> dict:
+    weather_data = await weather_client.get_current(lat, lon)
+    return {
+        "temperature": weather_data["main"]["temp"],
+        "humidity": weather_data["main"]["humidity"],
+        "weather_condition": weather_data["weather"][0]["main"],
+        "description": weather_data["weather"][0]["description"],
+        "wind_speed": weather_data["wind"]["speed"]
+    }
+
+def query_power_consumption() -> dict:
+    db = SessionLocal()
+    try:
+        return compute_power_consumption(db)
+    finally:
+        db.close()
+
+async def load_power_consumption() -> dict:
+    # The pump log queries are blocking, so they run in a worker thread with their own session
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, query_power_consumption)
+
+def compute_power_consumption(db: Session) -> dict:
+    """Power consumption card values from today's and yesterday's logged pump energy and cost"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    usage = farming.get_daily_pump_usage(db, yesterday, today + timedelta(days=1))
+    energy = {day: 0.0 for day in (str(yesterday.date()), str(today.date()))}
+    cost = dict(energy)
+    for row in usage:
+        energy[row["date"]] += row["energy_kwh"]
+        cost[row["date"]] += row["cost_rs"]
+    energy_today, energy_yesterday = energy[str(today.date())], energy[str(yesterday.date())]
     
+    return {
+        "energy_kwh": round(energy_today, 2),
+        "card": {
+            "value": f"{energy_today:.1f} kWh",
+            "progress": min(100, round(energy_today / POWER_BUDGET_KWH * 100)),
+            "trend": compare_with_yesterday(energy_today, energy_yesterday, "usage"),
+            "metadata": {
+                "cost_rs": round(cost[str(today.date())], 2),
+                "budget_kwh": POWER_BUDGET_KWH,
+                "tariff": farming.active_tariff.name
+            }
+        }
+    }
+
+async def load_weather() -> dict:
+    weather_data = await weather_client.get_current(*DASHBOARD_LOCATION)
+    visibility = weather_data.get("visibility")  # metres
+    return {
+        "condition": weather_data["weather"][0]["main"],
+        "temperature": round(weather_data["main"]["temp"]),
+        "humidity": weather_data["main"]["humidity"],
+        "wind_speed": round(weather_data["wind"]["speed"] * 3.6),  # m/s to km/h
+        "visibility": round(visibility / 1000) if visibility is not None else None
+    }
+
+def compare_with_yesterday(today: float, yesterday: float, what: str) -> str:
+    if yesterday <= 0:
+        return f"No {what} logged yesterday"
+    change = (today - yesterday) / yesterday * 100
+    return f"{abs(change):.0f}% {'more' if change > 0 else 'less'} than yesterday"
+
+def moisture_trend(average: float) -> str:
+    if average < MOISTURE_NORMAL_RANGE[0]:
+        return "Below normal range"
+    if average > MOISTURE_NORMAL_RANGE[1]:
+        return "Above normal range"
+    return "Within normal range"
+
+async def build_dashboard_snapshot() -> dict:
+    """
+    Compute the dashboard stats and card values from the live stores and
+    write the card values onto the matching cards. The pump-log and weather
+    sections keep their previous values when they fail or time out.
+    """
+    previous = dashboard_cache.snapshot.data["external"] if dashboard_cache.snapshot else {}
+    sources: Dict[str, Callable[[], Awaitable[Any]]] = {"power": load_power_consumption}
+    if DASHBOARD_LOCATION is not None:
+        sources["weather"] = load_weather
+    results = await asyncio.gather(*(
+        gather_section(name, source, OVERVIEW_SOURCE_TIMEOUT_SECONDS) for name, source in sources.items()
+    ))
+    external = {name: data if meta["status"] == "ok" else previous.get(name) for name, data, meta in results}
+    pumps = await pump_stats.get_system_stats()
+    
+    # Everything below reads memory only, with no awaits, so it sees one consistent state
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    water_today = sum(r["water_used"] for r in water_usage.water_usage_db if r["date"] == today)
+    water_yesterday = sum(r["water_used"] for r in water_usage.water_usage_db if r["date"] == yesterday)
+    
+    schedules = [irrigation.irrigation_schedules_db[sid] for sid in irrigation.schedule_index.on(today)]
+    schedules += irrigation.expand_occurrences(start=today, end=today)
+    fields = {f.strip().lower() for f in irrigation.schedule_index.field_locations}
+    fields |= {irrigation.field_key(r) for r in irrigation.irrigation_recurrences_db.values()}
+    active_fields = {irrigation.field_key(s) for s in schedules}
+    moisture = round(sum(s.moistureLevel for s in schedules) / len(schedules)) if schedules else None
+    pending = [s for s in schedules if s.status.lower() == "pending"]
+    urgent = [s for s in pending if s.moistureLevel < URGENT_MOISTURE_LEVEL]
+    
+    cards = {
+        "water-usage": {
+            "value": f"{water_today:,.0f} L",
+            "progress": min(100, round(water_today / WATER_TARGET_LITRES * 100)),
+            "trend": compare_with_yesterday(water_today, water_yesterday, "water usage")
+        },
+        "active-fields": {
+            "value": f"{len(active_fields)}/{len(fields)}",
+            "progress": round(len(active_fields) / len(fields) * 100) if fields else 0,
+            "trend": f"{len(fields) - len(active_fields)} fields idle today"
+        },
+        "moisture-avg": {
+            "value": f"{moisture}%" if moisture is not None else "No readings",
+            "progress": moisture or 0,
+            "trend": moisture_trend(moisture) if moisture is not None else "No irrigations scheduled today"
+        },
+        "pending-irrigation": {
+            "value": str(len(pending)),
+            "progress": round(len(pending) / len(schedules) * 100) if schedules else 0,
+            "trend": f"{len(urgent)} urgent"
+        }
+    }
+    weather = external.get("weather")
+    if weather is not None:
+        cards["weather-update"] = {
+            "value": weather["condition"],
+            "metadata": {
+                "temperature": f"{weather['temperature']}°C",
+                "humidity": f"{weather['humidity']}%",
+                "wind": f"{weather['wind_speed']} km/h",
+                "visibility": f"{weather['visibility']} km" if weather["visibility"] is not None else None
+            }
+        }
+    power = external.get("power")
+    if power is not None:
+        cards["power-consumption"] = power["card"]
+    
+    now = datetime.now()
     for card in dashboard_cards_db.values():
-        if card.progress:
-            # Add small random variation
-            variation = random.randint(-5, 5)
-            card.progress = max(0, min(100, card.progress + variation))
-        card.updatedAt = datetime.now()
+        values = cards.get(card.cardType)
+        if values is not None:
+            for field, value in values.items():
+                setattr(card, field, value)
+            card.updatedAt = now
+    cards_store.bump([card.id for card in dashboard_cards_db.values() if card.cardType in cards])
     
     return {
-        "message": "Dashboard refreshed successfully",
-        "updated_at": datetime.now()
+        "stats": {
+            "water_used_today": round(water_today, 2),
+            "water_target": WATER_TARGET_LITRES,
+            "active_fields": len(active_fields),
+            "total_fields": len(fields),
+            "moisture_average": moisture,
+            "pending_irrigations": len(pending),
+            "urgent_irrigations": len(urgent),
+            "weather": weather,
+            "power_consumption": power["energy_kwh"] if power is not None else None,
+            "power_budget": POWER_BUDGET_KWH,
+            "pumps": pumps,
+            "sources": {name: meta for name, _, meta in results}
+        },
+        "cards": cards,
+        "external": external
     }
+
+def get_snapshot_or_503() -> Snapshot:
+    snapshot = dashboard_cache.snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Dashboard snapshot not built yet")
+    return snapshot
+
+# Rebuilt in the background after writes to the stores it reads; reads never compute
+dashboard_cache = SnapshotCache(
+    "dashboard",
+    build_dashboard_snapshot,
+    [pump_stats.pump_store, water_usage.water_usage_store, irrigation.irrigation_store],
+    debounce_seconds=SNAPSHOT_DEBOUNCE_SECONDS,
+    max_age_seconds=SNAPSHOT_MAX_AGE_SECONDS
+)
+
+@router.on_event("startup")
+async def start_dashboard_snapshots():
+    # Built in the background; the stats endpoints answer 503 until the first build lands
+    asyncio.create_task(dashboard_cache.start())
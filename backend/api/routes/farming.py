@@ -1,12 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import List, Optional
-from api.database import get_db
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from pydantic import BaseModel, Field
+from api.database import SessionLocal, get_db
 from api.models import models, schemas
+from api.routes import pump_stats
+from api.routes.admin import require_admin_token
 from api.routes.auth import get_current_user
-import aiohttp
+from api.services.weather_client import weather_client
+from api.services.forecast_grid import forecast_grid
+from api.services.farm_index import farm_index
+from api.services.irrigation_optimizer import FieldDemand, IrrigationPlanner, PumpCapacity, HP_TO_KW
+from api.services.tariff import DEFAULT_TARIFF, Tariff, TariffBand, TariffSlab, to_epoch_seconds
+import asyncio
+import json
+import logging
+import numpy as np
 import os
+import uuid
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -36,24 +52,106 @@ PUMP_POWER_RATINGS = {
     "5hp": 3.73
 }
 
-ELECTRICITY_RATE = 8.50  # Rs per kWh
+# Time-of-use tariff used to price pump energy; replaced through PUT /tariff,
+# which saves it to TARIFF_FILE so stored PumpLog costs and the active tariff
+# still agree after a restart
+TARIFF_FILE = os.getenv("TARIFF_FILE", "./tariff.json")
+
+def load_tariff() -> Tariff:
+    """The tariff saved by PUT /tariff, or DEFAULT_TARIFF when none has been saved"""
+    try:
+        with open(TARIFF_FILE) as f:
+            return Tariff.from_dict(json.load(f))
+    except FileNotFoundError:
+        return DEFAULT_TARIFF
+    except (OSError, ValueError, KeyError, TypeError):
+        logger.exception("Error loading tariff from %s, using the default", TARIFF_FILE)
+        return DEFAULT_TARIFF
+
+def save_tariff(tariff: Tariff):
+    # Written aside and renamed, so a crash mid-write leaves the previous tariff in place
+    temp_path = f"{TARIFF_FILE}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(tariff.to_dict(), f)
+    os.replace(temp_path, TARIFF_FILE)
+
+active_tariff: Tariff = load_tariff()
+REPRICE_FARMS_PER_BATCH = 500
+REPRICE_UPDATE_CHUNK = 10000
+
+LAND_UNIT_TO_HECTARES = {
+    "acre": 0.404686,
+    "hectare": 1,
+    "killa": 0.404686,  # Same as acre in many regions
+    "gaj": 0.000008361,
+    "sqmeter": 0.0001
+}
+
+GROWING_SEASON_DAYS = 90
+
+# Seasonal crop figures assume this reference evapotranspiration; forecast ET0
+# above or below it scales demand proportionally
+REFERENCE_ET0_MM = 5.0  # mm per day
+EFFECTIVE_RAINFALL_SHARE = 0.8
+MAX_WEATHER_FACTOR = 2.0
+FORECAST_REFRESH_MINUTES = float(os.getenv("FORECAST_REFRESH_MINUTES", "180"))
+
+FORECAST_DAYS = 5
+MAX_STORED_PLANS = 50
+
+# Irrigation plans kept for incremental re-planning, oldest evicted first
+schedule_plans: "OrderedDict[str, IrrigationPlanner]" = OrderedDict()
+schedule_plan_locks: Dict[str, asyncio.Lock] = {}
+
+# Request models
+class WaterRequirementEntry(BaseModel):
+    farm_id: Optional[int] = Field(None, description="Farm to read crop, size, soil and location from")
+    crop_type: Optional[str] = None
+    land_size: Optional[float] = Field(None, gt=0)
+    land_unit: Optional[str] = None
+    soil_type: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+class TariffBandConfig(BaseModel):
+    name: str
+    start_hour: float = Field(..., ge=0, le=24)
+    end_hour: float = Field(..., ge=0, le=24, description="May be earlier than start_hour to wrap midnight")
+    multiplier: float = Field(..., gt=0, description="Applied to the slab rate inside the band")
+
+class TariffSlabConfig(BaseModel):
+    up_to_kwh: Optional[float] = Field(None, gt=0, description="Monthly kWh where the slab ends; empty for the last slab")
+    rate: float = Field(..., ge=0, description="Rs per kWh")
+
+class TariffConfig(BaseModel):
+    name: str
+    bands: List[TariffBandConfig] = []
+    slabs: List[TariffSlabConfig] = Field(..., min_items=1)
+
+class ScheduleField(WaterRequirementEntry):
+    field_id: str
+    pump_ids: Optional[List[int]] = Field(None, description="Pumps that can reach this field (default: any)")
+    daily_requirement_liters: Optional[float] = Field(None, gt=0, description="Override the calculated daily demand")
+
+class SchedulePump(BaseModel):
+    pump_id: int
+    max_flow_rate: float = Field(..., gt=0, description="Maximum flow rate in L/min")
+    power_rating: float = Field(..., gt=0, description="Power rating in HP")
+
+class OptimalScheduleRequest(BaseModel):
+    fields: List[ScheduleField] = Field(..., min_items=1)
+    pumps: Optional[List[SchedulePump]] = Field(None, description="Default: every pump not in maintenance or error")
+    start_date: Optional[date] = None
+    days: int = Field(FORECAST_DAYS, ge=1, le=7)
+
+class ReplanRequest(BaseModel):
+    fields: List[ScheduleField] = []
+    removed_field_ids: List[str] = []
+    pumps: List[SchedulePump] = []
+    removed_pump_ids: List[int] = []
 
 async def fetch_weather_data(lat: float, lon: float):
-    OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
-    url = f"http://api.openweathermap.org/data/2.5/weather"
-    params = {
-        "lat": lat,
-        "lon": lon,
-        "appid": OPENWEATHER_API_KEY,
-        "units": "metric"
-    }
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                raise HTTPException(status_code=response.status, detail="Weather API error")
+    return await weather_client.get_current(lat, lon)
 
 @router.get("/weather/{lat}/{lon}")
 async def get_weather_data(lat: float, lon: float):
@@ -71,8 +169,9 @@ async def calculate_water_requirement(
     crop_type: str,
     land_size: float,
     land_unit: str,
-    soil_type: str = "loam",
-    weather_data: dict = Depends(get_weather_data)
+    lat: float,
+    lon: float,
+    soil_type: str = "loam"
 ):
     # Convert land size to hectares
     size_in_hectares = convert_to_hectares(land_size, land_unit)
@@ -83,28 +182,104 @@ async def calculate_water_requirement(
     # Adjust for soil type
     soil_factor = SOIL_MOISTURE_FACTOR.get(soil_type.lower(), 1.0)
     
-    # Adjust for weather conditions
-    weather_factor = calculate_weather_factor(weather_data)
+    # Adjust for today's forecast evapotranspiration and rain in this grid cell
+    forecast = await forecast_grid.get(lat, lon)
+    today = forecast_day(forecast.daily if forecast else None, datetime.now().date())
+    weather_factor = round(float(calculate_weather_factors(
+        today["et0_mm"] if today else REFERENCE_ET0_MM,
+        today["rainfall"] if today else 0
+    )), 4)
     
     # Calculate daily water requirement (liters)
     daily_requirement = (
-        base_requirement * size_in_hectares * 10000 * soil_factor * weather_factor / 90
-    )  # Assuming 90 days growing season
+        base_requirement * size_in_hectares * 10000 * soil_factor * weather_factor / GROWING_SEASON_DAYS
+    )
     
     return {
         "daily_requirement_liters": round(daily_requirement, 2),
         "daily_requirement_cubic_meters": round(daily_requirement / 1000, 2),
         "factors": {
             "soil_factor": soil_factor,
-            "weather_factor": weather_factor
+            "weather_factor": weather_factor,
+            "et0_mm": today["et0_mm"] if today else None
         }
     }
 
+@router.post("/calculate-water-requirement/batch")
+async def calculate_water_requirement_batch(
+    entries: List[WaterRequirementEntry],
+    db: Session = Depends(get_db)
+):
+    """
+    Calculate daily water requirements for many farms/crops at once.
+    Weather is fetched once per weather grid cell.
+    """
+    farm_ids = [e.farm_id for e in entries if e.farm_id is not None]
+    farms = {}
+    if farm_ids:
+        farms = {
+            f.id: f for f in db.query(models.Farm).filter(models.Farm.id.in_(farm_ids)).all()
+        }
+    
+    results = await calculate_water_requirements([
+        merge_farm_entry(entry, farms.get(entry.farm_id)) for entry in entries
+    ])
+    
+    return {
+        "count": len(results),
+        "results": results
+    }
+
+@router.get("/farms/nearest")
+async def get_nearest_farms(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=100, description="Number of farms"),
+    db: Session = Depends(get_db)
+):
+    """Get the k farms closest to a point"""
+    matches = farm_index.nearest(lat, lon, k)
+    return {"count": len(matches), "farms": describe_farm_matches(db, matches)}
+
+@router.get("/farms/within")
+async def get_farms_within(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=2000),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of farms returned, nearest first"),
+    db: Session = Depends(get_db)
+):
+    """Get farms within a radius of a point"""
+    matches = farm_index.within(lat, lon, radius_km)
+    return {"count": len(matches), "farms": describe_farm_matches(db, matches[:limit])}
+
+@router.post("/farms/water-requirements")
+async def calculate_all_farm_water_requirements(db: Session = Depends(get_db)):
+    """
+    Calculate daily water requirements for every farm (nightly planning job)
+    """
+    farms = db.query(models.Farm).all()
+    results = await calculate_water_requirements([
+        merge_farm_entry(WaterRequirementEntry(farm_id=farm.id), farm) for farm in farms
+    ])
+    
+    return {
+        "count": len(results),
+        "total_daily_requirement_liters": round(
+            sum(r["daily_requirement_liters"] or 0 for r in results), 2
+        ),
+        "results": results
+    }
+
 @router.get("/pump-usage")
 async def get_pump_usage(
     start_date: str,
     end_date: str,
     pump_power: str = "2hp",
+    farm_id: Optional[int] = None,
+    include_logs: bool = Query(False, description="Include a page of individual pump logs"),
+    skip: int = Query(0, ge=0, description="Number of logs to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of logs"),
     db: Session = Depends(get_db)
 ):
     # Calculate electricity usage and cost
@@ -114,22 +289,108 @@ async def get_pump_usage(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format")
     
-    # Get pump running hours from database
-    pump_logs = get_pump_logs(db, start, end)
+    # end_date is inclusive
+    end = end + timedelta(days=1)
+    
+    # Aggregate pump running hours in the database
+    daily_usage = get_daily_pump_usage(db, start, end, farm_id)
     
     # Calculate electricity consumption
     power_rating = PUMP_POWER_RATINGS.get(pump_power.lower(), 1.492)  # Default to 2hp
-    total_hours = sum(log.duration for log in pump_logs)
+    total_hours = sum(day["hours"] for day in daily_usage)
     electricity_consumed = power_rating * total_hours  # kWh
-    electricity_cost = electricity_consumed * ELECTRICITY_RATE
+    logged_energy = sum(day["energy_kwh"] for day in daily_usage)
+    logged_cost = sum(day["cost_rs"] for day in daily_usage)
+    rate = effective_rate(electricity_consumed, logged_energy, logged_cost)
+    electricity_cost = electricity_consumed * rate
     
-    return {
-        "total_hours": total_hours,
+    response = {
+        "total_hours": round(total_hours, 2),
         "electricity_consumed_kwh": round(electricity_consumed, 2),
         "electricity_cost_rs": round(electricity_cost, 2),
-        "logs": pump_logs
+        "effective_rate_rs_per_kwh": round(rate, 4),
+        "tariff": active_tariff.name,
+        "logged_energy_kwh": round(logged_energy, 2),
+        "logged_cost_rs": round(logged_cost, 2),
+        "daily": daily_usage
+    }
+    
+    if include_logs:
+        response["logs"] = get_pump_logs(db, start, end, farm_id, skip, limit)
+        response["skip"] = skip
+        response["limit"] = limit
+    
+    return response
+
+@router.get("/tariff")
+async def get_tariff():
+    """Get the active electricity tariff"""
+    return active_tariff.to_dict()
+
+@router.put("/tariff", dependencies=[Depends(require_admin_token)])
+async def update_tariff(
+    config: TariffConfig,
+    reprice: bool = Query(True, description="Re-price stored pump logs with the new tariff")
+):
+    """
+    Replace the active tariff (time-of-use bands and monthly slabs) and,
+    by default, re-price every stored pump log with it. Requires the admin
+    token; the tariff is saved to TARIFF_FILE and loaded again on startup
+    """
+    global active_tariff
+    try:
+        tariff = Tariff(
+            config.name,
+            [TariffBand(b.name, b.start_hour, b.end_hour, b.multiplier) for b in config.bands],
+            [TariffSlab(s.up_to_kwh, s.rate) for s in config.slabs]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        save_tariff(tariff)
+    except OSError:
+        logger.exception("Error saving tariff to %s", TARIFF_FILE)
+        raise HTTPException(status_code=500, detail="Could not save the tariff")
+    active_tariff = tariff
+    repriced = 0
+    if reprice:
+        loop = asyncio.get_event_loop()
+        repriced = await loop.run_in_executor(None, reprice_pump_logs_in_session, tariff)
+    
+    return {"tariff": tariff.to_dict(), "repriced_logs": repriced}
+
+@router.post("/tariff/reprice", dependencies=[Depends(require_admin_token)])
+async def reprice_logs(
+    since: Optional[str] = Query(None, description="YYYY-MM-DD; whole months from this date onward are re-priced")
+):
+    """Re-price stored pump logs with the active tariff. Requires the admin token"""
+    since_date = None
+    if since:
+        try:
+            since_date = datetime.strptime(since, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format")
+    
+    loop = asyncio.get_event_loop()
+    repriced = await loop.run_in_executor(None, reprice_pump_logs_in_session, active_tariff, since_date)
+    return {"tariff": active_tariff.name, "repriced_logs": repriced}
+
+@router.get("/forecast-grid")
+async def get_forecast_grid_status():
+    """Weather cells held in the precomputed forecast grid"""
+    return {
+        "cells": len(forecast_grid.cells),
+        "last_refresh": forecast_grid.last_refresh,
+        "refresh_interval_minutes": FORECAST_REFRESH_MINUTES
     }
 
+@router.post("/forecast-grid/refresh")
+async def refresh_forecast_grid(db: Session = Depends(get_db)):
+    """Re-fetch the forecast for every known cell and every farm location now"""
+    updated = await refresh_forecast_cells(db)
+    return {"cells": len(forecast_grid.cells), "updated": updated}
+
 @router.get("/leakage-detection")
 async def check_leakage(db: Session = Depends(get_db)):
     # Get recent sensor readings
@@ -149,17 +410,23 @@ async def get_optimal_schedule(
     crop_type: str,
     land_size: float,
     land_unit: str,
+    soil_type: str = "loam",
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
     db: Session = Depends(get_db)
 ):
     # Get weather forecast
-    weather_data = await get_weather_forecast()
+    weather_data = None
+    if latitude is not None and longitude is not None:
+        weather_data = await get_weather_forecast(latitude, longitude)
     
     # Calculate optimal watering times
     schedule = calculate_optimal_schedule(
         crop_type,
         land_size,
         land_unit,
-        weather_data
+        weather_data,
+        soil_type
     )
     
     return {
@@ -167,47 +434,262 @@ async def get_optimal_schedule(
         "weather_forecast": weather_data
     }
 
+@router.post("/optimal-schedule")
+async def create_optimal_schedule(request: OptimalScheduleRequest, db: Session = Depends(get_db)):
+    """
+    Plan irrigation windows for many fields over the forecast horizon.
+    Each field's daily demand is met from the cheapest pump hours available;
+    the plan is kept so later changes can be re-planned incrementally.
+    """
+    pumps = schedule_pumps(request.pumps)
+    if not pumps:
+        raise HTTPException(status_code=400, detail="No pumps available for scheduling")
+    
+    start = request.start_date or datetime.now().date()
+    fields = await build_field_demands(request.fields, start, request.days, db)
+    
+    planner = IrrigationPlanner(start, request.days, hourly_energy_prices(start, request.days))
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, planner.solve, fields, pumps)
+    
+    plan_id = uuid.uuid4().hex
+    schedule_plans[plan_id] = planner
+    while len(schedule_plans) > MAX_STORED_PLANS:
+        evicted, _ = schedule_plans.popitem(last=False)
+        schedule_plan_locks.pop(evicted, None)
+    
+    return {"plan_id": plan_id, **planner.to_dict()}
+
+@router.post("/optimal-schedule/{plan_id}/replan")
+async def replan_optimal_schedule(plan_id: str, request: ReplanRequest, db: Session = Depends(get_db)):
+    """
+    Apply changed fields or pumps to a stored plan. Only the fields whose
+    inputs changed, or whose windows used a changed pump, are re-planned;
+    the response lists just those fields with the updated plan totals.
+    """
+    planner = schedule_plans.get(plan_id)
+    if planner is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    
+    fields = await build_field_demands(request.fields, planner.start_date, planner.days, db)
+    pumps = schedule_pumps(request.pumps) if request.pumps else []
+    
+    lock = schedule_plan_locks.setdefault(plan_id, asyncio.Lock())
+    async with lock:
+        loop = asyncio.get_event_loop()
+        replanned = await loop.run_in_executor(
+            None,
+            lambda: planner.replan(fields, request.removed_field_ids, pumps, request.removed_pump_ids)
+        )
+        result = planner.to_dict(field_ids=replanned)
+    
+    return {"plan_id": plan_id, "replanned_fields": replanned, **result}
+
 # Helper functions
 def convert_to_hectares(size: float, unit: str) -> float:
-    conversions = {
-        "acre": 0.404686,
-        "hectare": 1,
-        "killa": 0.404686,  # Same as acre in many regions
-        "gaj": 0.000008361,
-        "sqmeter": 0.0001
-    }
-    return size * conversions.get(unit.lower(), 1)
+    return size * LAND_UNIT_TO_HECTARES.get(unit.lower(), 1)
+
+def calculate_weather_factors(et0_mm: np.ndarray, rainfall_mm: np.ndarray) -> np.ndarray:
+    """Demand scaling from daily reference evapotranspiration less effective rainfall"""
+    net = np.asarray(et0_mm, dtype=float) - EFFECTIVE_RAINFALL_SHARE * np.asarray(rainfall_mm, dtype=float)
+    return np.clip(net / REFERENCE_ET0_MM, 0, MAX_WEATHER_FACTOR)
+
+def merge_farm_entry(entry: WaterRequirementEntry, farm: Optional[models.Farm]) -> WaterRequirementEntry:
+    """Fill fields missing from an entry with the farm's stored values"""
+    if farm is None:
+        return entry
+    return WaterRequirementEntry(
+        farm_id=entry.farm_id,
+        crop_type=entry.crop_type or farm.current_crop,
+        land_size=entry.land_size or farm.size,
+        land_unit=entry.land_unit or farm.size_unit,
+        soil_type=entry.soil_type or farm.soil_type,
+        latitude=entry.latitude if entry.latitude is not None else farm.latitude,
+        longitude=entry.longitude if entry.longitude is not None else farm.longitude
+    )
 
-def calculate_weather_factor(weather_data: dict) -> float:
-    temperature = weather_data["temperature"]
-    humidity = weather_data["humidity"]
-    rainfall = weather_data["rainfall"]
+async def calculate_water_requirements(entries: List[WaterRequirementEntry]) -> List[dict]:
+    """
+    Daily water requirement for many entries, grouped by weather grid cell and
+    computed as array operations
+    """
+    results = [None] * len(entries)
+    valid = []
+    for i, entry in enumerate(entries):
+        if not entry.crop_type or not entry.land_size or not entry.land_unit:
+            results[i] = {
+                "farm_id": entry.farm_id,
+                "daily_requirement_liters": None,
+                "error": "crop_type, land_size and land_unit are required"
+            }
+        else:
+            valid.append(i)
     
-    # Base factor
-    factor = 1.0
+    # One precomputed forecast per grid cell shared by every entry inside it
+    cell_of = {}
+    for i in valid:
+        entry = entries[i]
+        if entry.latitude is not None and entry.longitude is not None:
+            cell_of[i] = forecast_grid.cell_of(entry.latitude, entry.longitude)
+    forecasts = await fetch_forecast_by_cell(sorted(set(cell_of.values())))
     
-    # Temperature adjustment
-    if temperature > 35:
-        factor *= 1.2
-    elif temperature < 20:
-        factor *= 0.8
+    today = datetime.now().date()
+    days = {cell: forecast_day(forecast, today) for cell, forecast in forecasts.items()}
+    et0 = np.array([(days.get(cell_of.get(i)) or {}).get("et0_mm", REFERENCE_ET0_MM) for i in valid], dtype=float)
+    rainfall = np.array([(days.get(cell_of.get(i)) or {}).get("rainfall", 0) for i in valid], dtype=float)
     
-    # Humidity adjustment
-    if humidity < 40:
-        factor *= 1.2
-    elif humidity > 80:
-        factor *= 0.8
+    size = np.array([entries[i].land_size for i in valid], dtype=float)
+    unit_factor = np.array([LAND_UNIT_TO_HECTARES.get(entries[i].land_unit.lower(), 1) for i in valid], dtype=float)
+    soil = np.array([SOIL_MOISTURE_FACTOR.get((entries[i].soil_type or "loam").lower(), 1.0) for i in valid], dtype=float)
+    weather_factor = calculate_weather_factors(et0, rainfall)
     
-    # Rainfall adjustment
-    if rainfall > 0:
-        factor *= max(0.5, 1 - (rainfall * 0.1))
+    daily = base_daily_requirements([entries[i] for i in valid]) * weather_factor
     
-    return factor
+    for k, i in enumerate(valid):
+        entry = entries[i]
+        cell = cell_of.get(i)
+        results[i] = {
+            "farm_id": entry.farm_id,
+            "crop_type": entry.crop_type,
+            "size_in_hectares": round(float(size[k] * unit_factor[k]), 4),
+            "daily_requirement_liters": round(float(daily[k]), 2),
+            "daily_requirement_cubic_meters": round(float(daily[k]) / 1000, 2),
+            "factors": {
+                "soil_factor": float(soil[k]),
+                "weather_factor": round(float(weather_factor[k]), 4),
+                "et0_mm": round(float(et0[k]), 2)
+            },
+            "weather_cell": list(cell) if cell else None,
+            "weather_available": days.get(cell) is not None
+        }
+    
+    return results
 
-def get_pump_logs(db: Session, start_date: datetime, end_date: datetime):
-    return db.query(models.PumpLog).filter(
-        models.PumpLog.timestamp.between(start_date, end_date)
-    ).all()
+def filter_pump_logs(query, start_date: datetime, end_date: datetime, farm_id: Optional[int] = None):
+    """Half-open [start_date, end_date) range on start_time, optionally for one farm"""
+    query = query.filter(
+        models.PumpLog.start_time >= start_date,
+        models.PumpLog.start_time < end_date
+    )
+    if farm_id is not None:
+        query = query.filter(models.PumpLog.farm_id == farm_id)
+    return query
+
+def get_daily_pump_usage(db: Session, start_date: datetime, end_date: datetime, farm_id: Optional[int] = None):
+    """Pump runs, hours, energy and cost per farm and day, summed in SQL"""
+    day = func.date(models.PumpLog.start_time)
+    rows = filter_pump_logs(
+        db.query(
+            models.PumpLog.farm_id,
+            day.label("day"),
+            func.count(models.PumpLog.id),
+            func.coalesce(func.sum(models.PumpLog.duration), 0),
+            func.coalesce(func.sum(models.PumpLog.energy_consumed), 0),
+            func.coalesce(func.sum(models.PumpLog.cost), 0)
+        ),
+        start_date, end_date, farm_id
+    ).group_by(models.PumpLog.farm_id, day).order_by(day, models.PumpLog.farm_id).all()
+    
+    return [
+        {
+            "farm_id": row_farm_id,
+            "date": str(row_day),
+            "runs": runs,
+            "hours": round(hours, 2),
+            "energy_kwh": round(energy, 2),
+            "cost_rs": round(cost, 2)
+        }
+        for row_farm_id, row_day, runs, hours, energy, cost in rows
+    ]
+
+def get_pump_logs(db: Session, start_date: datetime, end_date: datetime, farm_id: Optional[int] = None,
+                  skip: int = 0, limit: int = 100):
+    logs = filter_pump_logs(db.query(models.PumpLog), start_date, end_date, farm_id)\
+        .order_by(models.PumpLog.start_time, models.PumpLog.id)\
+        .offset(skip)\
+        .limit(limit)\
+        .all()
+    return [
+        {
+            "id": log.id,
+            "farm_id": log.farm_id,
+            "start_time": log.start_time,
+            "end_time": log.end_time,
+            "duration": log.duration,
+            "power_rating": log.power_rating,
+            "energy_consumed": log.energy_consumed,
+            "cost": log.cost
+        }
+        for log in logs
+    ]
+
+def effective_rate(energy_kwh: float, logged_energy: float, logged_cost: float) -> float:
+    """
+    Rs per kWh for estimated consumption: the tariff-priced rate of the logged
+    runs when there are any, otherwise the slab average for that much energy
+    """
+    if logged_energy > 0:
+        return logged_cost / logged_energy
+    if energy_kwh > 0:
+        return float(active_tariff.cumulative_cost(energy_kwh)) / energy_kwh
+    return float(active_tariff.cumulative_cost(1.0))
+
+def reprice_pump_logs(db: Session, tariff: Tariff, since: Optional[datetime] = None) -> int:
+    """
+    Recompute PumpLog.cost under a tariff. Logs are read as plain columns a
+    batch of farms at a time (slabs reset per farm and month) and priced as
+    arrays, then written back with bulk updates.
+    """
+    month_start = since.replace(day=1, hour=0, minute=0, second=0, microsecond=0) if since else None
+    
+    def in_range(query):
+        query = query.filter(models.PumpLog.start_time.isnot(None))
+        if month_start is not None:
+            query = query.filter(models.PumpLog.start_time >= month_start)
+        return query
+    
+    farm_ids = [farm_id for (farm_id,) in in_range(db.query(models.PumpLog.farm_id).distinct())]
+    repriced = 0
+    for i in range(0, len(farm_ids), REPRICE_FARMS_PER_BATCH):
+        batch = farm_ids[i:i + REPRICE_FARMS_PER_BATCH]
+        condition = models.PumpLog.farm_id.in_([f for f in batch if f is not None])
+        if None in batch:
+            condition = or_(condition, models.PumpLog.farm_id.is_(None))
+        rows = in_range(db.query(
+            models.PumpLog.id,
+            models.PumpLog.farm_id,
+            models.PumpLog.start_time,
+            models.PumpLog.end_time,
+            models.PumpLog.energy_consumed
+        )).filter(condition).all()
+        if not rows:
+            continue
+        
+        ids, farms, starts, ends, energy = zip(*rows)
+        costs = tariff.price(
+            np.array([-1 if f is None else f for f in farms]),
+            to_epoch_seconds(starts),
+            to_epoch_seconds([end or start for start, end in zip(starts, ends)]),
+            np.array([e or 0 for e in energy], dtype=float)
+        )
+        
+        for j in range(0, len(ids), REPRICE_UPDATE_CHUNK):
+            db.bulk_update_mappings(models.PumpLog, [
+                {"id": log_id, "cost": round(float(cost), 2)}
+                for log_id, cost in zip(ids[j:j + REPRICE_UPDATE_CHUNK], costs[j:j + REPRICE_UPDATE_CHUNK])
+            ])
+        db.commit()
+        repriced += len(ids)
+    
+    return repriced
+
+def reprice_pump_logs_in_session(tariff: Tariff, since: Optional[datetime] = None) -> int:
+    """reprice_pump_logs on a session of its own: run on a worker thread, it can't share the request's"""
+    db = SessionLocal()
+    try:
+        return reprice_pump_logs(db, tariff, since)
+    finally:
+        db.close()
 
 def get_recent_flow_readings(db: Session):
     # Get last 24 hours of readings
@@ -254,10 +736,164 @@ def generate_leakage_recommendations(anomalies: List[dict]):
             )
     return recommendations
 
-async def get_weather_forecast():
-    # Implement 5-day weather forecast fetch from OpenWeather API
-    pass
+async def get_weather_forecast(lat: float, lon: float) -> Optional[List[dict]]:
+    """Daily forecast with reference evapotranspiration from the forecast grid (None if unavailable)"""
+    forecast = await forecast_grid.get(lat, lon)
+    return forecast.daily[:FORECAST_DAYS] if forecast else None
+
+async def fetch_forecast_by_cell(cells: List[Tuple[float, float]]) -> Dict[Tuple[float, float], Optional[List[dict]]]:
+    """Daily forecast for each weather grid cell from the grid, fetching only cells it lacks"""
+    forecasts = await forecast_grid.get_cells(cells)
+    return {cell: forecast.daily if forecast else None for cell, forecast in forecasts.items()}
+
+def describe_farm_matches(db: Session, matches: List[Tuple[float, int]]) -> List[dict]:
+    """Farm details for (distance_km, farm_id) index matches, in match order"""
+    farms = {}
+    if matches:
+        farms = {farm.id: farm for farm in db.query(models.Farm).filter(models.Farm.id.in_([fid for _, fid in matches]))}
+    return [
+        {
+            "farm_id": farm_id,
+            "name": farms[farm_id].name if farm_id in farms else None,
+            "latitude": farm_index.points.get(farm_id, (None, None))[0],
+            "longitude": farm_index.points.get(farm_id, (None, None))[1],
+            "distance_km": round(distance, 3)
+        }
+        for distance, farm_id in matches
+    ]
+
+@router.on_event("startup")
+async def load_farm_index():
+    db = SessionLocal()
+    try:
+        farm_index.reload(db)
+    except Exception:
+        logger.exception("Loading farm index failed")
+    finally:
+        db.close()
+
+def farm_forecast_cells(db: Session) -> List[Tuple[float, float]]:
+    locations = db.query(models.Farm.latitude, models.Farm.longitude).filter(
+        models.Farm.latitude.isnot(None),
+        models.Farm.longitude.isnot(None)
+    ).distinct()
+    return sorted({forecast_grid.cell_of(lat, lon) for lat, lon in locations})
+
+async def refresh_forecast_cells(db: Session) -> int:
+    """Fetch each grid cell once (farm locations plus cells requested so far) and recompute ET0"""
+    return await forecast_grid.refresh(farm_forecast_cells(db))
+
+async def forecast_refresh_loop():
+    """Keep the forecast grid current so requests read it instead of calling the weather API"""
+    while True:
+        try:
+            db = SessionLocal()
+            try:
+                await refresh_forecast_cells(db)
+            finally:
+                db.close()
+        except Exception:
+            logger.exception("Forecast refresh failed")
+        await asyncio.sleep(FORECAST_REFRESH_MINUTES * 60)
+
+@router.on_event("startup")
+async def start_forecast_refresh():
+    if FORECAST_REFRESH_MINUTES > 0:
+        asyncio.create_task(forecast_refresh_loop())
+
+def forecast_day(forecast: Optional[List[dict]], day: date) -> Optional[dict]:
+    return next((d for d in forecast or [] if d["date"] == day.isoformat()), None)
+
+def base_daily_requirements(entries: List[WaterRequirementEntry]) -> np.ndarray:
+    """Daily water requirement in liters before weather adjustment"""
+    size = np.array([e.land_size for e in entries], dtype=float)
+    unit_factor = np.array([LAND_UNIT_TO_HECTARES.get(e.land_unit.lower(), 1) for e in entries], dtype=float)
+    base = np.array([CROP_WATER_REQUIREMENTS.get(e.crop_type.lower(), 500) for e in entries], dtype=float)
+    soil = np.array([SOIL_MOISTURE_FACTOR.get((e.soil_type or "loam").lower(), 1.0) for e in entries], dtype=float)
+    return base * size * unit_factor * 10000 * soil / GROWING_SEASON_DAYS
+
+def forecast_weather_factors(forecast: Optional[List[dict]], start: date, days: int) -> np.ndarray:
+    """Weather factor for each planned day (neutral where the forecast has no data)"""
+    by_date = {day["date"]: day for day in forecast or []}
+    neutral = {"et0_mm": REFERENCE_ET0_MM, "rainfall": 0}
+    conditions = [by_date.get((start + timedelta(days=d)).isoformat(), neutral) for d in range(days)]
+    return calculate_weather_factors(
+        np.array([c["et0_mm"] for c in conditions], dtype=float),
+        np.array([c["rainfall"] for c in conditions], dtype=float)
+    )
+
+async def build_field_demands(fields: List[ScheduleField], start: date, days: int, db: Session) -> List[FieldDemand]:
+    """Per-day demand for each field, fetching farm details and one forecast per grid cell"""
+    if not fields:
+        return []
+    farm_ids = {f.farm_id for f in fields if f.farm_id is not None}
+    farms = {}
+    if farm_ids:
+        farms = {farm.id: farm for farm in db.query(models.Farm).filter(models.Farm.id.in_(farm_ids))}
+    entries = [merge_farm_entry(f, farms.get(f.farm_id)) for f in fields]
+    
+    missing = [f.field_id for f, e in zip(fields, entries)
+               if f.daily_requirement_liters is None and not (e.crop_type and e.land_size and e.land_unit)]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"crop_type, land_size and land_unit are required for fields: {', '.join(missing)}"
+        )
+    
+    cell_of = {}
+    for i, entry in enumerate(entries):
+        if entry.latitude is not None and entry.longitude is not None:
+            cell_of[i] = forecast_grid.cell_of(entry.latitude, entry.longitude)
+    forecasts = await fetch_forecast_by_cell(sorted(set(cell_of.values())))
+    factors = {cell: forecast_weather_factors(forecasts[cell], start, days) for cell in forecasts}
+    neutral = forecast_weather_factors(None, start, days)
+    
+    computable = [i for i, f in enumerate(fields) if f.daily_requirement_liters is None]
+    base = dict(zip(computable, base_daily_requirements([entries[i] for i in computable])))
+    
+    demands = []
+    for i, field in enumerate(fields):
+        if field.daily_requirement_liters is not None:
+            daily = np.full(days, field.daily_requirement_liters)
+        else:
+            daily = base[i] * factors.get(cell_of.get(i), neutral)
+        demands.append(FieldDemand(field.field_id, daily, field.pump_ids))
+    return demands
+
+def schedule_pumps(pumps: Optional[List[SchedulePump]]) -> List[PumpCapacity]:
+    """Pumps given in the request, or every fleet pump that can run"""
+    if pumps is None:
+        unavailable = (pump_stats.PumpStatus.MAINTENANCE, pump_stats.PumpStatus.ERROR)
+        return [
+            PumpCapacity(p["id"], p["max_flow_rate"], p["power_rating"] * HP_TO_KW)
+            for p in pump_stats.pumps_db if p["status"] not in unavailable
+        ]
+    return [PumpCapacity(p.pump_id, p.max_flow_rate, p.power_rating * HP_TO_KW) for p in pumps]
 
-def calculate_optimal_schedule(crop_type: str, land_size: float, land_unit: str, weather_forecast: dict):
-    # Implementation for optimal schedule calculation
-    pass
\ No newline at end of file
+def hourly_energy_prices(start: date, days: int) -> np.ndarray:
+    """Marginal energy price (Rs/kWh) for each hour of the planning horizon under the active tariff"""
+    return np.tile(active_tariff.marginal_rate * active_tariff.hourly_multipliers(), days)
+
+def calculate_optimal_schedule(
+    crop_type: str,
+    land_size: float,
+    land_unit: str,
+    weather_forecast: Optional[List[dict]],
+    soil_type: str = "loam"
+):
+    """Single-field plan over the forecast horizon using the fleet's available pumps"""
+    start = datetime.now().date()
+    entry = WaterRequirementEntry(crop_type=crop_type, land_size=land_size, land_unit=land_unit, soil_type=soil_type)
+    daily = base_daily_requirements([entry])[0] * forecast_weather_factors(weather_forecast, start, FORECAST_DAYS)
+    
+    planner = IrrigationPlanner(start, FORECAST_DAYS, hourly_energy_prices(start, FORECAST_DAYS))
+    planner.solve([FieldDemand(crop_type, daily)], schedule_pumps(None))
+    plan = planner.to_dict()
+    field = plan["fields"][0]
+    return {
+        "daily_requirement_liters": [round(float(v), 2) for v in daily],
+        "windows": field["windows"],
+        "total_energy_kwh": plan["total_energy_kwh"],
+        "total_energy_cost": plan["total_energy_cost"],
+        "unmet_liters": field["unmet_liters"]
+    }
\ No newline at end of file
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from api.database import get_db
+from api.fast_json import fast_json_list
 from api.models import models, schemas
 from api.routes.auth import get_current_user
 from api.routes.alerts import send_alert
@@ -96,4 +97,4 @@ def read_hazard_logs(
         .offset(skip)\
         .limit(limit)\
         .all()
-    return hazard_logs
\ No newline at end of file
+    return fast_json_list(schemas.HazardLog, hazard_logs)
\ No newline at end of file
@@ -1,7 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
-from datetime import datetime, date
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+from datetime import datetime, date, timedelta
 from pydantic import BaseModel
+from api.database import get_db
+from api.memory import track_store
+from api.models import models
+from api.routes import pump_stats
+from api.services.interval_tree import KeyedIntervalTrees
+from api.services.recurrence import OccurrenceException, RecurrenceRule, RecurringSeries
+from api.services.schedule_executor import ScheduleExecutor
+from api.services.schedule_index import ScheduleIndex
+from api.services.timing_wheel import to_ticks
+from api.store_versions import get_store_version
+import asyncio
+import copy
+import heapq
+import os
 
 router = APIRouter()
 
@@ -13,12 +29,13 @@ class IrrigationScheduleBase(BaseModel):
     startTime: str
     endTime: str
     waterUsed: int
-    date: str
+    date: date  # accepts and returns YYYY-MM-DD
     weather: str
     nextSchedule: Optional[str] = None
     workerName: str
     status: str
     notes: Optional[str] = None
+    pumpId: Optional[int] = None
 
 class IrrigationScheduleCreate(IrrigationScheduleBase):
     pass
@@ -30,14 +47,391 @@ class IrrigationSchedule(IrrigationScheduleBase):
     id: int
     createdAt: Optional[datetime] = None
     updatedAt: Optional[datetime] = None
+    # Set on occurrences of a recurring schedule. Occurrences aren't stored, so
+    # their id is negative, derived from (recurrenceId, occurrenceDate), and
+    # they are changed through /irrigation-recurrences/{recurrenceId}/occurrences/{occurrenceDate}
+    recurrenceId: Optional[int] = None
+    occurrenceDate: Optional[date] = None
 
     class Config:
         orm_mode = True
 
+# Recurring schedules: one record expanded into occurrences on demand
+class IrrigationRecurrenceBase(BaseModel):
+    cropName: str
+    fieldLocation: str
+    moistureLevel: int
+    startTime: str
+    endTime: str
+    waterUsed: int
+    weather: str
+    workerName: str
+    status: str = "pending"
+    notes: Optional[str] = None
+    pumpId: Optional[int] = None
+    frequency: str  # daily, interval (every `interval` days) or weekdays
+    interval: int = 1
+    weekdays: Optional[List[int]] = None  # 0 = Monday
+    startDate: date
+    untilDate: Optional[date] = None
+    cropScheduleId: Optional[int] = None  # stop at this crop schedule's expected harvest
+
+class IrrigationRecurrenceCreate(IrrigationRecurrenceBase):
+    pass
+
+class IrrigationRecurrence(IrrigationRecurrenceBase):
+    id: int
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class OccurrenceUpdate(BaseModel):
+    skip: bool = False
+    moveTo: Optional[date] = None
+    startTime: Optional[str] = None
+    endTime: Optional[str] = None
+    moistureLevel: Optional[int] = None
+    waterUsed: Optional[int] = None
+    weather: Optional[str] = None
+    workerName: Optional[str] = None
+    status: Optional[str] = None
+    notes: Optional[str] = None
+
+class ScheduleChanges(BaseModel):
+    version: int
+    epoch: str
+    full: bool  # the upserts are every schedule and recurrence; replace the local copy
+    upserts: List[IrrigationSchedule]
+    # Recurrences whose rule or occurrences changed; refetch their occurrences
+    recurrenceUpserts: List[IrrigationRecurrence]
+    deletes: List[int]  # schedule or recurrence ids
+
 # In-memory storage (replace with database in production)
 irrigation_schedules_db = {}
 schedule_id_counter = 1
 
+# Recurrences take their ids from schedule_id_counter too, so the two never collide
+irrigation_recurrences_db: Dict[int, IrrigationRecurrence] = {}
+recurrence_series: Dict[int, RecurringSeries] = {}
+RECURRENCE_HORIZON_DAYS = 90  # how far ahead open-ended recurrences are listed by default
+OCCURRENCE_FIELDS = [
+    "cropName", "fieldLocation", "moistureLevel", "startTime", "endTime", "waterUsed",
+    "weather", "workerName", "notes", "pumpId"
+]
+
+# Bumped on every write to schedules, recurrences or occurrences; occurrence
+# changes are logged under their recurrence's id
+irrigation_store = get_store_version("irrigation_schedules")
+track_store("irrigation_schedules", lambda: irrigation_schedules_db)
+track_store("irrigation_recurrences", lambda: irrigation_recurrences_db, version="irrigation_schedules")
+
+# Secondary indexes over irrigation_schedules_db, updated on every write
+schedule_index = ScheduleIndex()
+
+# Irrigation windows (minutes since 0001-01-01) per field and per pump, for overlap checks
+field_windows = KeyedIntervalTrees()
+pump_windows = KeyedIntervalTrees()
+
+MINUTES_PER_DAY = 1440
+OCCURRENCE_ID_STRIDE = 10 ** 7  # above date.max.toordinal(), so occurrence ids never collide
+EXECUTOR_TICK_SECONDS = float(os.getenv("IRRIGATION_EXECUTOR_TICK_SECONDS", "1"))
+
+def parse_date_param(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}, expected YYYY-MM-DD")
+
+def parse_time_of_day(value: str, name: str) -> int:
+    """Minutes after midnight for HH:MM or HH:MM:SS"""
+    for fmt in ("%H:%M", "%H:%M:%S"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+            return parsed.hour * 60 + parsed.minute
+        except ValueError:
+            continue
+    raise HTTPException(status_code=400, detail=f"Invalid {name}, expected HH:MM")
+
+def schedule_window(schedule: IrrigationScheduleBase) -> Tuple[int, int]:
+    """[start, end) of a schedule in minutes; an end at or before the start runs past midnight"""
+    day = schedule.date.toordinal() * MINUTES_PER_DAY
+    start = day + parse_time_of_day(schedule.startTime, "startTime")
+    end = day + parse_time_of_day(schedule.endTime, "endTime")
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+def window_time(minutes: int) -> datetime:
+    return datetime.combine(date.fromordinal(minutes // MINUTES_PER_DAY), datetime.min.time()) + timedelta(minutes=minutes % MINUTES_PER_DAY)
+
+def field_key(schedule: IrrigationScheduleBase) -> str:
+    return schedule.fieldLocation.strip().lower()
+
+def find_conflicts(
+    schedule: IrrigationScheduleBase,
+    window: Tuple[int, int],
+    exclude: Optional[int] = None,
+    exclude_recurrence: Optional[int] = None
+) -> List[dict]:
+    """Stored schedules and recurrence occurrences sharing the field or the pump at an overlapping time"""
+    conflicts = [
+        {"type": "field", "schedule_id": sid, "start": window_time(start), "end": window_time(end)}
+        for start, end, sid in field_windows.overlapping(field_key(schedule), *window, exclude=exclude)
+    ]
+    if schedule.pumpId is not None:
+        conflicts += [
+            {"type": "pump", "schedule_id": sid, "start": window_time(start), "end": window_time(end)}
+            for start, end, sid in pump_windows.overlapping(schedule.pumpId, *window, exclude=exclude)
+        ]
+    return conflicts + occurrence_conflicts(schedule, window, exclude_recurrence)
+
+def check_conflicts(
+    schedule: IrrigationScheduleBase,
+    window: Tuple[int, int],
+    allow_conflicts: bool,
+    response: Response,
+    exclude: Optional[int] = None
+):
+    """409 on overlap, or with allowConflicts the overlapping ids in X-Schedule-Conflicts"""
+    raise_conflicts(find_conflicts(schedule, window, exclude), allow_conflicts, response)
+
+def raise_conflicts(conflicts: List[dict], allow_conflicts: bool, response: Response):
+    if not conflicts:
+        return
+    if not allow_conflicts:
+        raise HTTPException(status_code=409, detail={
+            "message": "Schedule overlaps another schedule on the same field or pump",
+            "conflicts": jsonable_encoder(conflicts)
+        })
+    response.headers["X-Schedule-Conflicts"] = ",".join(str(sid) for sid in sorted({c["schedule_id"] for c in conflicts}))
+
+def index_windows(schedule: IrrigationSchedule, window: Tuple[int, int]):
+    field_windows.add(field_key(schedule), *window, schedule.id)
+    if schedule.pumpId is not None:
+        pump_windows.add(schedule.pumpId, *window, schedule.id)
+
+def unindex_windows(schedule: IrrigationSchedule):
+    field_windows.remove(field_key(schedule), schedule.id)
+    if schedule.pumpId is not None:
+        pump_windows.remove(schedule.pumpId, schedule.id)
+
+# Recurring schedule expansion
+
+def build_rule(recurrence: IrrigationRecurrenceBase) -> RecurrenceRule:
+    try:
+        return RecurrenceRule(
+            recurrence.frequency,
+            recurrence.startDate,
+            until=recurrence.untilDate,
+            interval=recurrence.interval,
+            weekdays=recurrence.weekdays
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def occurrence_id(recurrence_id: int, original: date) -> int:
+    return -(recurrence_id * OCCURRENCE_ID_STRIDE + original.toordinal())
+
+def occurrence_schedule(
+    recurrence: IrrigationRecurrence,
+    original: date,
+    actual: date,
+    exception: Optional[OccurrenceException],
+    series: Optional[RecurringSeries] = None
+) -> IrrigationSchedule:
+    series = series or recurrence_series[recurrence.id]
+    fields = {name: getattr(recurrence, name) for name in OCCURRENCE_FIELDS}
+    if exception is not None:
+        fields.update(exception.fields)
+    fields["status"] = series.status_of(original, exception, recurrence.status)
+    return IrrigationSchedule.construct(
+        id=occurrence_id(recurrence.id, original),
+        date=actual,
+        nextSchedule=None,
+        createdAt=recurrence.createdAt,
+        updatedAt=recurrence.updatedAt,
+        recurrenceId=recurrence.id,
+        occurrenceDate=original,
+        **fields
+    )
+
+def recurrence_occurrences(
+    recurrence: IrrigationRecurrence,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    series: Optional[RecurringSeries] = None
+) -> Iterator[IrrigationSchedule]:
+    """Occurrences of one recurrence in [start, end]; open-ended ones stop at the default horizon"""
+    if end is None and recurrence.untilDate is None:
+        end = date.today() + timedelta(days=RECURRENCE_HORIZON_DAYS)
+    series = series or recurrence_series[recurrence.id]
+    for original, actual, exception in series.occurrences(start, end):
+        yield occurrence_schedule(recurrence, original, actual, exception, series)
+
+def expand_occurrences(
+    status: Optional[str] = None,
+    crop: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> Iterator[IrrigationSchedule]:
+    """Occurrences of every recurrence in the window matching the filters, in date and time order"""
+    streams = [
+        recurrence_occurrences(recurrence, start, end)
+        for recurrence in irrigation_recurrences_db.values()
+        if not crop or recurrence.cropName.lower() == crop.lower()
+    ]
+    for occurrence in heapq.merge(*streams, key=lambda s: (s.date, s.startTime, s.id)):
+        if not status or occurrence.status.lower() == status.lower():
+            yield occurrence
+
+def occurrence_conflicts(schedule: IrrigationScheduleBase, window: Tuple[int, int], exclude_recurrence: Optional[int] = None) -> List[dict]:
+    """Occurrences of other recurrences sharing the schedule's field or pump at an overlapping time"""
+    # An occurrence from the day before can run past midnight into the window
+    first_day = date.fromordinal(window[0] // MINUTES_PER_DAY - 1)
+    last_day = date.fromordinal((window[1] - 1) // MINUTES_PER_DAY)
+    conflicts = []
+    for recurrence in irrigation_recurrences_db.values():
+        if recurrence.id == exclude_recurrence:
+            continue
+        same_field = field_key(recurrence) == field_key(schedule)
+        same_pump = schedule.pumpId is not None and recurrence.pumpId == schedule.pumpId
+        if not same_field and not same_pump:
+            continue
+        for occurrence in recurrence_occurrences(recurrence, first_day, last_day):
+            start, end = schedule_window(occurrence)
+            if start < window[1] and window[0] < end:
+                for kind in [k for k, shared in (("field", same_field), ("pump", same_pump)) if shared]:
+                    conflicts.append({
+                        "type": kind, "schedule_id": occurrence.id, "recurrence_id": recurrence.id,
+                        "start": window_time(start), "end": window_time(end)
+                    })
+    return conflicts
+
+def check_recurrence_conflicts(
+    recurrence: IrrigationRecurrence,
+    series: RecurringSeries,
+    allow_conflicts: bool,
+    response: Response,
+    only: Optional[date] = None
+):
+    """
+    Conflict check for a recurrence's occurrences from today on (or just the
+    one with original date `only`), against schedules and other recurrences
+    """
+    start = max(recurrence.startDate, date.today())
+    conflicts = []
+    for occurrence in recurrence_occurrences(recurrence, start, None, series):
+        if only is not None and occurrence.occurrenceDate != only:
+            continue
+        for conflict in find_conflicts(occurrence, schedule_window(occurrence), exclude_recurrence=recurrence.id):
+            conflicts.append({**conflict, "occurrence_date": occurrence.occurrenceDate})
+    raise_conflicts(conflicts, allow_conflicts, response)
+
+# Executor: starts and stops pumps on schedule and moves statuses along
+
+def set_schedule_status(schedule_id: Hashable, status: str):
+    if isinstance(schedule_id, tuple):
+        recurrence_id, original = schedule_id
+        if recurrence_id in recurrence_series:
+            recurrence_series[recurrence_id].set_status(original, status)
+            irrigation_store.bump([recurrence_id])
+        return
+    schedule = irrigation_schedules_db.get(schedule_id)
+    if schedule is None or schedule.status == status:
+        return
+    updated = schedule.copy(update={"status": status, "updatedAt": datetime.now()})
+    schedule_index.remove(schedule)
+    irrigation_schedules_db[schedule_id] = updated
+    schedule_index.add(updated)
+    irrigation_store.bump([schedule_id])
+
+async def control_scheduled_pump(pump_id: int, action: pump_stats.ControlAction) -> bool:
+    """Same checks and effects as /api/pumps/control; False when the pump can't take the action"""
+    pump = next((p for p in pump_stats.pumps_db if p["id"] == pump_id), None)
+    if pump is None:
+        return False
+    async with pump_stats.get_pump_lock(pump_id):
+        if not pump_stats.validate_pump_status_change(pump_stats.PumpStatus(pump["status"]), action):
+            return False
+        pump_stats.apply_control_action(pump, action)
+    return True
+
+async def start_scheduled_pump(pump_id: int) -> bool:
+    return await control_scheduled_pump(pump_id, pump_stats.ControlAction.START)
+
+async def stop_scheduled_pump(pump_id: int) -> bool:
+    return await control_scheduled_pump(pump_id, pump_stats.ControlAction.STOP)
+
+async def schedule_done(schedule_id: Hashable):
+    """Move a recurrence on to its next occurrence once the armed one has finished"""
+    if isinstance(schedule_id, tuple):
+        recurrence_id, original = schedule_id
+        series = recurrence_series.get(recurrence_id)
+        if series is not None and series.armed is not None and series.armed[1] == original:
+            series.cursor, series.armed = series.armed, None
+            await arm_recurrence(recurrence_id)
+
+schedule_executor = ScheduleExecutor(start_scheduled_pump, stop_scheduled_pump, set_schedule_status, on_done=schedule_done)
+
+async def arm_schedule(schedule: IrrigationSchedule, window: Tuple[int, int]):
+    if EXECUTOR_TICK_SECONDS <= 0:
+        return
+    start, end = window
+    await schedule_executor.arm(schedule.id, start * 60, end * 60, schedule.pumpId, schedule.status)
+
+async def arm_recurrence(recurrence_id: int):
+    """
+    Arm the next occurrence of a recurrence after the last one it finished;
+    only one occurrence per recurrence is on the wheel at a time. Pending
+    occurrences that ended while nothing was armed are marked missed.
+    """
+    if EXECUTOR_TICK_SECONDS <= 0:
+        return
+    recurrence = irrigation_recurrences_db[recurrence_id]
+    series = recurrence_series[recurrence_id]
+    now = to_ticks(schedule_executor.clock.now())
+    target = None
+    if recurrence.status.lower() == "pending":
+        for original, actual, exception in series.occurrences(series.cursor[0]):
+            if (actual, original) <= series.cursor:
+                continue
+            occurrence = occurrence_schedule(recurrence, original, actual, exception)
+            status = occurrence.status.lower()
+            window = schedule_window(occurrence)
+            if status == "pending" and window[1] * 60 <= now:
+                series.set_status(original, "missed")
+                irrigation_store.bump([recurrence_id])
+            elif status in ("pending", "in progress"):
+                target = (actual, original), occurrence, window
+                break
+            series.cursor = (actual, original)
+    
+    if series.armed is not None and (target is None or series.armed != target[0]):
+        await schedule_executor.disarm((recurrence_id, series.armed[1]))
+    series.armed = None
+    if target is not None:
+        (actual, original), occurrence, (start, end) = target
+        series.armed = (actual, original)
+        await schedule_executor.arm((recurrence_id, original), start * 60, end * 60, occurrence.pumpId, occurrence.status)
+
+async def load_schedules_into_executor():
+    """Arm every stored schedule and recurrence; windows already begun or over are caught up"""
+    for schedule in list(irrigation_schedules_db.values()):
+        await arm_schedule(schedule, schedule_window(schedule))
+    for recurrence_id in list(irrigation_recurrences_db):
+        await arm_recurrence(recurrence_id)
+
+@router.on_event("startup")
+async def start_schedule_executor():
+    if EXECUTOR_TICK_SECONDS > 0:
+        schedule_executor.tick_seconds = EXECUTOR_TICK_SECONDS
+        await load_schedules_into_executor()
+        asyncio.create_task(schedule_executor.run())
+
 @router.get("/irrigation-schedules", response_model=List[IrrigationSchedule])
 async def get_all_schedules(
     status: Optional[str] = None,
@@ -48,22 +442,118 @@ async def get_all_schedules(
     """
     Get all irrigation schedules with optional filters
     """
-    schedules = list(irrigation_schedules_db.values())
+    start = parse_date_param(startDate, "startDate")
+    end = parse_date_param(endDate, "endDate")
     
-    # Apply filters
-    if status:
-        schedules = [s for s in schedules if s.status.lower() == status.lower()]
+    # Date range by bisect, status/crop by hash lookup, intersected
+    ids = schedule_index.query(status=status, crop=cropType, start=start, end=end)
+    if ids is None:
+        schedules = list(irrigation_schedules_db.values())
+    else:
+        schedules = [irrigation_schedules_db[sid] for sid in ids]
     
-    if cropType:
-        schedules = [s for s in schedules if s.cropName.lower() == cropType.lower()]
+    # Recurring schedules are expanded for the requested window only
+    return schedules + list(expand_occurrences(status=status, crop=cropType, start=start, end=end))
+
+@router.get("/irrigation-schedules/conflicts")
+async def get_schedule_conflicts(startDate: Optional[str] = None, endDate: Optional[str] = None):
+    """
+    List every pair of schedules that share a field or pump at overlapping times within the date range.
+    Recurrence occurrences are included under their (negative) occurrence ids; open-ended
+    recurrences are expanded up to the default horizon when no endDate is given.
+    """
+    start = parse_date_param(startDate, "startDate")
+    end = parse_date_param(endDate, "endDate")
+    lo = start.toordinal() * MINUTES_PER_DAY if start else 0
+    hi = (end.toordinal() + 1) * MINUTES_PER_DAY if end else (date.max.toordinal() + 2) * MINUTES_PER_DAY
+    
+    # Occurrences in the window (from the day before: they can run past midnight into it)
+    occurrences: Dict[int, IrrigationSchedule] = {}
+    occurrence_field_windows = KeyedIntervalTrees()
+    occurrence_pump_windows = KeyedIntervalTrees()
+    first_day = start - timedelta(days=1) if start and start > date.min else start
+    for recurrence in irrigation_recurrences_db.values():
+        for occurrence in recurrence_occurrences(recurrence, first_day, end):
+            occurrences[occurrence.id] = occurrence
+            window = schedule_window(occurrence)
+            occurrence_field_windows.add(field_key(occurrence), *window, occurrence.id)
+            if occurrence.pumpId is not None:
+                occurrence_pump_windows.add(occurrence.pumpId, *window, occurrence.id)
+    
+    def conflict(kind: str, key, a: tuple, b: tuple) -> dict:
+        schedule = irrigation_schedules_db.get(a[2]) or occurrences[a[2]]
+        return {
+            "type": kind,
+            "resource": schedule.fieldLocation if kind == "field" else key,
+            "schedule_ids": sorted((a[2], b[2])),
+            "overlap_start": window_time(max(a[0], b[0])),
+            "overlap_end": window_time(min(a[1], b[1]))
+        }
     
-    if startDate:
-        schedules = [s for s in schedules if s.date >= startDate]
+    conflicts = []
+    for kind, trees, occurrence_trees in (
+        ("field", field_windows, occurrence_field_windows),
+        ("pump", pump_windows, occurrence_pump_windows)
+    ):
+        # Schedule with schedule, occurrence with occurrence, then occurrence with schedule
+        for key, a, b in trees.overlapping_pairs(lo, hi):
+            conflicts.append(conflict(kind, key, a, b))
+        for key, a, b in occurrence_trees.overlapping_pairs(lo, hi):
+            conflicts.append(conflict(kind, key, a, b))
+        for key, tree in occurrence_trees.trees.items():
+            for a in tree.overlapping(lo, hi):
+                for b in trees.overlapping(key, a[0], a[1]):
+                    if max(a[0], b[0]) < hi and min(a[1], b[1]) > lo:
+                        conflicts.append(conflict(kind, key, a, b))
+    conflicts.sort(key=lambda c: (c["overlap_start"], c["schedule_ids"]))
+    
+    return {
+        "startDate": start,
+        "endDate": end,
+        "total_conflicts": len(conflicts),
+        "conflicts": conflicts
+    }
+
+@router.get("/irrigation-schedules/executor")
+async def get_executor_status():
+    """
+    Get the schedule executor's clock, armed timers and run counts
+    """
+    return {
+        "enabled": EXECUTOR_TICK_SECONDS > 0,
+        **schedule_executor.status()
+    }
+
+@router.get("/irrigation-schedules/changes", response_model=ScheduleChanges)
+async def get_schedule_changes(
+    since: Optional[int] = Query(None, ge=0, description="Version from the previous sync; omit for a full sync"),
+    epoch: Optional[str] = Query(None, description="Epoch from the previous sync")
+):
+    """
+    Get the schedules and recurrences created, updated or deleted since a version
+    (from the previous sync, with its epoch), for delta sync. Omitting `since`, or
+    a version the changelog no longer reaches back to, gets a full resync
+    """
+    changed = irrigation_store.changes_since(since, epoch) if since is not None else None
+    sync = {"version": irrigation_store.version, "epoch": irrigation_store.epoch}
     
-    if endDate:
-        schedules = [s for s in schedules if s.date <= endDate]
+    if changed is None:
+        return {
+            **sync,
+            "full": True,
+            "upserts": list(irrigation_schedules_db.values()),
+            "recurrenceUpserts": list(irrigation_recurrences_db.values()),
+            "deletes": []
+        }
     
-    return schedules
+    ids = sorted(changed)
+    return {
+        **sync,
+        "full": False,
+        "upserts": [irrigation_schedules_db[i] for i in ids if i in irrigation_schedules_db],
+        "recurrenceUpserts": [irrigation_recurrences_db[i] for i in ids if i in irrigation_recurrences_db],
+        "deletes": [i for i in ids if i not in irrigation_schedules_db and i not in irrigation_recurrences_db]
+    }
 
 @router.get("/irrigation-schedules/{schedule_id}", response_model=IrrigationSchedule)
 async def get_schedule(schedule_id: int):
@@ -76,12 +566,16 @@ async def get_schedule(schedule_id: int):
     return irrigation_schedules_db[schedule_id]
 
 @router.post("/irrigation-schedules", response_model=IrrigationSchedule)
-async def create_schedule(schedule: IrrigationScheduleCreate):
+async def create_schedule(schedule: IrrigationScheduleCreate, response: Response, allowConflicts: bool = False):
     """
-    Create a new irrigation schedule
+    Create a new irrigation schedule. Overlapping another schedule on the same
+    field or pump is rejected with 409 unless allowConflicts is set
     """
     global schedule_id_counter
     
+    window = schedule_window(schedule)
+    check_conflicts(schedule, window, allowConflicts, response)
+    
     new_schedule = IrrigationSchedule(
         id=schedule_id_counter,
         **schedule.dict(),
@@ -90,18 +584,26 @@ async def create_schedule(schedule: IrrigationScheduleCreate):
     )
     
     irrigation_schedules_db[schedule_id_counter] = new_schedule
+    schedule_index.add(new_schedule)
+    irrigation_store.bump([schedule_id_counter])
+    index_windows(new_schedule, window)
     schedule_id_counter += 1
     
-    return new_schedule
+    await arm_schedule(new_schedule, window)
+    
+    return irrigation_schedules_db[new_schedule.id]
 
 @router.put("/irrigation-schedules/{schedule_id}", response_model=IrrigationSchedule)
-async def update_schedule(schedule_id: int, schedule: IrrigationScheduleUpdate):
+async def update_schedule(schedule_id: int, schedule: IrrigationScheduleUpdate, response: Response, allowConflicts: bool = False):
     """
-    Update an existing irrigation schedule
+    Update an existing irrigation schedule. Overlaps are handled as in create
     """
     if schedule_id not in irrigation_schedules_db:
         raise HTTPException(status_code=404, detail="Schedule not found")
     
+    window = schedule_window(schedule)
+    check_conflicts(schedule, window, allowConflicts, response, exclude=schedule_id)
+    
     updated_schedule = IrrigationSchedule(
         id=schedule_id,
         **schedule.dict(),
@@ -109,9 +611,16 @@ async def update_schedule(schedule_id: int, schedule: IrrigationScheduleUpdate):
         updatedAt=datetime.now()
     )
     
+    schedule_index.remove(irrigation_schedules_db[schedule_id])
+    unindex_windows(irrigation_schedules_db[schedule_id])
     irrigation_schedules_db[schedule_id] = updated_schedule
+    schedule_index.add(updated_schedule)
+    irrigation_store.bump([schedule_id])
+    index_windows(updated_schedule, window)
     
-    return updated_schedule
+    await arm_schedule(updated_schedule, window)
+    
+    return irrigation_schedules_db[schedule_id]
 
 @router.delete("/irrigation-schedules/{schedule_id}")
 async def delete_schedule(schedule_id: int):
@@ -122,6 +631,10 @@ async def delete_schedule(schedule_id: int):
         raise HTTPException(status_code=404, detail="Schedule not found")
     
     deleted_schedule = irrigation_schedules_db.pop(schedule_id)
+    schedule_index.remove(deleted_schedule)
+    irrigation_store.bump([schedule_id])
+    unindex_windows(deleted_schedule)
+    await schedule_executor.disarm(schedule_id)
     
     return {
         "message": "Schedule deleted successfully",
@@ -133,8 +646,9 @@ async def get_today_stats():
     """
     Get statistics for today's irrigation schedules
     """
-    today = date.today().isoformat()
-    today_schedules = [s for s in irrigation_schedules_db.values() if s.date == today]
+    today = date.today()
+    today_schedules = [irrigation_schedules_db[sid] for sid in schedule_index.on(today)]
+    today_schedules += expand_occurrences(start=today, end=today)
     
     completed = len([s for s in today_schedules if s.status.lower() == "completed"])
     pending = len([s for s in today_schedules if s.status.lower() == "pending"])
@@ -155,19 +669,30 @@ async def get_summary_stats():
     """
     Get summary statistics for all irrigation schedules
     """
-    all_schedules = list(irrigation_schedules_db.values())
-    
-    total = len(all_schedules)
-    completed = len([s for s in all_schedules if s.status.lower() == "completed"])
-    pending = len([s for s in all_schedules if s.status.lower() == "pending"])
-    in_progress = len([s for s in all_schedules if s.status.lower() == "in progress"])
+    total = len(irrigation_schedules_db)
+    completed_ids = schedule_index.status("completed")
+    completed = len(completed_ids)
+    pending = len(schedule_index.status("pending"))
+    in_progress = len(schedule_index.status("in progress"))
     
     # Calculate total water usage
-    total_water = sum(s.waterUsed for s in all_schedules if s.status.lower() == "completed")
+    total_water = sum(irrigation_schedules_db[sid].waterUsed for sid in completed_ids)
+    
+    # Recurring schedules count every occurrence up to their end (or the default horizon)
+    for occurrence in expand_occurrences():
+        total += 1
+        occurrence_status = occurrence.status.lower()
+        if occurrence_status == "completed":
+            completed += 1
+            total_water += occurrence.waterUsed
+        elif occurrence_status == "pending":
+            pending += 1
+        elif occurrence_status == "in progress":
+            in_progress += 1
     
     # Get unique fields and crops
-    unique_fields = len(set(s.fieldLocation for s in all_schedules))
-    unique_crops = len(set(s.cropName for s in all_schedules))
+    unique_fields = len(set(schedule_index.field_locations) | {r.fieldLocation for r in irrigation_recurrences_db.values()})
+    unique_crops = len(set(schedule_index.crop_names) | {r.cropName for r in irrigation_recurrences_db.values()})
     
     return {
         "total_schedules": total,
@@ -178,3 +703,192 @@ async def get_summary_stats():
         "unique_fields": unique_fields,
         "unique_crops": unique_crops
     }
+
+# Recurring schedules
+
+def get_recurrence_or_404(recurrence_id: int) -> IrrigationRecurrence:
+    if recurrence_id not in irrigation_recurrences_db:
+        raise HTTPException(status_code=404, detail="Recurrence not found")
+    return irrigation_recurrences_db[recurrence_id]
+
+def resolve_harvest_date(recurrence: IrrigationRecurrenceBase, db: Session) -> Optional[date]:
+    """untilDate, brought forward to the crop schedule's expected harvest when one is given"""
+    if recurrence.cropScheduleId is None:
+        return recurrence.untilDate
+    crop_schedule = db.query(models.CropSchedule).filter(models.CropSchedule.id == recurrence.cropScheduleId).first()
+    if not crop_schedule:
+        raise HTTPException(status_code=404, detail="Crop schedule not found")
+    if crop_schedule.expected_harvest_date is None:
+        raise HTTPException(status_code=400, detail="Crop schedule has no expected harvest date")
+    harvest = crop_schedule.expected_harvest_date.date()
+    return min(recurrence.untilDate, harvest) if recurrence.untilDate else harvest
+
+def validate_occurrence_times(start_time: str, end_time: str):
+    parse_time_of_day(start_time, "startTime")
+    parse_time_of_day(end_time, "endTime")
+
+@router.get("/irrigation-recurrences", response_model=List[IrrigationRecurrence])
+async def get_all_recurrences():
+    """
+    Get all recurring irrigation schedules
+    """
+    return list(irrigation_recurrences_db.values())
+
+@router.get("/irrigation-recurrences/{recurrence_id}", response_model=IrrigationRecurrence)
+async def get_recurrence(recurrence_id: int):
+    """
+    Get a specific recurring irrigation schedule by ID
+    """
+    return get_recurrence_or_404(recurrence_id)
+
+@router.post("/irrigation-recurrences", response_model=IrrigationRecurrence)
+async def create_recurrence(
+    recurrence: IrrigationRecurrenceCreate,
+    response: Response,
+    allowConflicts: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Create a recurring irrigation schedule (daily, every N days or on weekdays, optionally until harvest).
+    Occurrences from today on that overlap a schedule or another recurrence's occurrence on the
+    same field or pump are rejected with 409 unless allowConflicts is set
+    """
+    global schedule_id_counter
+    
+    validate_occurrence_times(recurrence.startTime, recurrence.endTime)
+    data = recurrence.dict()
+    data["untilDate"] = resolve_harvest_date(recurrence, db)
+    new_recurrence = IrrigationRecurrence(
+        id=schedule_id_counter,
+        **data,
+        createdAt=datetime.now(),
+        updatedAt=datetime.now()
+    )
+    series = RecurringSeries(build_rule(new_recurrence))
+    check_recurrence_conflicts(new_recurrence, series, allowConflicts, response)
+    
+    # The executor takes over from today; earlier occurrences are records only
+    first_day = max(new_recurrence.startDate, schedule_executor.clock.now().date())
+    series.cursor = (first_day - timedelta(days=1), date.max)
+    
+    irrigation_recurrences_db[schedule_id_counter] = new_recurrence
+    recurrence_series[schedule_id_counter] = series
+    irrigation_store.bump([schedule_id_counter])
+    schedule_id_counter += 1
+    
+    await arm_recurrence(new_recurrence.id)
+    
+    return new_recurrence
+
+@router.put("/irrigation-recurrences/{recurrence_id}", response_model=IrrigationRecurrence)
+async def update_recurrence(
+    recurrence_id: int,
+    recurrence: IrrigationRecurrenceCreate,
+    response: Response,
+    allowConflicts: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Update a recurring irrigation schedule. Exceptions for dates the new rule no longer produces are dropped.
+    Overlaps are handled as in create
+    """
+    existing = get_recurrence_or_404(recurrence_id)
+    validate_occurrence_times(recurrence.startTime, recurrence.endTime)
+    data = recurrence.dict()
+    data["untilDate"] = resolve_harvest_date(recurrence, db)
+    updated_recurrence = IrrigationRecurrence(
+        id=recurrence_id,
+        **data,
+        createdAt=existing.createdAt,
+        updatedAt=datetime.now()
+    )
+    # Checked on a copy, so a rejected update leaves the series as it was
+    series = copy.deepcopy(recurrence_series[recurrence_id])
+    series.set_rule(build_rule(updated_recurrence))
+    check_recurrence_conflicts(updated_recurrence, series, allowConflicts, response)
+    
+    recurrence_series[recurrence_id] = series
+    irrigation_recurrences_db[recurrence_id] = updated_recurrence
+    irrigation_store.bump([recurrence_id])
+    
+    await arm_recurrence(recurrence_id)
+    
+    return updated_recurrence
+
+@router.delete("/irrigation-recurrences/{recurrence_id}")
+async def delete_recurrence(recurrence_id: int):
+    """
+    Delete a recurring irrigation schedule and all of its occurrences
+    """
+    get_recurrence_or_404(recurrence_id)
+    
+    series = recurrence_series.pop(recurrence_id)
+    deleted_recurrence = irrigation_recurrences_db.pop(recurrence_id)
+    irrigation_store.bump([recurrence_id])
+    if series.armed is not None:
+        await schedule_executor.disarm((recurrence_id, series.armed[1]))
+    
+    return {
+        "message": "Recurrence deleted successfully",
+        "deleted_recurrence": deleted_recurrence
+    }
+
+@router.get("/irrigation-recurrences/{recurrence_id}/occurrences", response_model=List[IrrigationSchedule])
+async def get_recurrence_occurrences(recurrence_id: int, startDate: Optional[str] = None, endDate: Optional[str] = None):
+    """
+    List the occurrences of a recurring schedule in a date range
+    """
+    recurrence = get_recurrence_or_404(recurrence_id)
+    start = parse_date_param(startDate, "startDate")
+    end = parse_date_param(endDate, "endDate")
+    
+    return list(recurrence_occurrences(recurrence, start, end))
+
+@router.put("/irrigation-recurrences/{recurrence_id}/occurrences/{occurrence_date}", response_model=Optional[IrrigationSchedule])
+async def update_occurrence(
+    recurrence_id: int,
+    occurrence_date: date,
+    update: OccurrenceUpdate,
+    response: Response,
+    allowConflicts: bool = False
+):
+    """
+    Skip, move or edit one occurrence (identified by its original date). Returns the occurrence, or null when skipped.
+    Overlaps are handled as in create
+    """
+    recurrence = get_recurrence_or_404(recurrence_id)
+    if not recurrence_series[recurrence_id].rule.includes(occurrence_date):
+        raise HTTPException(status_code=404, detail="Occurrence not found")
+    
+    fields = {k: v for k, v in update.dict(exclude={"skip", "moveTo"}).items() if v is not None}
+    validate_occurrence_times(fields.get("startTime", recurrence.startTime), fields.get("endTime", recurrence.endTime))
+    exception = OccurrenceException(skip=update.skip, moved_to=update.moveTo, fields=fields)
+    series = copy.deepcopy(recurrence_series[recurrence_id])
+    series.set_exception(occurrence_date, exception)
+    if not update.skip:
+        check_recurrence_conflicts(recurrence, series, allowConflicts, response, only=occurrence_date)
+    recurrence_series[recurrence_id] = series
+    irrigation_store.bump([recurrence_id])
+    
+    await arm_recurrence(recurrence_id)
+    
+    if update.skip:
+        return None
+    stored = series.exceptions.get(occurrence_date)
+    return occurrence_schedule(recurrence, occurrence_date, update.moveTo or occurrence_date, stored)
+
+@router.delete("/irrigation-recurrences/{recurrence_id}/occurrences/{occurrence_date}")
+async def reset_occurrence(recurrence_id: int, occurrence_date: date):
+    """
+    Drop an occurrence's exception so it follows the recurrence again
+    """
+    get_recurrence_or_404(recurrence_id)
+    series = recurrence_series[recurrence_id]
+    if occurrence_date not in series.exceptions:
+        raise HTTPException(status_code=404, detail="Occurrence has no exception")
+    
+    series.clear_exception(occurrence_date)
+    irrigation_store.bump([recurrence_id])
+    await arm_recurrence(recurrence_id)
+    
+    return {"message": "Occurrence reset successfully", "occurrenceDate": occurrence_date}
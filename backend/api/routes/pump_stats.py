@@ -3,11 +3,26 @@ Pump Statistics API Routes
 Handles all pump management operations including CRUD, live status, control, and analytics
 """
 
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime, date, timedelta
 from enum import Enum
+from contextlib import AsyncExitStack
+from api.etag import etag_matches
+from api.fast_json import fast_json_list
+from api.memory import track_store
+from api.services.pump_maintenance import TelemetryHistory, score_fleet
+from api.store_versions import get_store_version
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/pumps", tags=["pumps"])
 
@@ -73,6 +88,47 @@ class PumpControl(BaseModel):
     action: ControlAction
     pump_id: int
 
+class BulkPumpControl(BaseModel):
+    action: ControlAction
+    pump_ids: Optional[List[int]] = Field(None, description="Pumps to control")
+    location: Optional[str] = Field(None, description="Select pumps whose location contains this text")
+    status: Optional[PumpStatus] = Field(None, description="Select pumps currently in this status")
+
+class PumpControlResult(BaseModel):
+    pump_id: int
+    success: bool
+    previous_status: Optional[PumpStatus] = None
+    new_status: Optional[PumpStatus] = None
+    detail: str
+
+class BulkControlResponse(BaseModel):
+    message: str
+    action: ControlAction
+    requested: int
+    succeeded: int
+    failed: int
+    results: List[PumpControlResult]
+
+class MaintenancePrediction(BaseModel):
+    pump_id: int
+    health_score: float
+    samples: int
+    efficiency_decay_pct_per_day: Optional[float] = None
+    temperature_drift_per_day: Optional[float] = None
+    current_flow_ratio_change_pct: Optional[float] = None
+    scheduled_maintenance: date
+    predicted_maintenance: date
+    driver: str
+
+class PumpTelemetry(BaseModel):
+    pump_id: int
+    voltage: float = Field(..., ge=0, description="Supply voltage in V")
+    current: float = Field(..., ge=0, description="Motor current in A")
+    temperature: float = Field(..., description="Motor temperature in °C")
+    flow_rate: float = Field(..., ge=0, description="Flow rate in L/min")
+    efficiency: Optional[float] = Field(None, ge=0, le=100, description="Reported efficiency in %")
+    timestamp: Optional[datetime] = Field(None, description="Reading time (defaults to receive time)")
+
 class SystemStats(BaseModel):
     total_pumps: int
     active_pumps: int
@@ -101,6 +157,13 @@ class Alert(BaseModel):
     message: str
     timestamp: datetime
 
+class PumpChanges(BaseModel):
+    version: int
+    epoch: str
+    full: bool  # upserts is every pump; replace the local copy
+    upserts: List[PumpResponse]
+    deletes: List[int]
+
 # In-memory storage (replace with database in production)
 pumps_db: List[dict] = [
     {
@@ -263,6 +326,35 @@ pumps_db: List[dict] = [
 
 next_id = 7
 
+# Bumped on every write to pumps_db
+pump_store = get_store_version("pumps")
+track_store("pumps", lambda: pumps_db)
+
+# Encoded export reports per format, valid while (pump store version, date) is unchanged
+report_cache: Dict[str, dict] = {}
+REPORT_FIELDS = list(PumpResponse.__fields__)
+REPORT_CHUNK_SIZE = 64 * 1024
+REPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+# Per-pump locks serialize control commands from concurrent callers
+pump_locks: Dict[int, asyncio.Lock] = {}
+
+# Telemetry history and the latest predictive maintenance scores
+telemetry_history = TelemetryHistory()
+maintenance_predictions: Dict[int, dict] = {}
+SCORING_INTERVAL_MINUTES = float(os.getenv("PUMP_SCORING_INTERVAL_MINUTES", "60"))
+PREDICTION_ALERT_DAYS = 14  # Alert when predicted maintenance is this close and earlier than scheduled
+
+POWER_FACTOR = 0.85
+MAX_ENERGY_GAP_HOURS = 0.25  # Don't credit energy across telemetry gaps longer than this
+
+# Accumulated per reading; stored unrounded so small increments aren't lost, rounded on output
+ACCUMULATED_FIELDS = ("energy_today", "runtime_today", "total_runtime")
+
 # Helper Functions
 def calculate_next_maintenance(last_maintenance: date, interval_days: int) -> date:
     """Calculate next maintenance date"""
@@ -278,6 +370,157 @@ def validate_pump_status_change(current_status: PumpStatus, action: ControlActio
         return current_status in [PumpStatus.IDLE, PumpStatus.RUNNING, PumpStatus.ERROR]
     return False
 
+def pump_output(pump: dict) -> dict:
+    """A pump record as returned by the API, with its running totals rounded"""
+    return {**pump, **{field: round(pump[field], 3) for field in ACCUMULATED_FIELDS}}
+
+def local_naive(timestamp: datetime) -> datetime:
+    """Timestamps are stored as naive local time, like datetime.now()"""
+    return timestamp.astimezone().replace(tzinfo=None) if timestamp.tzinfo is not None else timestamp
+
+def get_pump_lock(pump_id: int) -> asyncio.Lock:
+    """Get (or create) the control lock for a pump"""
+    lock = pump_locks.get(pump_id)
+    if lock is None:
+        lock = pump_locks[pump_id] = asyncio.Lock()
+    return lock
+
+def apply_control_action(pump: dict, action: ControlAction):
+    """Apply a validated control action to a pump record"""
+    if action == ControlAction.START:
+        pump["status"] = PumpStatus.RUNNING
+        pump["flow_rate"] = pump["max_flow_rate"] * 0.85  # 85% of max
+        pump["voltage"] = 415
+        pump["current"] = pump["power_rating"] * 1.7
+        pump["power_consumption"] = pump["power_rating"] * 1.2
+        pump["temperature"] = 35
+        pump["efficiency"] = 88 + (pump["power_rating"] / 10)
+        
+    elif action == ControlAction.STOP:
+        pump["status"] = PumpStatus.IDLE
+        pump["flow_rate"] = 0
+        pump["voltage"] = 0
+        pump["current"] = 0
+        pump["power_consumption"] = 0
+        pump["temperature"] = 28
+        pump["efficiency"] = 0
+        
+    elif action == ControlAction.MAINTENANCE:
+        pump["status"] = PumpStatus.MAINTENANCE
+        pump["flow_rate"] = 0
+        pump["voltage"] = 0
+        pump["current"] = 0
+        pump["power_consumption"] = 0
+        pump["efficiency"] = 0
+        pump["last_maintenance"] = date.today()
+        pump["next_maintenance"] = calculate_next_maintenance(
+            date.today(), 
+            pump["maintenance_interval"]
+        )
+    
+    pump["updated_at"] = datetime.now()
+    pump_store.bump([pump["id"]])
+
+async def run_maintenance_scoring() -> List[dict]:
+    """Score the whole fleet and replace the stored predictions"""
+    pump_ids = [p["id"] for p in pumps_db]
+    scheduled = {p["id"]: p["next_maintenance"] for p in pumps_db}
+    arrays = telemetry_history.snapshot(pump_ids)
+    
+    # Scoring works on a copy of the history, so it can run off the event loop
+    loop = asyncio.get_event_loop()
+    predictions = await loop.run_in_executor(None, score_fleet, pump_ids, arrays, scheduled)
+    
+    maintenance_predictions.clear()
+    maintenance_predictions.update({p["pump_id"]: p for p in predictions})
+    pump_store.bump(())  # predictions only; no pump record changed
+    return predictions
+
+async def maintenance_scoring_loop():
+    """Periodically re-score the fleet"""
+    while True:
+        await asyncio.sleep(SCORING_INTERVAL_MINUTES * 60)
+        try:
+            await run_maintenance_scoring()
+        except Exception:
+            logger.exception("Maintenance scoring failed")
+
+@router.on_event("startup")
+async def start_maintenance_scoring():
+    if SCORING_INTERVAL_MINUTES > 0:
+        asyncio.create_task(maintenance_scoring_loop())
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=_json_default, ensure_ascii=False)
+
+def _report_row(pump: dict) -> dict:
+    pump = pump_output(pump)
+    return {field: pump.get(field) for field in REPORT_FIELDS}
+
+async def encode_report(format: str) -> AsyncIterator[str]:
+    """Encode the pump report piece by piece without materializing the whole document"""
+    pumps = list(pumps_db)
+    system_stats = await get_system_stats()
+    alerts = await get_pump_alerts()
+    generated_at = datetime.now()
+    
+    if format == "json":
+        yield f'{{"generated_at": {_dumps(generated_at)}, "system_stats": {_dumps(system_stats)}, "pumps": ['
+        for i, pump in enumerate(pumps):
+            yield ("," if i else "") + _dumps(_report_row(pump))
+        yield f'], "alerts": {_dumps(alerts)}}}'
+    
+    elif format == "ndjson":
+        yield _dumps({"type": "summary", "generated_at": generated_at, "system_stats": system_stats}) + "\n"
+        for pump in pumps:
+            yield _dumps({"type": "pump", **_report_row(pump)}) + "\n"
+        for alert in alerts:
+            yield _dumps({"type": "alert", **alert}) + "\n"
+    
+    elif format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(REPORT_FIELDS)
+        for pump in pumps:
+            writer.writerow([
+                value.isoformat() if isinstance(value, (date, datetime)) else value
+                for value in _report_row(pump).values()
+            ])
+            if buffer.tell() >= REPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+async def stream_and_cache_report(format: str, cache_key: tuple) -> AsyncIterator[bytes]:
+    """Stream the encoded report in ~64KB chunks and keep them for later exports"""
+    chunks = []
+    pending = []
+    pending_size = 0
+    
+    async for piece in encode_report(format):
+        pending.append(piece)
+        pending_size += len(piece)
+        if pending_size >= REPORT_CHUNK_SIZE:
+            chunk = "".join(pending).encode()
+            chunks.append(chunk)
+            pending, pending_size = [], 0
+            yield chunk
+    
+    if pending:
+        chunk = "".join(pending).encode()
+        chunks.append(chunk)
+        yield chunk
+    
+    # Only cache if no write landed while the report was being streamed
+    if pump_store.version == cache_key[0]:
+        report_cache[format] = {"key": cache_key, "chunks": chunks}
+
 # API Endpoints
 
 @router.get("/status", response_model=List[PumpResponse])
@@ -302,26 +545,34 @@ async def get_all_pumps(
     # Apply pagination
     paginated_pumps = filtered_pumps[skip:skip + limit]
     
-    return paginated_pumps
+    return fast_json_list(PumpResponse, [pump_output(p) for p in paginated_pumps])
 
 @router.get("/live", response_model=List[PumpResponse])
 async def get_live_pump_data():
     """
     Get live data for all pumps (for real-time monitoring)
     """
-    return pumps_db
+    return fast_json_list(PumpResponse, [pump_output(p) for p in pumps_db])
 
-@router.get("/{pump_id}", response_model=PumpResponse)
-async def get_pump_by_id(pump_id: int):
+@router.get("/changes", response_model=PumpChanges)
+async def get_pump_changes(
+    since: Optional[int] = Query(None, ge=0, description="Version from the previous sync; omit for a full sync"),
+    epoch: Optional[str] = Query(None, description="Epoch from the previous sync")
+):
     """
-    Get a specific pump by ID
+    Get the pumps added, updated or deleted since a version, for delta sync of the
+    live view. Falls back to a full resync when the changelog no longer reaches back that far
     """
-    pump = next((p for p in pumps_db if p["id"] == pump_id), None)
+    changed = pump_store.changes_since(since, epoch) if since is not None else None
+    sync = {"version": pump_store.version, "epoch": pump_store.epoch}
     
-    if not pump:
-        raise HTTPException(status_code=404, detail="Pump not found")
+    if changed is None:
+        return {**sync, "full": True, "upserts": [pump_output(p) for p in pumps_db], "deletes": []}
     
-    return pump
+    upserts = [pump_output(p) for p in pumps_db if p["id"] in changed]
+    deletes = sorted(changed - {p["id"] for p in upserts})
+    
+    return {**sync, "full": False, "upserts": upserts, "deletes": deletes}
 
 @router.post("/add", response_model=PumpResponse, status_code=201)
 async def create_pump(pump: PumpCreate):
@@ -354,8 +605,9 @@ async def create_pump(pump: PumpCreate):
     
     pumps_db.append(new_pump)
     next_id += 1
+    pump_store.bump([new_pump["id"]])
     
-    return new_pump
+    return pump_output(new_pump)
 
 @router.put("/update/{pump_id}", response_model=PumpResponse)
 async def update_pump(pump_id: int, pump: PumpUpdate):
@@ -381,8 +633,9 @@ async def update_pump(pump_id: int, pump: PumpUpdate):
         )
     
     existing_pump["updated_at"] = datetime.now()
+    pump_store.bump([pump_id])
     
-    return existing_pump
+    return pump_output(existing_pump)
 
 @router.delete("/delete/{pump_id}")
 async def delete_pump(pump_id: int):
@@ -397,6 +650,10 @@ async def delete_pump(pump_id: int):
         raise HTTPException(status_code=404, detail="Pump not found")
     
     pumps_db = [p for p in pumps_db if p["id"] != pump_id]
+    pump_store.bump([pump_id])
+    pump_locks.pop(pump_id, None)
+    telemetry_history.remove(pump_id)
+    maintenance_predictions.pop(pump_id, None)
     
     return {"message": "Pump deleted successfully", "id": pump_id}
 
@@ -410,53 +667,146 @@ async def control_pump(control: PumpControl):
     if not pump:
         raise HTTPException(status_code=404, detail="Pump not found")
     
-    current_status = PumpStatus(pump["status"])
+    async with get_pump_lock(control.pump_id):
+        current_status = PumpStatus(pump["status"])
+        
+        # Validate status change
+        if not validate_pump_status_change(current_status, control.action):
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Cannot {control.action.value} pump from {current_status.value} state"
+            )
+        
+        apply_control_action(pump, control.action)
+    
+    return {
+        "message": f"Pump {control.action.value} command executed successfully",
+        "pump_id": control.pump_id,
+        "new_status": pump["status"]
+    }
+
+@router.post("/control/bulk", response_model=BulkControlResponse)
+async def bulk_control_pumps(control: BulkPumpControl):
+    """
+    Apply one control action to a list of pumps or to every pump matching a location/status selector
+    """
+    if not control.pump_ids and not control.location and not control.status:
+        raise HTTPException(status_code=400, detail="Provide pump_ids or a location/status selector")
+    
+    if control.pump_ids:
+        target_ids = list(dict.fromkeys(control.pump_ids))
+    else:
+        target_ids = [p["id"] for p in pumps_db]
     
-    # Validate status change
-    if not validate_pump_status_change(current_status, control.action):
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Cannot {control.action.value} pump from {current_status.value} state"
-        )
+    known_ids = {p["id"] for p in pumps_db}
     
-    # Apply control action
-    if control.action == ControlAction.START:
-        pump["status"] = PumpStatus.RUNNING
-        pump["flow_rate"] = pump["max_flow_rate"] * 0.85  # 85% of max
-        pump["voltage"] = 415
-        pump["current"] = pump["power_rating"] * 1.7
-        pump["power_consumption"] = pump["power_rating"] * 1.2
-        pump["temperature"] = 35
-        pump["efficiency"] = 88 + (pump["power_rating"] / 10)
+    # Lock pumps in id order so overlapping bulk requests can't deadlock
+    async with AsyncExitStack() as stack:
+        for pump_id in sorted(known_ids.intersection(target_ids)):
+            await stack.enter_async_context(get_pump_lock(pump_id))
         
-    elif control.action == ControlAction.STOP:
-        pump["status"] = PumpStatus.IDLE
-        pump["flow_rate"] = 0
-        pump["voltage"] = 0
-        pump["current"] = 0
-        pump["power_consumption"] = 0
-        pump["temperature"] = 28
-        pump["efficiency"] = 0
+        # Snapshot the store only once every lock is held
+        pumps_by_id = {p["id"]: p for p in pumps_db}
+        location = control.location.lower() if control.location else None
         
-    elif control.action == ControlAction.MAINTENANCE:
-        pump["status"] = PumpStatus.MAINTENANCE
-        pump["flow_rate"] = 0
-        pump["voltage"] = 0
-        pump["current"] = 0
-        pump["power_consumption"] = 0
-        pump["efficiency"] = 0
-        pump["last_maintenance"] = date.today()
-        pump["next_maintenance"] = calculate_next_maintenance(
-            date.today(), 
-            pump["maintenance_interval"]
+        results = []
+        for pump_id in target_ids:
+            pump = pumps_by_id.get(pump_id)
+            
+            if not pump:
+                results.append({"pump_id": pump_id, "success": False, "detail": "Pump not found"})
+                continue
+            
+            # Selectors narrow an explicit id list as well
+            if location and location not in pump["location"].lower():
+                continue
+            if control.status and pump["status"] != control.status:
+                continue
+            
+            current_status = PumpStatus(pump["status"])
+            
+            if not validate_pump_status_change(current_status, control.action):
+                results.append({
+                    "pump_id": pump_id,
+                    "success": False,
+                    "previous_status": current_status,
+                    "new_status": current_status,
+                    "detail": f"Cannot {control.action.value} pump from {current_status.value} state"
+                })
+                continue
+            
+            apply_control_action(pump, control.action)
+            results.append({
+                "pump_id": pump_id,
+                "success": True,
+                "previous_status": current_status,
+                "new_status": pump["status"],
+                "detail": f"Pump {control.action.value} command executed successfully"
+            })
+    
+    succeeded = len([r for r in results if r["success"]])
+    
+    return {
+        "message": f"{control.action.value.capitalize()} applied to {succeeded} of {len(results)} pumps",
+        "action": control.action,
+        "requested": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+@router.post("/telemetry")
+async def ingest_telemetry(readings: List[PumpTelemetry]):
+    """
+    Ingest a batch of live telemetry readings from pump controllers
+    """
+    pumps_by_id = {p["id"]: p for p in pumps_db}
+    accepted = 0
+    unknown_ids = []
+    
+    for reading in readings:
+        pump = pumps_by_id.get(reading.pump_id)
+        
+        if not pump:
+            unknown_ids.append(reading.pump_id)
+            continue
+        
+        timestamp = local_naive(reading.timestamp) if reading.timestamp else datetime.now()
+        
+        # Three-phase power: sqrt(3) * V * I * pf
+        power_consumption = 1.732 * reading.voltage * reading.current * POWER_FACTOR / 1000
+        
+        # Accumulate energy for running pumps between consecutive readings
+        last_reading_at = pump.get("last_telemetry_at")
+        if last_reading_at and pump["status"] == PumpStatus.RUNNING:
+            elapsed_hours = (timestamp - last_reading_at).total_seconds() / 3600
+            if 0 < elapsed_hours <= MAX_ENERGY_GAP_HOURS:
+                pump["energy_today"] += power_consumption * elapsed_hours
+                pump["runtime_today"] += elapsed_hours
+                pump["total_runtime"] += elapsed_hours
+        
+        pump["voltage"] = reading.voltage
+        pump["current"] = reading.current
+        pump["temperature"] = reading.temperature
+        pump["flow_rate"] = reading.flow_rate
+        pump["power_consumption"] = round(power_consumption, 2)
+        if reading.efficiency is not None:
+            pump["efficiency"] = reading.efficiency
+        pump["last_telemetry_at"] = timestamp
+        telemetry_history.record(
+            pump["id"], timestamp, reading.temperature, reading.current,
+            reading.flow_rate, power_consumption
         )
+        pump["updated_at"] = datetime.now()
+        accepted += 1
     
-    pump["updated_at"] = datetime.now()
+    if accepted:
+        pump_store.bump({r.pump_id for r in readings} & pumps_by_id.keys())
     
     return {
-        "message": f"Pump {control.action.value} command executed successfully",
-        "pump_id": control.pump_id,
-        "new_status": pump["status"]
+        "message": f"Ingested {accepted} telemetry readings",
+        "accepted": accepted,
+        "unknown_pump_ids": unknown_ids
     }
 
 @router.get("/stats/system", response_model=SystemStats)
@@ -573,6 +923,23 @@ async def get_pump_alerts():
                 "timestamp": datetime.now()
             })
         
+        # Predicted maintenance need ahead of the calendar schedule
+        prediction = maintenance_predictions.get(pump["id"])
+        if prediction and pump["status"] != "maintenance":
+            days_until_predicted = (prediction["predicted_maintenance"] - date.today()).days
+            if (prediction["predicted_maintenance"] < pump["next_maintenance"]
+                    and days_until_predicted < PREDICTION_ALERT_DAYS):
+                alerts.append({
+                    "type": "warning",
+                    "pump_id": pump["id"],
+                    "pump_name": pump["name"],
+                    "title": "Predicted Maintenance Need",
+                    "message": f"{pump['name']} health is {prediction['health_score']}% "
+                               f"({prediction['driver'].replace('_', ' ')}). Service recommended by "
+                               f"{prediction['predicted_maintenance'].strftime('%d %b %Y')}.",
+                    "timestamp": datetime.now()
+                })
+        
         # Low efficiency
         if pump["status"] == "running" and pump["efficiency"] < 85:
             alerts.append({
@@ -586,6 +953,25 @@ async def get_pump_alerts():
     
     return alerts
 
+@router.post("/maintenance/score", response_model=List[MaintenancePrediction])
+async def score_maintenance():
+    """
+    Run predictive maintenance scoring over the telemetry history of the whole fleet
+    """
+    predictions = await run_maintenance_scoring()
+    return sorted(predictions, key=lambda p: p["predicted_maintenance"])
+
+@router.get("/maintenance/predictions", response_model=List[MaintenancePrediction])
+async def get_maintenance_predictions(
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of records"),
+    skip: int = Query(0, ge=0, description="Number of records to skip")
+):
+    """
+    Get the latest predicted maintenance dates, soonest first
+    """
+    predictions = sorted(maintenance_predictions.values(), key=lambda p: p["predicted_maintenance"])
+    return predictions[skip:skip + limit]
+
 @router.post("/maintenance/complete/{pump_id}")
 async def complete_maintenance(pump_id: int):
     """
@@ -604,6 +990,11 @@ async def complete_maintenance(pump_id: int):
     pump["next_maintenance"] = calculate_next_maintenance(date.today(), pump["maintenance_interval"])
     pump["efficiency"] = 95  # Reset to high efficiency after maintenance
     pump["updated_at"] = datetime.now()
+    pump_store.bump([pump_id])
+    
+    # Serviced pumps start a fresh degradation baseline
+    telemetry_history.remove(pump_id)
+    maintenance_predictions.pop(pump_id, None)
     
     return {
         "message": "Maintenance completed successfully",
@@ -623,6 +1014,10 @@ async def bulk_delete_pumps(ids: List[int]):
         initial_length = len(pumps_db)
         pumps_db = [p for p in pumps_db if p["id"] != pump_id]
         if len(pumps_db) < initial_length:
+            pump_store.bump([pump_id])
+            pump_locks.pop(pump_id, None)
+            telemetry_history.remove(pump_id)
+            maintenance_predictions.pop(pump_id, None)
             deleted_count += 1
     
     return {
@@ -631,15 +1026,41 @@ async def bulk_delete_pumps(ids: List[int]):
     }
 
 @router.get("/export/report")
-async def export_pump_report():
+async def export_pump_report(
+    request: Request,
+    format: str = Query("json", regex="^(json|ndjson|csv)$", description="json, ndjson or csv")
+):
     """
-    Export comprehensive pump report
+    Export comprehensive pump report, streamed in chunks.
+    The encoded report is cached until the pump store changes and served with an ETag.
     """
-    report = {
-        "generated_at": datetime.now().isoformat(),
-        "system_stats": await get_system_stats(),
-        "pumps": pumps_db,
-        "alerts": await get_pump_alerts()
-    }
+    cache_key = (pump_store.version, date.today())
+    etag = f'W/"pumps-{cache_key[0]}-{cache_key[1].isoformat()}-{format}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if format == "csv":
+        headers["Content-Disposition"] = f"attachment; filename=pump-report-{cache_key[1].isoformat()}.csv"
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    cached = report_cache.get(format)
+    if cached and cached["key"] == cache_key:
+        chunks = iter(cached["chunks"])
+    else:
+        chunks = stream_and_cache_report(format, cache_key)
+    
+    return StreamingResponse(chunks, media_type=REPORT_MEDIA_TYPES[format], headers=headers)
+
+# Declared last so the path parameter doesn't shadow single-segment routes like /alerts
+@router.get("/{pump_id}", response_model=PumpResponse)
+async def get_pump_by_id(pump_id: int):
+    """
+    Get a specific pump by ID
+    """
+    pump = next((p for p in pumps_db if p["id"] == pump_id), None)
+    
+    if not pump:
+        raise HTTPException(status_code=404, detail="Pump not found")
     
-    return report
+    return pump_output(pump)
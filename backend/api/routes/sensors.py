@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from api.database import get_db
+from api.fast_json import fast_json_list
 from api.models import models, schemas
 from api.routes.auth import get_current_user
 
@@ -27,7 +28,7 @@ def read_sensor_data(
     current_user: models.User = Depends(get_current_user)
 ):
     sensor_data = db.query(models.SensorData).offset(skip).limit(limit).all()
-    return sensor_data
+    return fast_json_list(schemas.SensorData, sensor_data)
 
 @router.get("/{sensor_id}/latest", response_model=schemas.SensorData)
 def read_latest_sensor_data(
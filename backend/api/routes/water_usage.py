@@ -7,7 +7,11 @@ from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime, date, timedelta
+from datetime import date as date_type  # for fields named date, which shadow the type in their class body
 from enum import Enum
+from api.fast_json import fast_json_list
+from api.memory import track_store
+from api.store_versions import get_store_version
 
 router = APIRouter(prefix="/api/water-usage", tags=["water-usage"])
 
@@ -27,7 +31,7 @@ class WaterSource(str, Enum):
 class WaterUsageBase(BaseModel):
     field_name: str = Field(..., description="Name of the field")
     crop_type: str = Field(..., description="Type of crop")
-    date: date = Field(..., description="Date of water usage")
+    date: date_type = Field(..., description="Date of water usage")
     water_used: float = Field(..., gt=0, description="Amount of water used in liters")
     start_time: str = Field(..., description="Start time of irrigation (HH:MM)")
     end_time: str = Field(..., description="End time of irrigation (HH:MM)")
@@ -41,7 +45,7 @@ class WaterUsageCreate(WaterUsageBase):
 class WaterUsageUpdate(BaseModel):
     field_name: Optional[str] = None
     crop_type: Optional[str] = None
-    date: Optional[date] = None
+    date: Optional[date_type] = None
     water_used: Optional[float] = Field(None, gt=0)
     start_time: Optional[str] = None
     end_time: Optional[str] = None
@@ -86,6 +90,13 @@ class UsageDistribution(BaseModel):
     labels: List[str]
     values: List[float]
 
+class WaterUsageChanges(BaseModel):
+    version: int
+    epoch: str
+    full: bool  # upserts is every record; replace the local copy
+    upserts: List[WaterUsageResponse]
+    deletes: List[int]
+
 # In-memory storage (replace with database in production)
 water_usage_db: List[dict] = [
     {
@@ -177,6 +188,10 @@ water_usage_db: List[dict] = [
 
 next_id = 6
 
+# Bumped on every write to water_usage_db
+water_usage_store = get_store_version("water_usage")
+track_store("water_usage", lambda: water_usage_db)
+
 # Helper functions
 def calculate_duration(start_time: str, end_time: str) -> str:
     """Calculate duration between start and end time"""
@@ -262,7 +277,27 @@ async def get_water_usage(
     # Apply pagination
     paginated_records = filtered_records[skip:skip + limit]
     
-    return paginated_records
+    return fast_json_list(WaterUsageResponse, paginated_records)
+
+@router.get("/changes", response_model=WaterUsageChanges)
+async def get_water_usage_changes(
+    since: Optional[int] = Query(None, ge=0, description="Version from the previous sync; omit for a full sync"),
+    epoch: Optional[str] = Query(None, description="Epoch from the previous sync")
+):
+    """
+    Get the records created, updated or deleted since a version, for delta sync.
+    Falls back to a full resync when the changelog no longer reaches back that far
+    """
+    changed = water_usage_store.changes_since(since, epoch) if since is not None else None
+    sync = {"version": water_usage_store.version, "epoch": water_usage_store.epoch}
+    
+    if changed is None:
+        return {**sync, "full": True, "upserts": water_usage_db, "deletes": []}
+    
+    upserts = [r for r in water_usage_db if r["id"] in changed]
+    deletes = sorted(changed - {r["id"] for r in upserts})
+    
+    return {**sync, "full": False, "upserts": upserts, "deletes": deletes}
 
 @router.get("/{usage_id}", response_model=WaterUsageResponse)
 async def get_water_usage_by_id(usage_id: int):
@@ -300,6 +335,7 @@ async def create_water_usage(usage: WaterUsageCreate):
     
     water_usage_db.append(new_record)
     next_id += 1
+    water_usage_store.bump([new_record["id"]])
     
     return new_record
 
@@ -328,6 +364,7 @@ async def update_water_usage(usage_id: int, usage: WaterUsageUpdate):
         record["status"] = determine_status(record["water_used"], record["crop_type"])
     
     record["updated_at"] = datetime.now()
+    water_usage_store.bump([usage_id])
     
     return record
 
@@ -344,6 +381,7 @@ async def delete_water_usage(usage_id: int):
         raise HTTPException(status_code=404, detail="Water usage record not found")
     
     water_usage_db = [r for r in water_usage_db if r["id"] != usage_id]
+    water_usage_store.bump([usage_id])
     
     return {"message": "Water usage record deleted successfully", "id": usage_id}
 
@@ -482,16 +520,16 @@ async def bulk_delete_usage(ids: List[int]):
     """
     global water_usage_db
     
-    deleted_count = 0
-    for usage_id in ids:
-        initial_length = len(water_usage_db)
-        water_usage_db = [r for r in water_usage_db if r["id"] != usage_id]
-        if len(water_usage_db) < initial_length:
-            deleted_count += 1
+    requested = set(ids)
+    deleted_ids = [r["id"] for r in water_usage_db if r["id"] in requested]
+    if deleted_ids:
+        water_usage_db = [r for r in water_usage_db if r["id"] not in requested]
+        # Only records that existed go in the changelog; unknown ids would be phantom deletes
+        water_usage_store.bump(deleted_ids)
     
     return {
-        "message": f"Deleted {deleted_count} water usage records",
-        "deleted_count": deleted_count
+        "message": f"Deleted {len(deleted_ids)} water usage records",
+        "deleted_count": len(deleted_ids)
     }
 
 @router.get("/export/csv")
@@ -1,30 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-import aiohttp
-import os
 from api.database import get_db
 from api.models import models
 from api.routes.auth import get_current_user
+from api.services.weather_client import weather_client
 
 router = APIRouter()
 
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
-WEATHER_API_URL = "http://api.openweathermap.org/data/2.5/weather"
-
 async def fetch_weather_data(lat: float, lon: float):
-    params = {
-        "lat": lat,
-        "lon": lon,
-        "appid": OPENWEATHER_API_KEY,
-        "units": "metric"
-    }
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.get(WEATHER_API_URL, params=params) as response:
-            if response.status == 200:
-                return await response.json()
-            else:
-                raise HTTPException(status_code=response.status, detail="Weather API error")
+    return await weather_client.get_current(lat, lon)
 
 @router.get("/{lat}/{lon}")
 async def get_weather(
@@ -0,0 +1,213 @@
+"""
+Farm Spatial Index
+In-memory grid buckets over farm coordinates for k-nearest and
+within-radius queries. Farm writes made through the ORM are applied when
+their transaction commits; bulk SQL updates bypass the ORM and need a
+reload().
+"""
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from typing import Dict, List, Optional, Tuple
+from api.models import models
+import heapq
+import math
+import threading
+
+FARM_INDEX_CELL_DEGREES = 0.1
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+MAX_LATITUDE = 89.9
+
+Point = Tuple[float, float]
+# (latitude and longitude in radians, cos(latitude)) precomputed for distance checks
+Projected = Tuple[float, float, float]
+
+def _project(lat: float, lon: float) -> Projected:
+    phi = math.radians(lat)
+    return phi, math.radians(lon), math.cos(phi)
+
+def _km_to_haversine(km: float) -> float:
+    """The haversine term a for a distance; a grows with distance, so it can be compared directly"""
+    return math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2) ** 2
+
+def _haversine_to_km(a: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class FarmSpatialIndex:
+    """
+    Farms bucketed by (lat, lon) grid cell. Nearest-neighbour search visits
+    rings of cells outward from the query cell and stops once the k-th best
+    distance is inside the area already searched; radius search visits only
+    the cells overlapping the radius' bounding box. When a search would visit
+    more cells than are populated it scans the populated buckets instead.
+    Longitudes are not wrapped at +/-180.
+    """
+
+    def __init__(self, cell_degrees: float = FARM_INDEX_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.points: Dict[int, Point] = {}
+        self.buckets: Dict[Tuple[int, int], Dict[int, Projected]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    # Writes
+
+    def _remove(self, farm_id: int):
+        point = self.points.pop(farm_id, None)
+        if point is not None:
+            cell = self._cell(*point)
+            bucket = self.buckets[cell]
+            del bucket[farm_id]
+            if not bucket:
+                del self.buckets[cell]
+
+    def upsert(self, farm_id: int, lat: Optional[float], lon: Optional[float]):
+        """Add or move a farm; farms without coordinates are dropped from the index"""
+        with self._lock:
+            self._remove(farm_id)
+            if lat is None or lon is None:
+                return
+            self.points[farm_id] = (lat, lon)
+            self.buckets.setdefault(self._cell(lat, lon), {})[farm_id] = _project(lat, lon)
+
+    def remove(self, farm_id: int):
+        with self._lock:
+            self._remove(farm_id)
+
+    def reload(self, db: Session) -> int:
+        """Rebuild the index from the farms table"""
+        rows = db.query(models.Farm.id, models.Farm.latitude, models.Farm.longitude).filter(
+            models.Farm.latitude.isnot(None),
+            models.Farm.longitude.isnot(None)
+        ).all()
+        points = {}
+        buckets: Dict[Tuple[int, int], Dict[int, Projected]] = {}
+        for farm_id, lat, lon in rows:
+            points[farm_id] = (lat, lon)
+            buckets.setdefault(self._cell(lat, lon), {})[farm_id] = _project(lat, lon)
+        with self._lock:
+            self.points, self.buckets = points, buckets
+        return len(points)
+
+    # Queries
+
+    def _ring(self, ci: int, cj: int, r: int):
+        if r == 0:
+            yield ci, cj
+            return
+        for j in range(cj - r, cj + r + 1):
+            yield ci - r, j
+            yield ci + r, j
+        for i in range(ci - r + 1, ci + r):
+            yield i, cj - r
+            yield i, cj + r
+
+    def _clearance_km(self, lat: float, lon: float, r: int) -> float:
+        """Lower bound on the distance from the query to any cell outside ring r"""
+        size = self.cell_degrees
+        ci, cj = self._cell(lat, lon)
+        dlat = min(lat - (ci - r) * size, (ci + r + 1) * size - lat)
+        dlon = min(lon - (cj - r) * size, (cj + r + 1) * size - lon)
+        widest = min(MAX_LATITUDE, abs(lat) + dlat)
+        return min(dlat, dlon * math.cos(math.radians(widest))) * KM_PER_DEGREE
+
+    def nearest(self, lat: float, lon: float, k: int = 5) -> List[Tuple[float, int]]:
+        """(distance_km, farm_id) of the k farms closest to lat/lon, nearest first"""
+        with self._lock:
+            if not self.points or k <= 0:
+                return []
+            ci, cj = self._cell(lat, lon)
+            qphi, qlam, qcos = _project(lat, lon)
+            sin, push, replace = math.sin, heapq.heappush, heapq.heapreplace
+            best: List[Tuple[float, int]] = []  # max-heap on the haversine term via negation
+
+            def consider(bucket: Dict[int, Projected]):
+                for farm_id, (phi, lam, cos_phi) in bucket.items():
+                    a = sin((phi - qphi) / 2) ** 2 + qcos * cos_phi * sin((lam - qlam) / 2) ** 2
+                    if len(best) < k:
+                        push(best, (-a, farm_id))
+                    elif a < -best[0][0]:
+                        replace(best, (-a, farm_id))
+
+            r = 0
+            while True:
+                if (2 * r + 1) ** 2 > len(self.buckets):
+                    # Cheaper to finish with the populated buckets than to keep widening
+                    seen = {(i, j) for i in range(ci - r + 1, ci + r) for j in range(cj - r + 1, cj + r)} if r else set()
+                    for cell, bucket in self.buckets.items():
+                        if cell not in seen:
+                            consider(bucket)
+                    break
+                for cell in self._ring(ci, cj, r):
+                    bucket = self.buckets.get(cell)
+                    if bucket:
+                        consider(bucket)
+                if len(best) >= k and -best[0][0] <= _km_to_haversine(self._clearance_km(lat, lon, r)):
+                    break
+                r += 1
+
+            return sorted((_haversine_to_km(-a), farm_id) for a, farm_id in best)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, int]]:
+        """(distance_km, farm_id) of farms within radius_km of lat/lon, nearest first"""
+        with self._lock:
+            dlat = radius_km / KM_PER_DEGREE
+            widest = min(MAX_LATITUDE, abs(lat) + dlat)
+            dlon = min(180.0, radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest))))
+            i0, j0 = self._cell(lat - dlat, lon - dlon)
+            i1, j1 = self._cell(lat + dlat, lon + dlon)
+
+            if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.buckets):
+                buckets = [b for (i, j), b in self.buckets.items() if i0 <= i <= i1 and j0 <= j <= j1]
+            else:
+                buckets = [self.buckets.get((i, j)) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)]
+
+            qphi, qlam, qcos = _project(lat, lon)
+            limit = _km_to_haversine(radius_km)
+            sin = math.sin
+            found = []
+            for bucket in buckets:
+                if not bucket:
+                    continue
+                for farm_id, (phi, lam, cos_phi) in bucket.items():
+                    a = sin((phi - qphi) / 2) ** 2 + qcos * cos_phi * sin((lam - qlam) / 2) ** 2
+                    if a <= limit:
+                        found.append((a, farm_id))
+            found.sort()
+            return [(_haversine_to_km(a), farm_id) for a, farm_id in found]
+
+# Shared by every route for the lifetime of the app
+farm_index = FarmSpatialIndex()
+
+# Keep the index in step with committed ORM writes to farms
+
+PENDING_KEY = "farm_index_changes"
+
+def _queue(target: models.Farm, change: tuple):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_KEY, []).append(change)
+
+@event.listens_for(models.Farm, "after_insert")
+@event.listens_for(models.Farm, "after_update")
+def _farm_written(mapper, connection, target: models.Farm):
+    _queue(target, (target.id, target.latitude, target.longitude))
+
+@event.listens_for(models.Farm, "after_delete")
+def _farm_deleted(mapper, connection, target: models.Farm):
+    _queue(target, (target.id, None, None))
+
+@event.listens_for(Session, "after_commit")
+def _apply_farm_changes(session: Session):
+    for farm_id, lat, lon in session.info.pop(PENDING_KEY, []):
+        farm_index.upsert(farm_id, lat, lon)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_farm_changes(session: Session):
+    session.info.pop(PENDING_KEY, None)
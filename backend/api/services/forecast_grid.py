@@ -0,0 +1,216 @@
+"""
+Forecast Grid
+Fetches the 5-day forecast once per weather grid cell, computes FAO-56
+Penman-Monteith reference evapotranspiration (ET0) for every cell and
+3-hour timestep as array operations, and keeps the results for the
+water-requirement and scheduling endpoints to read
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from api.services.weather_client import WeatherClient, weather_client
+import asyncio
+import numpy as np
+import os
+import time
+
+FORECAST_MAX_AGE_MINUTES = float(os.getenv("FORECAST_MAX_AGE_MINUTES", "360"))
+FORECAST_GRID_MAX_CELLS = 10000
+FORECAST_FETCH_CONCURRENCY = 10
+FORECAST_STEP_HOURS = 3.0
+
+SOLAR_CONSTANT = 0.0820  # MJ m-2 min-1
+STEFAN_BOLTZMANN_HOURLY = 2.043e-10  # MJ K-4 m-2 h-1
+ALBEDO = 0.23  # grass reference crop
+ANGSTROM_A, ANGSTROM_B = 0.25, 0.50
+WIND_10M_TO_2M = 4.87 / np.log(67.8 * 10 - 5.42)
+
+Cell = Tuple[float, float]
+
+def penman_monteith_et0(
+    timestamps: np.ndarray,
+    temperature: np.ndarray,
+    humidity: np.ndarray,
+    wind_speed: np.ndarray,
+    pressure_hpa: np.ndarray,
+    cloud_cover: np.ndarray,
+    lat: np.ndarray,
+    lon: np.ndarray,
+    step_hours: float = FORECAST_STEP_HOURS
+) -> np.ndarray:
+    """
+    FAO-56 hourly Penman-Monteith (eq. 53) applied to forecast steps, in mm
+    per step. timestamps are UTC epoch seconds at the start of each step;
+    wind is at 10 m; solar radiation is estimated from cloud cover with the
+    Angstrom formula (n/N taken as 1 - cloud fraction). All inputs are arrays
+    of the same shape, so any number of cells and steps go in one call.
+    """
+    t = np.asarray(temperature, dtype=float)
+    rh = np.clip(np.asarray(humidity, dtype=float), 0, 100)
+    u2 = np.maximum(np.asarray(wind_speed, dtype=float) * WIND_10M_TO_2M, 0.5)
+    pressure = np.asarray(pressure_hpa, dtype=float) / 10  # kPa
+    sunshine = 1 - np.clip(np.asarray(cloud_cover, dtype=float), 0, 100) / 100
+    phi = np.radians(np.asarray(lat, dtype=float))
+
+    # Vapour pressure and psychrometric terms
+    es = 0.6108 * np.exp(17.27 * t / (t + 237.3))
+    ea = es * rh / 100
+    delta = 4098 * es / (t + 237.3) ** 2
+    gamma = 0.000665 * pressure
+
+    # Extraterrestrial radiation over each step (eq. 28-33)
+    ts = np.asarray(timestamps, dtype=np.int64)
+    day_of_year = ts.astype("datetime64[s]").astype("datetime64[D]") - ts.astype("datetime64[s]").astype("datetime64[Y]")
+    doy = day_of_year.astype(np.int64) + 1
+    dr = 1 + 0.033 * np.cos(2 * np.pi * doy / 365)
+    declination = 0.409 * np.sin(2 * np.pi * doy / 365 - 1.39)
+    b = 2 * np.pi * (doy - 81) / 364
+    seasonal = 0.1645 * np.sin(2 * b) - 0.1255 * np.cos(b) - 0.025 * np.sin(b)
+    utc_hours = (ts % 86400) / 3600 + step_hours / 2
+    solar_time = utc_hours + np.asarray(lon, dtype=float) / 15 + seasonal
+    omega = np.pi / 12 * (solar_time - 12)
+    omega = (omega + np.pi) % (2 * np.pi) - np.pi
+    sunset = np.arccos(np.clip(-np.tan(phi) * np.tan(declination), -1, 1))
+    omega1 = np.clip(omega - np.pi * step_hours / 24, -sunset, sunset)
+    omega2 = np.clip(omega + np.pi * step_hours / 24, -sunset, sunset)
+    ra = 12 * 60 / np.pi * SOLAR_CONSTANT * dr * (
+        (omega2 - omega1) * np.sin(phi) * np.sin(declination)
+        + np.cos(phi) * np.cos(declination) * (np.sin(omega2) - np.sin(omega1))
+    )
+    ra = np.maximum(ra, 0)
+
+    # Net radiation over the step
+    rs = (ANGSTROM_A + ANGSTROM_B * sunshine) * ra
+    rns = (1 - ALBEDO) * rs
+    relative_shortwave = np.minimum((ANGSTROM_A + ANGSTROM_B * sunshine) / 0.75, 1.0)  # Rs/Rso
+    rnl = (
+        STEFAN_BOLTZMANN_HOURLY * step_hours * (t + 273.16) ** 4
+        * (0.34 - 0.14 * np.sqrt(ea)) * (1.35 * relative_shortwave - 0.35)
+    )
+    rn = rns - rnl
+    soil_heat = np.where(ra > 0, 0.1, 0.5) * rn
+
+    # Eq. 53 per hour, scaled to the step
+    rate = (
+        0.408 * delta * (rn - soil_heat) / step_hours
+        + gamma * 37 / (t + 273) * u2 * (es - ea)
+    ) / (delta + gamma * (1 + 0.34 * u2))
+    return np.maximum(rate, 0) * step_hours
+
+class CellForecast:
+    def __init__(self, cell: Cell, fetched_at: float, steps: Dict[str, np.ndarray]):
+        self.cell = cell
+        self.fetched_at = fetched_at
+        self.steps = steps
+        self.daily = self._daily()
+
+    def _daily(self) -> List[dict]:
+        """Per-day means (rainfall and ET0 as daily totals, scaled up for partial days)"""
+        steps_per_day = 24 / FORECAST_STEP_HOURS
+        dates = [datetime.fromtimestamp(int(ts)).date().isoformat() for ts in self.steps["dt"]]
+        days = []
+        for day in sorted(set(dates)):
+            mask = np.array([d == day for d in dates])
+            days.append({
+                "date": day,
+                "temperature": round(float(self.steps["temperature"][mask].mean()), 1),
+                "humidity": round(float(self.steps["humidity"][mask].mean())),
+                "rainfall": round(float(self.steps["rain"][mask].mean() * steps_per_day), 1),
+                "et0_mm": round(float(self.steps["et0"][mask].mean() * steps_per_day), 2)
+            })
+        return days
+
+def parse_forecast(payload: dict) -> Dict[str, np.ndarray]:
+    entries = payload.get("list", [])
+    return {
+        "dt": np.array([e["dt"] for e in entries], dtype=np.int64),
+        "temperature": np.array([e["main"]["temp"] for e in entries], dtype=float),
+        "humidity": np.array([e["main"]["humidity"] for e in entries], dtype=float),
+        "pressure": np.array([e["main"].get("pressure", 1013) for e in entries], dtype=float),
+        "wind": np.array([e.get("wind", {}).get("speed", 2) for e in entries], dtype=float),
+        "clouds": np.array([e.get("clouds", {}).get("all", 50) for e in entries], dtype=float),
+        "rain": np.array([(e.get("rain") or {}).get("3h", 0) for e in entries], dtype=float)
+    }
+
+def compute_cell_forecasts(payloads: Dict[Cell, dict], fetched_at: float) -> Dict[Cell, CellForecast]:
+    """Parse every payload and compute ET0 for all cells and steps in one vectorized pass"""
+    cells = list(payloads)
+    parsed = [parse_forecast(payloads[cell]) for cell in cells]
+    if not cells:
+        return {}
+    lengths = [len(p["dt"]) for p in parsed]
+    flat = {key: np.concatenate([p[key] for p in parsed]) for key in parsed[0]}
+    et0 = penman_monteith_et0(
+        flat["dt"], flat["temperature"], flat["humidity"], flat["wind"], flat["pressure"], flat["clouds"],
+        np.repeat([c[0] for c in cells], lengths), np.repeat([c[1] for c in cells], lengths)
+    )
+    offsets = np.cumsum([0] + lengths)
+    forecasts = {}
+    for i, (cell, steps) in enumerate(zip(cells, parsed)):
+        steps["et0"] = et0[offsets[i]:offsets[i + 1]]
+        forecasts[cell] = CellForecast(cell, fetched_at, steps)
+    return forecasts
+
+class ForecastGrid:
+    def __init__(self, client: WeatherClient, max_age_minutes: float = FORECAST_MAX_AGE_MINUTES):
+        self.client = client
+        self.max_age = max_age_minutes * 60
+        self.cells: "OrderedDict[Cell, CellForecast]" = OrderedDict()
+        self.last_refresh: Optional[datetime] = None
+
+    def cell_of(self, lat: float, lon: float) -> Cell:
+        return self.client.grid_key(lat, lon)
+
+    def _store(self, forecasts: Dict[Cell, CellForecast]):
+        for cell, forecast in forecasts.items():
+            self.cells[cell] = forecast
+            self.cells.move_to_end(cell)
+        while len(self.cells) > FORECAST_GRID_MAX_CELLS:
+            self.cells.popitem(last=False)
+
+    async def fetch(self, cells: Iterable[Cell]) -> Dict[Cell, Optional[CellForecast]]:
+        """Fetch and compute the given cells (None where the fetch failed)"""
+        cells = list(dict.fromkeys(cells))
+        semaphore = asyncio.Semaphore(FORECAST_FETCH_CONCURRENCY)
+
+        async def fetch_one(cell: Cell):
+            async with semaphore:
+                return await self.client.get("forecast", *cell)
+
+        responses = await asyncio.gather(*(fetch_one(cell) for cell in cells), return_exceptions=True)
+        payloads = {cell: data for cell, data in zip(cells, responses) if not isinstance(data, BaseException)}
+        forecasts = compute_cell_forecasts(payloads, time.time())
+        self._store(forecasts)
+        return {cell: forecasts.get(cell) for cell in cells}
+
+    async def refresh(self, extra_cells: Iterable[Cell] = ()) -> int:
+        """Re-fetch every known cell plus extra_cells; returns how many were updated"""
+        forecasts = await self.fetch(list(self.cells) + list(extra_cells))
+        self.last_refresh = datetime.now()
+        return sum(1 for f in forecasts.values() if f is not None)
+
+    async def get_cells(self, cells: Iterable[Cell]) -> Dict[Cell, Optional[CellForecast]]:
+        """Stored forecasts for the cells, fetching only the missing or expired ones"""
+        now = time.time()
+        result = {}
+        missing = []
+        for cell in dict.fromkeys(cells):
+            forecast = self.cells.get(cell)
+            if forecast is not None and now - forecast.fetched_at < self.max_age:
+                result[cell] = forecast
+            else:
+                missing.append(cell)
+        if missing:
+            fetched = await self.fetch(missing)
+            for cell, forecast in fetched.items():
+                # Fall back to an expired forecast rather than none at all
+                result[cell] = forecast or self.cells.get(cell)
+        return result
+
+    async def get(self, lat: float, lon: float) -> Optional[CellForecast]:
+        cell = self.cell_of(lat, lon)
+        return (await self.get_cells([cell]))[cell]
+
+# Shared by every route for the lifetime of the app
+forecast_grid = ForecastGrid(weather_client)
@@ -0,0 +1,184 @@
+"""
+Interval Tree
+AVL tree of half-open [start, end) intervals keyed by (start, id), with each
+node carrying the largest end in its subtree. Inserts and removals are
+O(log n); finding whether anything overlaps a window is O(log n) and listing
+every overlap is O(log n + k).
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+import heapq
+
+Interval = Tuple[int, int, int]  # (start, end, id)
+
+class _Node:
+    __slots__ = ("start", "end", "id", "max_end", "height", "left", "right")
+
+    def __init__(self, start: int, end: int, item_id: int):
+        self.start = start
+        self.end = end
+        self.id = item_id
+        self.max_end = end
+        self.height = 1
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+def _height(node: Optional[_Node]) -> int:
+    return node.height if node else 0
+
+def _update(node: _Node):
+    left, right = node.left, node.right
+    node.height = 1 + max(_height(left), _height(right))
+    node.max_end = node.end
+    if left and left.max_end > node.max_end:
+        node.max_end = left.max_end
+    if right and right.max_end > node.max_end:
+        node.max_end = right.max_end
+
+def _rotate_right(node: _Node) -> _Node:
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+def _rotate_left(node: _Node) -> _Node:
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+def _balance(node: _Node) -> _Node:
+    _update(node)
+    skew = _height(node.left) - _height(node.right)
+    if skew > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if skew < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+class IntervalTree:
+    def __init__(self):
+        self.root: Optional[_Node] = None
+        self.starts: Dict[int, int] = {}  # id -> start, to find a node by id
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self.starts
+
+    def add(self, start: int, end: int, item_id: int):
+        if item_id in self.starts:
+            self.remove(item_id)
+        self.root = self._insert(self.root, _Node(start, end, item_id))
+        self.starts[item_id] = start
+
+    def _insert(self, node: Optional[_Node], new: _Node) -> _Node:
+        if node is None:
+            return new
+        if (new.start, new.id) < (node.start, node.id):
+            node.left = self._insert(node.left, new)
+        else:
+            node.right = self._insert(node.right, new)
+        return _balance(node)
+
+    def remove(self, item_id: int):
+        start = self.starts.pop(item_id, None)
+        if start is not None:
+            self.root = self._delete(self.root, (start, item_id))
+
+    def _delete(self, node: Optional[_Node], key: Tuple[int, int]) -> Optional[_Node]:
+        if node is None:
+            return None
+        here = (node.start, node.id)
+        if key < here:
+            node.left = self._delete(node.left, key)
+        elif key > here:
+            node.right = self._delete(node.right, key)
+        else:
+            if node.left is None:
+                return node.right
+            if node.right is None:
+                return node.left
+            # Replace with the in-order successor
+            successor = node.right
+            while successor.left:
+                successor = successor.left
+            node.right = self._delete(node.right, (successor.start, successor.id))
+            node.start, node.end, node.id = successor.start, successor.end, successor.id
+        return _balance(node)
+
+    def overlapping(self, start: int, end: int) -> Iterator[Interval]:
+        """Intervals overlapping [start, end), in start order"""
+        stack: List[_Node] = []
+        node = self.root
+        while stack or node:
+            # Descend left while the left subtree can still reach past `start`
+            while node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.start >= end:
+                return  # everything after this node starts too late
+            if node.end > start:
+                yield node.start, node.end, node.id
+            node = node.right
+
+    def first_overlap(self, start: int, end: int, exclude: Optional[int] = None) -> Optional[Interval]:
+        """Any one interval overlapping [start, end) other than `exclude`, in O(log n)"""
+        for interval in self.overlapping(start, end):
+            if interval[2] != exclude:
+                return interval
+        return None
+
+class KeyedIntervalTrees:
+    """One IntervalTree per key (a field, a pump), created and dropped as needed"""
+
+    def __init__(self):
+        self.trees: Dict[object, IntervalTree] = {}
+
+    def add(self, key, start: int, end: int, item_id: int):
+        self.trees.setdefault(key, IntervalTree()).add(start, end, item_id)
+
+    def remove(self, key, item_id: int):
+        tree = self.trees.get(key)
+        if tree is not None:
+            tree.remove(item_id)
+            if not len(tree):
+                del self.trees[key]
+
+    def overlapping(self, key, start: int, end: int, exclude: Optional[int] = None) -> List[Interval]:
+        tree = self.trees.get(key)
+        if tree is None:
+            return []
+        return [iv for iv in tree.overlapping(start, end) if iv[2] != exclude]
+
+    def has_overlap(self, key, start: int, end: int, exclude: Optional[int] = None) -> bool:
+        tree = self.trees.get(key)
+        return tree is not None and tree.first_overlap(start, end, exclude) is not None
+
+    def overlapping_pairs(self, start: int, end: int) -> Iterator[Tuple[object, Interval, Interval]]:
+        """
+        (key, a, b) for every pair of intervals under the same key that overlap
+        each other somewhere inside [start, end). Sweeps the intervals each tree
+        reports for the window, so the cost follows what is in the window.
+        """
+        for key, tree in self.trees.items():
+            active: List[Tuple[int, Interval]] = []  # min-heap on end
+            for interval in tree.overlapping(start, end):
+                while active and active[0][0] <= interval[0]:
+                    heapq.heappop(active)
+                for _, other in active:
+                    if max(other[0], interval[0]) < end and min(other[1], interval[1]) > start:
+                        yield key, other, interval
+                heapq.heappush(active, (interval[1], interval))
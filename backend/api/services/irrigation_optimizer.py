@@ -0,0 +1,286 @@
+"""
+Irrigation Optimizer
+Assigns hourly pump windows to fields so each field's daily water demand is
+met within pump capacity at the lowest energy cost, and re-plans only the
+fields affected when inputs change
+"""
+
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import numpy as np
+
+HOURS_PER_DAY = 24
+MINUTES_PER_SLOT = 60
+HP_TO_KW = 0.746
+
+# Share of pumped water that reaches the root zone by hour of day (evaporation and wind losses)
+APPLICATION_EFFICIENCY = np.array(
+    [0.95] * 6 + [0.9] * 4 + [0.75] * 7 + [0.85] * 3 + [0.92] * 4
+)
+
+class FieldDemand:
+    def __init__(self, field_id: Hashable, daily_liters: Iterable[float], pump_ids: Optional[Iterable[Hashable]] = None):
+        self.field_id = field_id
+        self.daily_liters = [float(v) for v in daily_liters]
+        self.pump_ids = set(pump_ids) if pump_ids else None
+
+class PumpCapacity:
+    def __init__(self, pump_id: Hashable, max_flow_rate: float, power_kw: float):
+        self.pump_id = pump_id
+        self.max_flow_rate = max_flow_rate  # L/min
+        self.power_kw = power_kw
+
+class IrrigationPlanner:
+    """
+    Greedy min-cost planner over (pump, hour) slots.
+
+    Each slot holds 60 pump-minutes. The cost of delivering a liter from a slot
+    is energy price x pump power / (flow x application efficiency), which does
+    not depend on the field, so filling each day's cheapest slots first is
+    optimal when every field may use every pump. Fields restricted to some
+    pumps are planned first, most constrained first.
+    """
+
+    def __init__(self, start_date: date, days: int, hourly_prices: np.ndarray):
+        self.start_date = start_date
+        self.days = days
+        self.hourly_prices = np.asarray(hourly_prices, dtype=float)
+        self.fields: Dict[Hashable, FieldDemand] = {}
+        self.pumps: List[PumpCapacity] = []
+        self.pump_index: Dict[Hashable, int] = {}
+        self.remaining = np.zeros((0, days * HOURS_PER_DAY))
+        self.cost_per_liter = np.zeros((0, days * HOURS_PER_DAY))
+        # (pump row, hour) -> [[field_id, minutes], ...] in running order
+        self.slot_allocations: Dict[Tuple[int, int], List[list]] = {}
+        # field_id -> [(pump row, hour, minutes), ...]
+        self.field_allocations: Dict[Hashable, List[Tuple[int, int, float]]] = {}
+        self.unmet: Dict[Hashable, List[float]] = {}
+
+    # Pump state
+
+    def _slot_costs(self, pump: PumpCapacity) -> np.ndarray:
+        liters_per_hour = pump.max_flow_rate * MINUTES_PER_SLOT
+        efficiency = np.tile(APPLICATION_EFFICIENCY, self.days)
+        return self.hourly_prices * pump.power_kw / (liters_per_hour * efficiency)
+
+    def set_pumps(self, pumps: List[PumpCapacity]):
+        self.pumps = list(pumps)
+        self.pump_index = {p.pump_id: i for i, p in enumerate(self.pumps)}
+        hours = self.days * HOURS_PER_DAY
+        self.remaining = np.full((len(self.pumps), hours), float(MINUTES_PER_SLOT))
+        self.cost_per_liter = np.array([self._slot_costs(p) for p in self.pumps]).reshape(len(self.pumps), hours)
+        self.slot_allocations.clear()
+        self.field_allocations.clear()
+        self.unmet.clear()
+
+    # Allocation
+
+    def _release(self, field_id: Hashable):
+        for row, hour, minutes in self.field_allocations.pop(field_id, []):
+            self.remaining[row, hour] += minutes
+            entries = self.slot_allocations.get((row, hour), [])
+            entries[:] = [e for e in entries if e[0] != field_id]
+            if not entries:
+                self.slot_allocations.pop((row, hour), None)
+        self.unmet.pop(field_id, None)
+
+    def _allocate(self, field: FieldDemand, day_order: Dict[int, np.ndarray], cursors: Dict[int, int]):
+        hours = self.days * HOURS_PER_DAY
+        allocations = self.field_allocations.setdefault(field.field_id, [])
+        unmet = []
+        allowed = None
+        if field.pump_ids is not None:
+            allowed = np.array([self.pump_index[p] for p in field.pump_ids if p in self.pump_index], dtype=int)
+
+        for day, demand in enumerate(field.daily_liters[:self.days]):
+            remaining_liters = demand
+            if allowed is None:
+                order = day_order[day]
+                start = cursors[day]
+            else:
+                order = day_order[day][np.isin(day_order[day] // hours, allowed)]
+                start = 0
+            for flat in order[start:]:
+                if remaining_liters <= 1e-6:
+                    break
+                row, hour = divmod(int(flat), hours)
+                free = self.remaining[row, hour]
+                if free <= 1e-9:
+                    continue
+                liters_per_minute = self.pumps[row].max_flow_rate * APPLICATION_EFFICIENCY[hour % HOURS_PER_DAY]
+                minutes = min(free, remaining_liters / liters_per_minute)
+                self.remaining[row, hour] -= minutes
+                remaining_liters -= minutes * liters_per_minute
+                allocations.append((row, hour, minutes))
+                self.slot_allocations.setdefault((row, hour), []).append([field.field_id, minutes])
+            unmet.append(max(0.0, remaining_liters))
+
+            if allowed is None:
+                # Slots before the cursor are full; skip them for the next field
+                cursor = cursors[day]
+                while cursor < len(order) and self.remaining.flat[order[cursor]] <= 1e-9:
+                    cursor += 1
+                cursors[day] = cursor
+        self.unmet[field.field_id] = unmet
+
+    def _day_order(self) -> Dict[int, np.ndarray]:
+        """Flat (pump, hour) slot indexes for each day, cheapest first"""
+        hours = self.days * HOURS_PER_DAY
+        order = {}
+        for day in range(self.days):
+            block = self.cost_per_liter[:, day * HOURS_PER_DAY:(day + 1) * HOURS_PER_DAY]
+            local = np.argsort(block, axis=None, kind="stable")
+            rows, cols = np.unravel_index(local, block.shape)
+            order[day] = rows * hours + cols + day * HOURS_PER_DAY
+        return order
+
+    def _plan_fields(self, fields: List[FieldDemand]):
+        # Most constrained first, then largest demand
+        def priority(field: FieldDemand):
+            allowed = len(field.pump_ids) if field.pump_ids is not None else len(self.pumps) + 1
+            return (allowed, -sum(field.daily_liters))
+
+        day_order = self._day_order()
+        cursors = {day: 0 for day in day_order}
+        for field in sorted(fields, key=priority):
+            self._allocate(field, day_order, cursors)
+
+    def solve(self, fields: List[FieldDemand], pumps: List[PumpCapacity]):
+        """Plan every field from scratch"""
+        self.set_pumps(pumps)
+        self.fields = {f.field_id: f for f in fields}
+        self._plan_fields(fields)
+
+    def replan(
+        self,
+        fields: Optional[List[FieldDemand]] = None,
+        removed_field_ids: Optional[Iterable[Hashable]] = None,
+        pumps: Optional[List[PumpCapacity]] = None,
+        removed_pump_ids: Optional[Iterable[Hashable]] = None
+    ) -> List[Hashable]:
+        """
+        Apply changed/new fields and pumps, keep every unaffected allocation and
+        re-plan only the affected fields (plus any with unmet demand). Returns
+        the re-planned field ids.
+        """
+        fields = fields or []
+        removed_field_ids = set(removed_field_ids or [])
+        changed_pumps = {p.pump_id: p for p in (pumps or [])}
+        removed_pump_ids = set(removed_pump_ids or [])
+
+        affected = {f.field_id for f in fields} | removed_field_ids
+        # Capacity freed or added by this change may now cover demand that was unmet
+        affected.update(fid for fid, unmet in self.unmet.items() if sum(unmet) > 1e-6)
+        touched_rows = {self.pump_index[pid] for pid in set(changed_pumps) | removed_pump_ids if pid in self.pump_index}
+        for field_id, allocations in self.field_allocations.items():
+            if any(row in touched_rows for row, _, _ in allocations):
+                affected.add(field_id)
+        for field_id in affected:
+            self._release(field_id)
+
+        if changed_pumps or removed_pump_ids:
+            # Rebuild pump rows, carrying over the allocations that survive
+            kept_allocations = dict(self.field_allocations)
+            kept_unmet = dict(self.unmet)
+            old_pumps = self.pumps
+            new_pumps = [changed_pumps.pop(p.pump_id, p) for p in old_pumps if p.pump_id not in removed_pump_ids]
+            new_pumps.extend(changed_pumps.values())
+            self.set_pumps(new_pumps)
+            for field_id, allocations in kept_allocations.items():
+                moved = []
+                for row, hour, minutes in allocations:
+                    new_row = self.pump_index[old_pumps[row].pump_id]
+                    self.remaining[new_row, hour] -= minutes
+                    self.slot_allocations.setdefault((new_row, hour), []).append([field_id, minutes])
+                    moved.append((new_row, hour, minutes))
+                self.field_allocations[field_id] = moved
+            self.unmet.update(kept_unmet)
+
+        for field_id in removed_field_ids:
+            self.fields.pop(field_id, None)
+        for field in fields:
+            self.fields[field.field_id] = field
+
+        replanned = [self.fields[fid] for fid in affected if fid in self.fields]
+        self._plan_fields(replanned)
+        return [f.field_id for f in replanned]
+
+    # Output
+
+    def _slot_start(self, row: int, hour: int, field_id: Hashable) -> float:
+        """Minutes into the slot at which field_id's share starts"""
+        offset = 0.0
+        for entry_field, minutes in self.slot_allocations.get((row, hour), []):
+            if entry_field == field_id:
+                return offset
+            offset += minutes
+        return offset
+
+    def field_windows(self, field_id: Hashable) -> List[dict]:
+        """Irrigation windows for a field, merging back-to-back slots on the same pump"""
+        windows = []
+        base = datetime.combine(self.start_date, datetime.min.time())
+        for row, hour, minutes in sorted(self.field_allocations.get(field_id, []), key=lambda a: (a[0], a[1])):
+            pump = self.pumps[row]
+            minutes = float(minutes)
+            start = base + timedelta(hours=hour, minutes=self._slot_start(row, hour, field_id))
+            end = start + timedelta(minutes=minutes)
+            liters = minutes * pump.max_flow_rate
+            energy = pump.power_kw * minutes / 60
+            cost = energy * float(self.hourly_prices[hour])
+
+            last = windows[-1] if windows else None
+            if last and last["pump_id"] == pump.pump_id and last["_end"] >= start - timedelta(seconds=1):
+                last["_end"] = end
+                last["water_liters"] += liters
+                last["energy_kwh"] += energy
+                last["energy_cost"] += cost
+            else:
+                windows.append({
+                    "pump_id": pump.pump_id,
+                    "_start": start,
+                    "_end": end,
+                    "water_liters": liters,
+                    "energy_kwh": energy,
+                    "energy_cost": cost
+                })
+
+        windows.sort(key=lambda w: w["_start"])
+        for window in windows:
+            start, end = window.pop("_start"), window.pop("_end")
+            window["date"] = start.date().isoformat()
+            window["start_time"] = start.strftime("%H:%M")
+            window["end_time"] = end.strftime("%H:%M")
+            window["water_liters"] = round(window["water_liters"], 1)
+            window["energy_kwh"] = round(window["energy_kwh"], 3)
+            window["energy_cost"] = round(window["energy_cost"], 2)
+        return windows
+
+    def to_dict(self, field_ids: Optional[Iterable[Hashable]] = None) -> dict:
+        field_ids = list(self.fields) if field_ids is None else list(field_ids)
+        fields = []
+        for field_id in field_ids:
+            windows = self.field_windows(field_id)
+            unmet = self.unmet.get(field_id, [])
+            fields.append({
+                "field_id": field_id,
+                "windows": windows,
+                "water_liters": round(sum(w["water_liters"] for w in windows), 1),
+                "energy_cost": round(sum(w["energy_cost"] for w in windows), 2),
+                "unmet_liters": round(float(sum(unmet)), 1)
+            })
+
+        used = MINUTES_PER_SLOT - self.remaining
+        energy = used / 60 * np.array([p.power_kw for p in self.pumps]).reshape(-1, 1) if self.pumps else used
+        return {
+            "start_date": self.start_date.isoformat(),
+            "days": self.days,
+            "total_energy_kwh": round(float(energy.sum()), 2),
+            "total_energy_cost": round(float((energy * self.hourly_prices).sum()), 2),
+            "total_unmet_liters": round(float(sum(sum(v) for v in self.unmet.values())), 1),
+            "pump_utilization": {
+                p.pump_id: round(float(used[i].sum() / (self.days * HOURS_PER_DAY * MINUTES_PER_SLOT)), 3)
+                for i, p in enumerate(self.pumps)
+            },
+            "fields": fields
+        }
@@ -0,0 +1,211 @@
+"""
+Predictive Maintenance Scoring
+Keeps a bounded telemetry history for every pump and scores the whole fleet
+at once with NumPy to predict when each pump will actually need maintenance
+"""
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, date, timedelta
+import numpy as np
+
+SAMPLES_PER_PUMP = 720  # 30 days of hourly samples
+SAMPLE_INTERVAL_SECONDS = 3600
+MIN_SAMPLES = 24  # Fewer running samples than this falls back to the calendar
+
+EFFICIENCY_DECAY_LIMIT = 0.15  # Service once flow per kW has dropped 15% from baseline
+TEMPERATURE_LIMIT = 60.0  # °C, matches the high temperature alert
+CURRENT_FLOW_RISE_LIMIT = 0.25  # Service once current per unit flow has risen 25%
+
+METRICS = ("temperature", "current", "flow_rate", "power")
+
+class TelemetryHistory:
+    """
+    Fixed-size ring buffer of telemetry samples per pump, stored as one 2D
+    array per metric (rows are pumps, columns are samples) so scoring can run
+    over the whole fleet without building per-pump arrays
+    """
+
+    def __init__(self, samples_per_pump: int = SAMPLES_PER_PUMP, sample_interval: int = SAMPLE_INTERVAL_SECONDS):
+        self.samples_per_pump = samples_per_pump
+        self.sample_interval = sample_interval
+        self.row_of: Dict[int, int] = {}
+        self.free_rows: List[int] = []
+        self._allocate(64)
+
+    def _allocate(self, rows: int):
+        self.timestamps = np.full((rows, self.samples_per_pump), np.nan)
+        self.values = {m: np.full((rows, self.samples_per_pump), np.nan, dtype=np.float32) for m in METRICS}
+        self.cursor = np.zeros(rows, dtype=np.int64)
+        self.last_sample_at = np.full(rows, -np.inf)
+
+    def _grow(self):
+        old_rows = self.timestamps.shape[0]
+        timestamps, values = self.timestamps, self.values
+        cursor, last_sample_at = self.cursor, self.last_sample_at
+        self._allocate(old_rows * 2)
+        self.timestamps[:old_rows] = timestamps
+        for m in METRICS:
+            self.values[m][:old_rows] = values[m]
+        self.cursor[:old_rows] = cursor
+        self.last_sample_at[:old_rows] = last_sample_at
+        self.free_rows.extend(range(old_rows * 2 - 1, old_rows - 1, -1))
+
+    def _row(self, pump_id: int) -> int:
+        row = self.row_of.get(pump_id)
+        if row is None:
+            if not self.free_rows and len(self.row_of) >= self.timestamps.shape[0]:
+                self._grow()
+            row = self.free_rows.pop() if self.free_rows else len(self.row_of)
+            self.row_of[pump_id] = row
+        return row
+
+    def record(self, pump_id: int, timestamp: datetime, temperature: float, current: float,
+               flow_rate: float, power: float):
+        """Store a reading, keeping at most one sample per sample interval"""
+        row = self._row(pump_id)
+        ts = timestamp.timestamp()
+        if ts - self.last_sample_at[row] < self.sample_interval:
+            return
+        col = self.cursor[row] % self.samples_per_pump
+        self.timestamps[row, col] = ts
+        self.values["temperature"][row, col] = temperature
+        self.values["current"][row, col] = current
+        self.values["flow_rate"][row, col] = flow_rate
+        self.values["power"][row, col] = power
+        self.cursor[row] += 1
+        self.last_sample_at[row] = ts
+
+    def remove(self, pump_id: int):
+        """Forget a deleted pump and recycle its row"""
+        row = self.row_of.pop(pump_id, None)
+        if row is None:
+            return
+        self.timestamps[row] = np.nan
+        for m in METRICS:
+            self.values[m][row] = np.nan
+        self.cursor[row] = 0
+        self.last_sample_at[row] = -np.inf
+        self.free_rows.append(row)
+
+    def snapshot(self, pump_ids: List[int]) -> Dict[str, np.ndarray]:
+        """Copy the history rows for pump_ids (rows of NaN for pumps without history)"""
+        rows = np.array([self.row_of.get(pid, -1) for pid in pump_ids], dtype=np.int64)
+        known = rows >= 0
+        shape = (len(pump_ids), self.samples_per_pump)
+        arrays = {"timestamps": np.full(shape, np.nan)}
+        arrays["timestamps"][known] = self.timestamps[rows[known]]
+        for m in METRICS:
+            arrays[m] = np.full(shape, np.nan, dtype=np.float32)
+            arrays[m][known] = self.values[m][rows[known]]
+        return arrays
+
+def _fit(x: np.ndarray, y: np.ndarray, valid: np.ndarray, n: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Row-wise least squares line over the valid samples.
+    Returns (slope per day, fitted value now, fitted value at the oldest sample)
+    """
+    y = np.where(valid, y, 0.0)
+    x_mean = x.sum(axis=1) / n
+    y_mean = y.sum(axis=1) / n
+    dx = np.where(valid, x - x_mean[:, None], 0.0)
+    sxx = (dx * dx).sum(axis=1)
+    sxy = (dx * (y - y_mean[:, None])).sum(axis=1)
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0)
+    x_oldest = np.where(valid, x, np.inf).min(axis=1)
+    x_oldest = np.where(np.isfinite(x_oldest), x_oldest, 0.0)
+    now_value = y_mean - slope * x_mean
+    baseline = y_mean + slope * (x_oldest - x_mean)
+    return slope, now_value, baseline
+
+def _days_until(now_value: np.ndarray, limit: np.ndarray, slope: np.ndarray) -> np.ndarray:
+    """Days until a linear trend crosses limit (inf if it is moving away)"""
+    gap = limit - now_value
+    days = np.full(now_value.shape, np.inf)
+    heading = (slope != 0) & (np.sign(gap) == np.sign(slope))
+    days[heading] = gap[heading] / slope[heading]
+    days[gap == 0] = 0.0
+    return days
+
+def score_fleet(pump_ids: List[int], arrays: Dict[str, np.ndarray], scheduled: Dict[int, date],
+                now: Optional[datetime] = None) -> List[dict]:
+    """
+    Score every pump from its telemetry history.
+
+    Degradation indicators (all fitted as linear trends over running samples):
+    - efficiency decay: flow delivered per kW drawn, relative to its baseline
+    - temperature drift: °C per day
+    - current/flow ratio: current drawn per unit of flow, relative to its baseline
+    Each trend is projected to its service limit; the predicted maintenance
+    date is the earliest projection, never later than the calendar schedule.
+    """
+    now = now or datetime.now()
+    today = now.date()
+    if not pump_ids:
+        return []
+
+    flow = arrays["flow_rate"].astype(np.float64)
+    power = arrays["power"].astype(np.float64)
+    current = arrays["current"].astype(np.float64)
+    temperature = arrays["temperature"].astype(np.float64)
+
+    # Only samples taken while the pump was actually pumping are comparable
+    with np.errstate(invalid="ignore"):
+        valid = ~np.isnan(arrays["timestamps"]) & (flow > 0) & (power > 0.1)
+    n = valid.sum(axis=1)
+    n_safe = np.maximum(n, 1)
+    x = np.where(valid, (arrays["timestamps"] - now.timestamp()) / 86400, 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        efficiency = np.where(valid, flow / power, 0.0)
+        current_flow = np.where(valid, current / flow, 0.0)
+
+    eff_slope, eff_now, eff_base = _fit(x, efficiency, valid, n_safe)
+    temp_slope, temp_now, _ = _fit(x, temperature, valid, n_safe)
+    ratio_slope, ratio_now, ratio_base = _fit(x, current_flow, valid, n_safe)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eff_decay_rate = np.where(eff_base > 0, -eff_slope / eff_base, 0.0)
+        eff_loss = np.where(eff_base > 0, 1 - eff_now / eff_base, 0.0)
+        ratio_rise = np.where(ratio_base > 0, ratio_now / ratio_base - 1, 0.0)
+
+    days_efficiency = _days_until(eff_now, eff_base * (1 - EFFICIENCY_DECAY_LIMIT), eff_slope)
+    days_temperature = _days_until(temp_now, np.full(temp_now.shape, TEMPERATURE_LIMIT), temp_slope)
+    days_ratio = _days_until(ratio_now, ratio_base * (1 + CURRENT_FLOW_RISE_LIMIT), ratio_slope)
+
+    # Limits already exceeded mean maintenance is due now
+    days_efficiency[eff_loss >= EFFICIENCY_DECAY_LIMIT] = 0.0
+    days_temperature[temp_now >= TEMPERATURE_LIMIT] = 0.0
+    days_ratio[ratio_rise >= CURRENT_FLOW_RISE_LIMIT] = 0.0
+
+    days_calendar = np.array([(scheduled[pid] - today).days for pid in pump_ids], dtype=np.float64)
+    projections = np.stack([days_efficiency, days_temperature, days_ratio, days_calendar])
+    enough_data = n >= MIN_SAMPLES
+    projections[:3, ~enough_data] = np.inf
+    predicted_days = np.clip(projections.min(axis=0), 0, None)
+    limiting = projections.argmin(axis=0)
+
+    # Health: 100 is as-new, 0 means at least one indicator reached its limit
+    penalty = np.stack([
+        np.clip(eff_loss / EFFICIENCY_DECAY_LIMIT, 0, 1),
+        np.clip((temp_now - 45) / (TEMPERATURE_LIMIT - 45), 0, 1),
+        np.clip(ratio_rise / CURRENT_FLOW_RISE_LIMIT, 0, 1)
+    ])
+    penalty[:, ~enough_data] = 0
+    health = np.round(100 * (1 - penalty.max(axis=0)), 1)
+
+    drivers = ("efficiency_decay", "temperature_drift", "current_flow_ratio", "calendar")
+    predictions = []
+    for i, pid in enumerate(pump_ids):
+        predicted = today + timedelta(days=int(predicted_days[i]))
+        predictions.append({
+            "pump_id": pid,
+            "health_score": float(health[i]),
+            "samples": int(n[i]),
+            "efficiency_decay_pct_per_day": round(float(eff_decay_rate[i]) * 100, 3) if enough_data[i] else None,
+            "temperature_drift_per_day": round(float(temp_slope[i]), 3) if enough_data[i] else None,
+            "current_flow_ratio_change_pct": round(float(ratio_rise[i]) * 100, 2) if enough_data[i] else None,
+            "scheduled_maintenance": scheduled[pid],
+            "predicted_maintenance": min(predicted, scheduled[pid]),
+            "driver": drivers[limiting[i]]
+        })
+    return predictions
@@ -0,0 +1,183 @@
+"""
+Recurring Schedules
+Recurrence rules (daily, every N days, on given weekdays, optionally until a
+date) expanded lazily into occurrence dates, and the sparse per-occurrence
+exceptions (skipped, moved or otherwise edited occurrences) kept alongside
+them. Nothing is stored per occurrence unless it differs from the rule.
+"""
+
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import heapq
+
+DAILY = "daily"
+INTERVAL = "interval"
+WEEKDAYS = "weekdays"
+FREQUENCIES = (DAILY, INTERVAL, WEEKDAYS)
+
+COMPLETED = "completed"
+
+class RecurrenceRule:
+    def __init__(
+        self,
+        frequency: str,
+        start: date,
+        until: Optional[date] = None,
+        interval: int = 1,
+        weekdays: Optional[Sequence[int]] = None
+    ):
+        # weekdays use date.weekday() numbering: Monday is 0
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+        if frequency == INTERVAL and interval < 1:
+            raise ValueError("interval must be at least 1 day")
+        if frequency == WEEKDAYS and (not weekdays or any(not 0 <= d <= 6 for d in weekdays)):
+            raise ValueError("weekdays must list days 0 (Monday) to 6 (Sunday)")
+        if until is not None and until < start:
+            raise ValueError("until must not be before the start date")
+        self.frequency = frequency
+        self.start = start
+        self.until = until
+        self.interval = interval if frequency == INTERVAL else 1
+        self.weekdays = frozenset(weekdays) if frequency == WEEKDAYS else None
+
+    def includes(self, day: date) -> bool:
+        if day < self.start or (self.until is not None and day > self.until):
+            return False
+        if self.weekdays is not None:
+            return day.weekday() in self.weekdays
+        return (day - self.start).days % self.interval == 0
+
+    def dates(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[date]:
+        """Occurrence dates in [start, end], generated on demand (unbounded if neither end nor until is set)"""
+        first = max(start or self.start, self.start)
+        last = min(d for d in (end, self.until) if d is not None) if (end or self.until) else None
+        if self.weekdays is None:
+            # Round up to the next date on the interval grid
+            offset = -(first - self.start).days % self.interval
+            day = first + timedelta(days=offset)
+            step = timedelta(days=self.interval)
+        else:
+            day = first
+            step = timedelta(days=1)
+        while last is None or day <= last:
+            if self.weekdays is None or day.weekday() in self.weekdays:
+                yield day
+            day += step
+
+class OccurrenceException:
+    """Overrides for one occurrence; unset fields fall back to the rule's template"""
+    __slots__ = ("skip", "date", "fields")
+
+    def __init__(self, skip: bool = False, moved_to: Optional[date] = None, fields: Optional[dict] = None):
+        self.skip = skip
+        self.date = moved_to
+        self.fields = fields or {}
+
+    def is_empty(self) -> bool:
+        return not self.skip and self.date is None and not self.fields
+
+# (original date, actual date, exception or None)
+Occurrence = Tuple[date, date, Optional[OccurrenceException]]
+
+class RecurringSeries:
+    """
+    A rule plus its exceptions. Occurrences carry their original rule date
+    as identity; moved ones are also indexed by their new date so a window
+    query finds occurrences moved into it. Occurrences between completed_from
+    and completed_through that have no exception are completed, so a run of
+    normal completions costs two dates rather than one record each.
+    """
+
+    def __init__(self, rule: RecurrenceRule):
+        self.rule = rule
+        self.exceptions: Dict[date, OccurrenceException] = {}
+        self.moved: List[Tuple[date, date]] = []  # sorted (actual date, original date)
+        self.completed_from: Optional[date] = None
+        self.completed_through: Optional[date] = None
+        # Executor progress as (actual date, original date): the last occurrence
+        # it finished with, and the one currently on its wheel
+        self.cursor: Optional[Tuple[date, date]] = None
+        self.armed: Optional[Tuple[date, date]] = None
+
+    def set_rule(self, rule: RecurrenceRule):
+        """Replace the rule, dropping exceptions for dates it no longer produces"""
+        if self.completed_through is not None:
+            # The completed range only holds for the old rule's dates; spell it out
+            for day in self.rule.dates(self.completed_from, self.completed_through):
+                if day not in self.exceptions and rule.includes(day):
+                    self.exceptions[day] = OccurrenceException(fields={"status": COMPLETED})
+            self.completed_from = self.completed_through = None
+        self.rule = rule
+        for original in [d for d in self.exceptions if not rule.includes(d)]:
+            self.clear_exception(original)
+
+    def set_exception(self, original: date, exception: OccurrenceException):
+        self.clear_exception(original)
+        if exception.date == original:
+            exception.date = None
+        if exception.is_empty():
+            return
+        self.exceptions[original] = exception
+        if exception.date is not None and not exception.skip:
+            insort(self.moved, (exception.date, original))
+
+    def clear_exception(self, original: date):
+        exception = self.exceptions.pop(original, None)
+        if exception is not None and exception.date is not None and not exception.skip:
+            index = bisect_left(self.moved, (exception.date, original))
+            del self.moved[index]
+
+    def occurrences(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Occurrence]:
+        """Occurrences whose actual date is in [start, end], in actual date order"""
+        def regular():
+            for day in self.rule.dates(start, end):
+                exception = self.exceptions.get(day)
+                if exception is None:
+                    yield day, day, None
+                elif not exception.skip and exception.date is None:
+                    yield day, day, exception
+
+        def moved_in():
+            lo = bisect_left(self.moved, (start, date.min)) if start else 0
+            for actual, original in self.moved[lo:]:
+                if end is not None and actual > end:
+                    return
+                yield original, actual, self.exceptions[original]
+
+        return heapq.merge(regular(), moved_in(), key=lambda o: (o[1], o[0]))
+
+    def status_of(self, original: date, exception: Optional[OccurrenceException], default: str) -> str:
+        if exception is not None and "status" in exception.fields:
+            return exception.fields["status"]
+        if exception is None and self.completed_through is not None and self.completed_from <= original <= self.completed_through:
+            return COMPLETED
+        return default
+
+    def _extends_completed(self, original: date) -> bool:
+        """Whether original is the next date after the completed range, counting only dates without exceptions"""
+        if self.completed_through is None:
+            return True
+        for day in self.rule.dates(self.completed_through + timedelta(days=1), original):
+            if day == original:
+                return True
+            if day not in self.exceptions:
+                return False
+        return False
+
+    def set_status(self, original: date, status: str):
+        """Record an occurrence's status, as a move of the completed range where possible"""
+        exception = self.exceptions.get(original)
+        plain = exception is None or (not exception.skip and exception.date is None and set(exception.fields) <= {"status"})
+        if status == COMPLETED and plain and self._extends_completed(original):
+            if exception is not None:
+                self.clear_exception(original)
+            if self.completed_through is None:
+                self.completed_from = original
+            self.completed_through = original
+            return
+        if exception is None:
+            self.set_exception(original, OccurrenceException(fields={"status": status}))
+        else:
+            exception.fields["status"] = status
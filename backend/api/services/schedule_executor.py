@@ -0,0 +1,162 @@
+"""
+Schedule Executor
+Runs irrigation schedules in-process: each armed schedule gets a start timer
+and a stop timer on a timing wheel, and the executor starts and stops the
+schedule's pump and moves its status along as the timers fire. Re-arming a
+schedule whose window has already begun or ended catches it up, so loading
+the stored schedules after a restart leaves each one in the right state.
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from api.services.timing_wheel import SystemClock, TimingWheel, Timer, from_ticks, to_ticks
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+IN_PROGRESS = "in progress"
+COMPLETED = "completed"
+MISSED = "missed"
+FAILED = "failed"
+
+# Within one tick, stops run before starts so a pump can hand over between back-to-back schedules
+STOP, START = 0, 1
+
+# Schedules are identified by any hashable key: a schedule id, or (recurrence id, date) for an occurrence
+PumpAction = Callable[[int], Awaitable[bool]]
+StatusSetter = Callable[[Hashable, str], None]
+DoneCallback = Callable[[Hashable], Awaitable[None]]
+
+class ScheduleExecutor:
+    def __init__(
+        self,
+        start_pump: PumpAction,
+        stop_pump: PumpAction,
+        set_status: StatusSetter,
+        clock=None,
+        tick_seconds: float = 1.0,
+        on_done: Optional[DoneCallback] = None
+    ):
+        self.start_pump = start_pump
+        self.stop_pump = stop_pump
+        self.set_status = set_status
+        self.on_done = on_done  # called once a schedule has completed or failed
+        self.clock = clock or SystemClock()
+        self.tick_seconds = tick_seconds
+        self.wheel = TimingWheel(to_ticks(self.clock.now()))
+        self.timers: Dict[Hashable, Tuple[Timer, ...]] = {}
+        self.pumps: Dict[Hashable, Optional[int]] = {}
+        self.running: Dict[Hashable, Optional[int]] = {}  # schedules whose window the executor started
+        self.stats: Counter = Counter()
+        self.last_tick: Optional[datetime] = None
+
+    def now(self) -> int:
+        return to_ticks(self.clock.now())
+
+    def _cancel(self, schedule_id: Hashable):
+        for timer in self.timers.pop(schedule_id, ()):
+            self.wheel.cancel(timer)
+        self.pumps.pop(schedule_id, None)
+
+    async def arm(self, schedule_id: Hashable, start: int, end: int, pump_id: Optional[int], status: str):
+        """
+        (Re)arm a schedule for its [start, end) window in wheel ticks. Pending
+        schedules whose window has ended are marked missed; ones already inside
+        their window start on the next tick. In-progress schedules get their
+        stop, immediately if the window is over.
+        """
+        self._cancel(schedule_id)
+        status = status.lower()
+        if status != IN_PROGRESS and schedule_id in self.running:
+            # Taken out of progress by an edit: release the pump it was holding
+            await self._release(schedule_id)
+
+        now = self.now()
+        if status == PENDING:
+            if end <= now:
+                self.stats["missed"] += 1
+                self.set_status(schedule_id, MISSED)
+                return
+            self.timers[schedule_id] = (
+                self.wheel.schedule(start, (START, schedule_id)),
+                self.wheel.schedule(end, (STOP, schedule_id))
+            )
+            self.pumps[schedule_id] = pump_id
+        elif status == IN_PROGRESS:
+            self.timers[schedule_id] = (self.wheel.schedule(end, (STOP, schedule_id)),)
+            self.pumps[schedule_id] = pump_id
+            self.running.setdefault(schedule_id, pump_id)
+
+    async def disarm(self, schedule_id: Hashable):
+        """Forget a schedule, stopping its pump if the executor started it"""
+        self._cancel(schedule_id)
+        if schedule_id in self.running:
+            await self._release(schedule_id)
+
+    async def _release(self, schedule_id: Hashable):
+        pump_id = self.running.pop(schedule_id)
+        if pump_id is not None:
+            await self.stop_pump(pump_id)
+
+    async def _start(self, schedule_id: Hashable):
+        pump_id = self.pumps.get(schedule_id)
+        if pump_id is not None and not await self.start_pump(pump_id):
+            self._cancel(schedule_id)
+            self.stats["failed"] += 1
+            self.set_status(schedule_id, FAILED)
+            if self.on_done:
+                await self.on_done(schedule_id)
+            return
+        self.running[schedule_id] = pump_id
+        self.stats["started"] += 1
+        self.set_status(schedule_id, IN_PROGRESS)
+
+    async def _stop(self, schedule_id: Hashable):
+        self.timers.pop(schedule_id, None)
+        self.pumps.pop(schedule_id, None)
+        if schedule_id in self.running:
+            await self._release(schedule_id)
+        self.stats["completed"] += 1
+        self.set_status(schedule_id, COMPLETED)
+        if self.on_done:
+            await self.on_done(schedule_id)
+
+    async def tick(self) -> int:
+        """Fire every timer due by the clock's current time; returns how many fired"""
+        expired = self.wheel.advance(self.now())
+        expired.sort(key=lambda t: (t.deadline, t.payload[0]))
+        for timer in expired:
+            action, schedule_id = timer.payload
+            try:
+                if action == START:
+                    await self._start(schedule_id)
+                else:
+                    await self._stop(schedule_id)
+            except Exception:
+                self.stats["errors"] += 1
+                logger.exception("Schedule %s %s failed", schedule_id, "start" if action == START else "stop")
+        self.last_tick = self.clock.now()
+        return len(expired)
+
+    async def run(self):
+        """Tick forever on the executor's clock"""
+        while True:
+            await self.clock.sleep(self.tick_seconds)
+            await self.tick()
+
+    def status(self) -> dict:
+        next_deadline = min(
+            (t.deadline for timers in self.timers.values() for t in timers if t.active),
+            default=None
+        )
+        return {
+            "now": self.clock.now(),
+            "last_tick": self.last_tick,
+            "armed_schedules": len(self.timers),
+            "pending_timers": len(self.wheel),
+            "running_schedules": len(self.running),
+            "next_timer": from_ticks(next_deadline) if next_deadline is not None else None,
+            "stats": dict(self.stats)
+        }
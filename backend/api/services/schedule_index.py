@@ -0,0 +1,104 @@
+"""
+Schedule Index
+Secondary indexes over the in-memory irrigation schedules: ids bucketed by
+date with the distinct dates kept sorted for bisect range lookups, plus
+hash indexes on status and crop. Filters intersect id sets, driven by the
+most selective one.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional, Set
+
+class ScheduleIndex:
+    def __init__(self):
+        self.dates: List[date] = []  # distinct dates, sorted
+        self.by_date: Dict[date, Set[int]] = {}
+        self.by_status: Dict[str, Set[int]] = {}
+        self.by_crop: Dict[str, Set[int]] = {}
+        self.date_of: Dict[int, date] = {}
+        # Exact-value counts for the summary's unique fields/crops
+        self.crop_names: Counter = Counter()
+        self.field_locations: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self.date_of)
+
+    @staticmethod
+    def _key(value: str) -> str:
+        return value.lower()
+
+    def add(self, schedule):
+        sid = schedule.id
+        day = schedule.date
+        bucket = self.by_date.get(day)
+        if bucket is None:
+            bucket = self.by_date[day] = set()
+            insort(self.dates, day)
+        bucket.add(sid)
+        self.by_status.setdefault(self._key(schedule.status), set()).add(sid)
+        self.by_crop.setdefault(self._key(schedule.cropName), set()).add(sid)
+        self.date_of[sid] = day
+        self.crop_names[schedule.cropName] += 1
+        self.field_locations[schedule.fieldLocation] += 1
+
+    def remove(self, schedule):
+        sid = schedule.id
+        day = self.date_of.pop(sid)
+        bucket = self.by_date[day]
+        bucket.discard(sid)
+        if not bucket:
+            del self.by_date[day]
+            del self.dates[bisect_left(self.dates, day)]
+        for index, key in ((self.by_status, self._key(schedule.status)), (self.by_crop, self._key(schedule.cropName))):
+            ids = index[key]
+            ids.discard(sid)
+            if not ids:
+                del index[key]
+        for counter, value in ((self.crop_names, schedule.cropName), (self.field_locations, schedule.fieldLocation)):
+            counter[value] -= 1
+            if not counter[value]:
+                del counter[value]
+
+    def date_range(self, start: Optional[date] = None, end: Optional[date] = None) -> List[Set[int]]:
+        """Id buckets for every date in [start, end]"""
+        lo = bisect_left(self.dates, start) if start else 0
+        hi = bisect_right(self.dates, end) if end else len(self.dates)
+        return [self.by_date[d] for d in self.dates[lo:hi]]
+
+    def on(self, day: date) -> Set[int]:
+        return self.by_date.get(day, set())
+
+    def status(self, status: str) -> Set[int]:
+        return self.by_status.get(self._key(status), set())
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        crop: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> Optional[List[int]]:
+        """
+        Ids matching every given filter in ascending id order, or None when no
+        filter is given (everything matches)
+        """
+        hashed = []
+        if status:
+            hashed.append(self.status(status))
+        if crop:
+            hashed.append(self.by_crop.get(self._key(crop), set()))
+        ranged = start is not None or end is not None
+        if not hashed and not ranged:
+            return None
+
+        sets = list(hashed)
+        if ranged:
+            buckets = self.date_range(start, end)
+            sets.append(buckets[0] if len(buckets) == 1 else set().union(*buckets))
+
+        # Set intersection iterates the smaller operand, so start from the most selective
+        sets.sort(key=len)
+        ids = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+        return sorted(ids)
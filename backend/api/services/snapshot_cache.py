@@ -0,0 +1,132 @@
+"""
+Snapshot Cache
+Holds the latest result of an expensive build as an immutable, versioned
+snapshot. Stores it depends on notify it when they change; changes are
+coalesced over a debounce window and the rebuild runs in the background, so
+readers always get the last finished snapshot straight from memory.
+"""
+
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from api.store_versions import StoreVersion
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Snapshot:
+    def __init__(self, version: int, data: Any, store_versions: Dict[str, int], build_ms: float):
+        self.version = version
+        self.data = data
+        self.store_versions = store_versions  # versions the build started from
+        self.built_at = datetime.now()
+        self.build_ms = build_ms
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "built_at": self.built_at,
+            "build_ms": self.build_ms,
+            "store_versions": self.store_versions
+        }
+
+class SnapshotCache:
+    def __init__(
+        self,
+        name: str,
+        build: Callable[[], Awaitable[Any]],
+        stores: List[StoreVersion],
+        debounce_seconds: float = 1.0,
+        max_age_seconds: float = 0
+    ):
+        # max_age_seconds > 0 also rebuilds periodically, for sources that can't signal changes
+        self.name = name
+        self.build = build
+        self.stores = stores
+        self.debounce_seconds = debounce_seconds
+        self.max_age_seconds = max_age_seconds
+        self.snapshot: Optional[Snapshot] = None
+        self.builds = 0
+        self.failures = 0
+        self._dirty = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._building: Optional[asyncio.Task] = None
+        for store in stores:
+            store.subscribe(self._changed)
+
+    def _changed(self, store: StoreVersion):
+        # Bumps can come from worker threads; hop onto the loop before touching timers
+        if self._loop is None:
+            self._dirty = True
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self):
+        self._dirty = True
+        if self._pending is None and self._building is None:
+            self._pending = self._loop.call_later(self.debounce_seconds, self._start_build)
+
+    def _start_build(self):
+        self._pending = None
+        self._building = self._loop.create_task(self._rebuild())
+
+    async def _rebuild(self):
+        self._dirty = False
+        versions = {store.name: store.version for store in self.stores}
+        started = self._loop.time()
+        try:
+            data = await self.build()
+            self.builds += 1
+            self.snapshot = Snapshot(
+                (self.snapshot.version + 1) if self.snapshot else 1,
+                data,
+                versions,
+                round((self._loop.time() - started) * 1000, 1)
+            )
+        except Exception:
+            self.failures += 1
+            logger.exception("%s snapshot build failed", self.name)
+        finally:
+            self._building = None
+            if self._dirty:
+                # Changes landed mid-build: take them in the next one
+                self._schedule()
+
+    async def start(self):
+        """Build the first snapshot and begin listening; call from the app's event loop"""
+        self._loop = asyncio.get_event_loop()
+        await self.refresh()
+        if self.max_age_seconds > 0:
+            self._loop.create_task(self._expire_loop())
+
+    async def refresh(self) -> Optional[Snapshot]:
+        """Rebuild now (waiting for any build in flight first) and return the new snapshot"""
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+        if self._building is not None:
+            await asyncio.shield(self._building)
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        self._building = self._loop.create_task(self._rebuild())
+        await asyncio.shield(self._building)
+        return self.snapshot
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(self.max_age_seconds)
+            snapshot = self.snapshot
+            stale = snapshot is None or (datetime.now() - snapshot.built_at).total_seconds() >= self.max_age_seconds
+            if stale and self._pending is None and self._building is None:
+                self._start_build()
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "snapshot": self.snapshot.info() if self.snapshot else None,
+            "current_store_versions": {store.name: store.version for store in self.stores},
+            "rebuild_pending": self._pending is not None or self._building is not None,
+            "builds": self.builds,
+            "failures": self.failures
+        }
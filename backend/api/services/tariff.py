@@ -0,0 +1,183 @@
+"""
+Electricity Tariff
+Time-of-use bands and monthly consumption slabs, with a vectorized cost
+engine that splits pump run intervals across bands and prices whole batches
+of logs at once
+"""
+
+from typing import List, Optional, Sequence
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+
+class TariffBand:
+    def __init__(self, name: str, start_hour: float, end_hour: float, multiplier: float):
+        # A band may wrap midnight (start_hour > end_hour)
+        self.name = name
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.multiplier = multiplier
+
+    def segments(self) -> List[tuple]:
+        """[start, end) second-of-day ranges covered by the band"""
+        start, end = self.start_hour * 3600, self.end_hour * 3600
+        if start < end:
+            return [(start, end)]
+        return [(start, SECONDS_PER_DAY), (0, end)]
+
+class TariffSlab:
+    def __init__(self, up_to_kwh: Optional[float], rate: float):
+        # up_to_kwh is the cumulative monthly consumption where the slab ends (None: no limit)
+        self.up_to_kwh = up_to_kwh
+        self.rate = rate
+
+class Tariff:
+    """
+    Cost of an interval = slab cost of its energy x time-weighted TOU multiplier.
+
+    Slab cost depends on where the interval's energy falls in the account's
+    cumulative consumption for the month. Band overlap uses cumulative
+    "seconds spent in band since epoch" functions, so any number of intervals
+    are split across bands with a handful of array operations.
+    """
+
+    def __init__(self, name: str, bands: Sequence[TariffBand], slabs: Sequence[TariffSlab]):
+        minutes = np.zeros(24 * 60, dtype=int)
+        for band in bands:
+            if not (0 <= band.start_hour <= 24 and 0 <= band.end_hour <= 24) or band.start_hour == band.end_hour:
+                raise ValueError(f"Band {band.name} must have distinct start/end hours within 0-24")
+            for start, end in band.segments():
+                minutes[int(start // 60):int(end // 60)] += 1
+        if (minutes > 1).any():
+            raise ValueError("Tariff bands must not overlap")
+        if not slabs or slabs[-1].up_to_kwh is not None:
+            raise ValueError("The last slab must be open-ended (up_to_kwh=None)")
+        limits = [s.up_to_kwh for s in slabs[:-1]]
+        if any(b <= a for a, b in zip([0] + limits, limits)):
+            raise ValueError("Slab limits must be increasing")
+        self.name = name
+        self.bands = list(bands)
+        self.slabs = list(slabs)
+
+        # Piecewise-linear cumulative cost curve over monthly kWh
+        self._slab_kwh = np.array([0.0] + limits, dtype=float)
+        rates = np.array([s.rate for s in self.slabs], dtype=float)
+        self._slab_cost = np.concatenate([[0.0], np.cumsum(np.diff(self._slab_kwh) * rates[:-1])])
+        self._top_rate = rates[-1]
+
+    # Time-of-use
+
+    def _seconds_in_band_since_epoch(self, band: TariffBand, t: np.ndarray) -> np.ndarray:
+        days, second_of_day = np.divmod(t, SECONDS_PER_DAY)
+        total = np.zeros(t.shape, dtype=float)
+        for start, end in band.segments():
+            total += days * (end - start) + np.clip(second_of_day - start, 0, end - start)
+        return total
+
+    def band_seconds(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """(n, len(bands) + 1) seconds of each interval in each band; the last column is off-band time"""
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.maximum(np.asarray(ends, dtype=np.int64), starts)
+        seconds = np.empty((len(starts), len(self.bands) + 1))
+        for i, band in enumerate(self.bands):
+            seconds[:, i] = self._seconds_in_band_since_epoch(band, ends) - self._seconds_in_band_since_epoch(band, starts)
+        seconds[:, -1] = (ends - starts) - seconds[:, :-1].sum(axis=1)
+        return seconds
+
+    def tou_multipliers(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Time-weighted TOU multiplier per interval (zero-length intervals use the band at start)"""
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        ends = np.where(ends > starts, ends, starts + 1)
+        seconds = self.band_seconds(starts, ends)
+        multipliers = np.array([b.multiplier for b in self.bands] + [1.0])
+        return seconds @ multipliers / seconds.sum(axis=1)
+
+    def hourly_multipliers(self) -> np.ndarray:
+        """TOU multiplier for each hour of the day"""
+        hours = np.arange(24, dtype=np.int64) * 3600
+        return self.tou_multipliers(hours, hours + 3600)
+
+    # Slabs
+
+    def cumulative_cost(self, kwh: np.ndarray) -> np.ndarray:
+        """Slab cost of the first `kwh` units consumed in a month"""
+        kwh = np.asarray(kwh, dtype=float)
+        top = self._slab_kwh[-1]
+        return np.where(
+            kwh <= top,
+            np.interp(kwh, self._slab_kwh, self._slab_cost),
+            self._slab_cost[-1] + (kwh - top) * self._top_rate
+        )
+
+    @property
+    def marginal_rate(self) -> float:
+        """Rate of the highest slab, the cost of each extra kWh for a heavy user"""
+        return float(self._top_rate)
+
+    # Pricing
+
+    def price(self, accounts: np.ndarray, starts: np.ndarray, ends: np.ndarray, energy: np.ndarray) -> np.ndarray:
+        """
+        Cost of each interval. accounts identify who is billed (slabs reset per
+        account and calendar month); starts/ends are epoch seconds of local time.
+        """
+        accounts = np.asarray(accounts, dtype=np.int64)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        energy = np.nan_to_num(np.asarray(energy, dtype=float))
+        if len(energy) == 0:
+            return np.zeros(0)
+
+        months = starts.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+        order = np.lexsort((starts, months, accounts))
+        acc, mon, kwh = accounts[order], months[order], energy[order]
+
+        # Monthly running consumption per account: global cumsum minus the total before each group
+        running = np.cumsum(kwh)
+        new_group = np.ones(len(kwh), dtype=bool)
+        new_group[1:] = (acc[1:] != acc[:-1]) | (mon[1:] != mon[:-1])
+        group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(kwh)), 0))
+        offset = (running - kwh)[group_start]
+        after = running - offset
+        before = after - kwh
+
+        cost = np.empty(len(kwh))
+        cost[order] = self.cumulative_cost(after) - self.cumulative_cost(before)
+        return cost * self.tou_multipliers(starts, ends)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "bands": [
+                {"name": b.name, "start_hour": b.start_hour, "end_hour": b.end_hour, "multiplier": b.multiplier}
+                for b in self.bands
+            ],
+            "slabs": [{"up_to_kwh": s.up_to_kwh, "rate": s.rate} for s in self.slabs]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Tariff":
+        """The inverse of to_dict; raises ValueError (or KeyError) on an invalid tariff"""
+        return cls(
+            data["name"],
+            [TariffBand(b["name"], b["start_hour"], b["end_hour"], b["multiplier"]) for b in data.get("bands", [])],
+            [TariffSlab(s["up_to_kwh"], s["rate"]) for s in data["slabs"]]
+        )
+
+DEFAULT_TARIFF = Tariff(
+    "agricultural-tod",
+    bands=[
+        TariffBand("off_peak", 22, 6, 0.85),
+        TariffBand("peak", 18, 22, 1.2)
+    ],
+    slabs=[
+        TariffSlab(100, 6.0),
+        TariffSlab(300, 7.5),
+        TariffSlab(None, 8.5)
+    ]
+)
+
+def to_epoch_seconds(values: Sequence) -> np.ndarray:
+    """Naive datetimes to epoch seconds of the same wall-clock time"""
+    return np.array(values, dtype="datetime64[s]").astype(np.int64)
@@ -0,0 +1,148 @@
+"""
+Timing Wheel
+Hierarchical timing wheel with one-second ticks: 64 slots per level, each
+level 64 times coarser than the one below, and an overflow set for timers
+past the top level. Inserting and cancelling a timer are O(1); timers
+cascade down a level as the wheel reaches their slot. Time comes from a
+clock, either the system clock or a simulated one for tests.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Set
+import asyncio
+
+WHEEL_BITS = 6
+WHEEL_SLOTS = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SLOTS - 1
+WHEEL_LEVELS = 5  # 64**5 seconds, about 34 years per top-level revolution
+
+def to_ticks(moment: datetime) -> int:
+    """Wall-clock seconds since 0001-01-01 (naive datetimes, as schedules are stored)"""
+    return moment.toordinal() * 86400 + moment.hour * 3600 + moment.minute * 60 + moment.second
+
+def from_ticks(ticks: int) -> datetime:
+    days, seconds = divmod(ticks, 86400)
+    return datetime.fromordinal(days) + timedelta(seconds=seconds)
+
+class Timer:
+    __slots__ = ("deadline", "payload", "level", "slot")
+
+    def __init__(self, deadline: int, payload: Any):
+        self.deadline = deadline
+        self.payload = payload
+        self.level = 0
+        self.slot: Optional[Set["Timer"]] = None
+
+    @property
+    def active(self) -> bool:
+        return self.slot is not None
+
+class TimingWheel:
+    def __init__(self, now: int, levels: int = WHEEL_LEVELS):
+        self.current = now  # next tick to process; every earlier tick has fired
+        self.levels = [[set() for _ in range(WHEEL_SLOTS)] for _ in range(levels)]
+        self.overflow: Set[Timer] = set()  # counted as level `levels`
+        self.level_counts = [0] * (levels + 1)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _place(self, timer: Timer):
+        # A deadline already passed fires on the next advance
+        deadline = max(timer.deadline, self.current)
+        # Lowest level whose slot range holds both the deadline and the cursor's parent block
+        level = 0
+        while level < len(self.levels) and (deadline >> (WHEEL_BITS * (level + 1))) != (self.current >> (WHEEL_BITS * (level + 1))):
+            level += 1
+        if level == len(self.levels):
+            slot = self.overflow
+        else:
+            slot = self.levels[level][(deadline >> (WHEEL_BITS * level)) & WHEEL_MASK]
+        slot.add(timer)
+        timer.level = level
+        timer.slot = slot
+        self.level_counts[level] += 1
+
+    def schedule(self, deadline: int, payload: Any = None) -> Timer:
+        timer = Timer(deadline, payload)
+        self._place(timer)
+        self.count += 1
+        return timer
+
+    def cancel(self, timer: Timer):
+        if timer.slot is not None:
+            timer.slot.discard(timer)
+            timer.slot = None
+            self.level_counts[timer.level] -= 1
+            self.count -= 1
+
+    def _cascade(self, level: int, tick: int):
+        if level == len(self.levels):
+            slot = self.overflow
+        else:
+            slot = self.levels[level][(tick >> (WHEEL_BITS * level)) & WHEEL_MASK]
+        timers = list(slot)
+        slot.clear()
+        self.level_counts[level] -= len(timers)
+        for timer in timers:
+            self._place(timer)
+
+    def advance(self, now: int) -> List[Timer]:
+        """Process every tick up to and including `now`; returns the expired timers in deadline order"""
+        expired: List[Timer] = []
+        while self.current <= now:
+            tick = self.current
+            for level in range(len(self.levels), 0, -1):
+                if self.level_counts[level] and not tick & ((1 << (WHEEL_BITS * level)) - 1):
+                    self._cascade(level, tick)
+
+            slot = self.levels[0][tick & WHEEL_MASK]
+            if slot:
+                due = sorted(slot, key=lambda t: t.deadline)
+                slot.clear()
+                for timer in due:
+                    timer.slot = None
+                self.level_counts[0] -= len(due)
+                self.count -= len(due)
+                expired.extend(due)
+
+            # Skip straight to the next tick that can fire or cascade anything
+            lowest = next((level for level, n in enumerate(self.level_counts) if n), None)
+            if lowest is None:
+                self.current = now + 1
+            elif lowest == 0:
+                index = tick & WHEEL_MASK
+                ahead = next((i for i in range(index + 1, WHEEL_SLOTS) if self.levels[0][i]), WHEEL_SLOTS)
+                self.current = min(tick - index + ahead, now + 1)
+            else:
+                step = 1 << (WHEEL_BITS * lowest)
+                self.current = min((tick // step + 1) * step, now + 1)
+        return expired
+
+class SystemClock:
+    def now(self) -> datetime:
+        return datetime.now()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+class SimulatedClock:
+    """A clock that only moves when told to"""
+
+    def __init__(self, start: datetime):
+        self.current = start
+
+    def now(self) -> datetime:
+        return self.current
+
+    def advance(self, seconds: float = 0, **kwargs) -> datetime:
+        self.current += timedelta(seconds=seconds, **kwargs)
+        return self.current
+
+    def set(self, moment: datetime):
+        self.current = moment
+
+    async def sleep(self, seconds: float):
+        # Simulated time is driven by advance(); just yield to the loop
+        await asyncio.sleep(0)
@@ -0,0 +1,129 @@
+"""
+Shared Weather Client
+One app-lifetime aiohttp session for OpenWeather with connection pooling, a
+TTL cache keyed on a lat/lon grid, single-flight coalescing of concurrent
+identical requests and stale-while-revalidate
+"""
+
+from fastapi import HTTPException
+from collections import OrderedDict
+from api.metrics import track_outbound
+from typing import Dict, Optional, Tuple
+import aiohttp
+import asyncio
+import os
+import time
+
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5")
+WEATHER_GRID_DEGREES = float(os.getenv("WEATHER_GRID_DEGREES", "0.1"))  # ~11 km cells
+WEATHER_CACHE_TTL_SECONDS = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "600"))
+WEATHER_STALE_TTL_SECONDS = float(os.getenv("WEATHER_STALE_TTL_SECONDS", "3600"))
+WEATHER_CACHE_MAX_ENTRIES = 10000
+WEATHER_POOL_SIZE = 20
+
+CacheKey = Tuple[str, float, float]
+
+class WeatherClient:
+    def __init__(
+        self,
+        base_url: str = OPENWEATHER_BASE_URL,
+        api_key: Optional[str] = None,
+        grid_degrees: float = WEATHER_GRID_DEGREES,
+        ttl: float = WEATHER_CACHE_TTL_SECONDS,
+        stale_ttl: float = WEATHER_STALE_TTL_SECONDS,
+        pool_size: int = WEATHER_POOL_SIZE
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.grid_degrees = grid_degrees
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.pool_size = pool_size
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._cache: "OrderedDict[CacheKey, Tuple[float, dict]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+
+    def grid_key(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Snap a coordinate to the centre of its weather grid cell"""
+        step = self.grid_degrees
+        return round(round(lat / step) * step, 6), round(round(lon / step) * step, 6)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._session
+
+    async def close(self):
+        """Close the pooled session (called on app shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _fetch(self, endpoint: str, lat: float, lon: float) -> dict:
+        params = {
+            "lat": lat,
+            "lon": lon,
+            "units": "metric"
+        }
+        api_key = self.api_key or os.getenv("OPENWEATHER_API_KEY")
+        if api_key:
+            params["appid"] = api_key
+        with track_outbound("weather"):
+            async with self._get_session().get(f"{self.base_url}/{endpoint}", params=params) as response:
+                if response.status == 200:
+                    return await response.json()
+                else:
+                    raise HTTPException(status_code=response.status, detail="Weather API error")
+
+    async def _fetch_and_store(self, key: CacheKey) -> dict:
+        endpoint, lat, lon = key
+        data = await self._fetch(endpoint, lat, lon)
+        self._cache[key] = (time.monotonic(), data)
+        self._cache.move_to_end(key)
+        while len(self._cache) > WEATHER_CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+        return data
+
+    def _start_fetch(self, key: CacheKey) -> asyncio.Future:
+        """Start a fetch for key, or join the one already in flight"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_store(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    def _refresh_in_background(self, key: CacheKey):
+        task = self._start_fetch(key)
+        # Background refreshes keep serving the stale value if they fail
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def get(self, endpoint: str, lat: float, lon: float) -> dict:
+        """
+        Get an OpenWeather payload for the grid cell containing lat/lon. The
+        payload is the cached object itself, shared by every caller in the
+        cell until it expires: read it, never mutate it (copy it first)
+        """
+        key = (endpoint, *self.grid_key(lat, lon))
+        cached = self._cache.get(key)
+        if cached:
+            age = time.monotonic() - cached[0]
+            if age < self.ttl:
+                self._cache.move_to_end(key)
+                return cached[1]
+            if age < self.stale_ttl:
+                self._refresh_in_background(key)
+                return cached[1]
+        # Shield so one cancelled caller doesn't cancel the fetch for everyone else
+        return await asyncio.shield(self._start_fetch(key))
+
+    async def get_current(self, lat: float, lon: float) -> dict:
+        """Current conditions (OpenWeather /weather); read-only, as for get()"""
+        return await self.get("weather", lat, lon)
+
+# Shared by every route for the lifetime of the app
+weather_client = WeatherClient()
@@ -0,0 +1,84 @@
+"""
+Store Versions
+Monotonic version counters for the in-memory stores. Every write to a store
+bumps its counter, so caches built from a store can tell when they are stale.
+Caches that rebuild eagerly can also subscribe to be told about each bump.
+Each store also keeps a short changelog of which records the recent bumps
+touched, so clients can sync just the changes since the version they hold.
+"""
+
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+CHANGELOG_SIZE = int(os.getenv("STORE_CHANGELOG_SIZE", "1024"))
+
+class StoreVersion:
+    def __init__(self, name: str, changelog_size: int = CHANGELOG_SIZE):
+        self.name = name
+        self.version = 0
+        # Versions restart with the process; the epoch tells clients their version is from an earlier run
+        self.epoch = uuid.uuid4().hex[:12]
+        # Ring buffer of (version, record id); deltas can be served from any version >= floor
+        self.changelog: Deque[Tuple[int, Hashable]] = deque(maxlen=changelog_size)
+        self.floor = 0
+        self.listeners: List[Callable[["StoreVersion"], None]] = []
+
+    def bump(self, changed: Optional[Iterable[Hashable]] = None) -> int:
+        """
+        Record a change to the store and return the new version. `changed` lists
+        the ids of the records created, updated or deleted; None means the change
+        can't be told per record, so clients holding an older version must resync.
+        """
+        self.version += 1
+        if changed is None:
+            self.floor = self.version
+        else:
+            for record_id in set(changed):
+                if len(self.changelog) == self.changelog.maxlen:
+                    # The oldest entry falls off: its version's changes are no longer complete
+                    self.floor = self.changelog[0][0]
+                self.changelog.append((self.version, record_id))
+        for listener in list(self.listeners):
+            try:
+                listener(self)
+            except Exception:
+                # A broken listener must not fail the write that bumped the store
+                logger.exception("Store listener for %s failed", self.name)
+        return self.version
+
+    def changes_since(self, since: int, epoch: Optional[str] = None) -> Optional[Set[Hashable]]:
+        """
+        Ids of the records changed after version `since`, or None when the
+        changelog no longer reaches back that far (or `since` is from another
+        epoch) and the client needs a full resync
+        """
+        if (epoch is not None and epoch != self.epoch) or not self.floor <= since <= self.version:
+            return None
+        changed = set()
+        for version, record_id in reversed(self.changelog):
+            if version <= since:
+                break
+            changed.add(record_id)
+        return changed
+
+    def subscribe(self, listener: Callable[["StoreVersion"], None]):
+        """Call listener(store) after every bump; it runs on the writer's thread, so keep it cheap"""
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[["StoreVersion"], None]):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+store_versions: Dict[str, StoreVersion] = {}
+
+def get_store_version(name: str) -> StoreVersion:
+    """Get (or create) the version counter for a named store"""
+    store = store_versions.get(name)
+    if store is None:
+        store = store_versions[name] = StoreVersion(name)
+    return store
@@ -0,0 +1,73 @@
+"""
+Farm Spatial Index Benchmark
+Loads synthetic farms (clustered around villages across a 20 x 20 degree
+region) into the spatial index and times k-nearest and within-radius
+queries against a brute-force NumPy scan.
+
+Usage:
+    python benchmarks/bench_farm_index.py --farms 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.services.farm_index import FarmSpatialIndex, EARTH_RADIUS_KM
+
+def brute_force_km(lats: np.ndarray, lons: np.ndarray, lat: float, lon: float) -> np.ndarray:
+    phi1, phi2 = np.radians(lat), np.radians(lats)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1, np.sqrt(a)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the farm spatial index")
+    parser.add_argument("--farms", type=int, default=100000, help="Number of farms")
+    parser.add_argument("--queries", type=int, default=2000, help="Queries per kind")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per k-nearest query")
+    parser.add_argument("--radius", type=float, default=10.0, help="Radius in km")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    villages = rng.uniform([10, 70], [30, 90], (args.farms // 50 + 1, 2))
+    homes = villages[rng.integers(0, len(villages), args.farms)]
+    lats = homes[:, 0] + rng.normal(0, 0.05, args.farms)
+    lons = homes[:, 1] + rng.normal(0, 0.05, args.farms)
+
+    index = FarmSpatialIndex()
+    started = time.perf_counter()
+    for farm_id, (lat, lon) in enumerate(zip(lats.tolist(), lons.tolist()), start=1):
+        index.upsert(farm_id, lat, lon)
+    print(f"Indexed {args.farms} farms in {len(index.buckets)} cells in {time.perf_counter() - started:.2f} s")
+
+    queries = rng.uniform([10, 70], [30, 90], (args.queries, 2)).tolist()
+
+    started = time.perf_counter()
+    for lat, lon in queries:
+        index.nearest(lat, lon, args.k)
+    per_query = (time.perf_counter() - started) / args.queries * 1e6
+    print(f"{args.k}-nearest: {per_query:.1f} us/query")
+
+    started = time.perf_counter()
+    found = sum(len(index.within(lat, lon, args.radius)) for lat, lon in queries)
+    per_query = (time.perf_counter() - started) / args.queries * 1e6
+    print(f"Within {args.radius} km: {per_query:.1f} us/query ({found / args.queries:.1f} farms on average)")
+
+    sample = queries[:50]
+    started = time.perf_counter()
+    for lat, lon in sample:
+        distances = brute_force_km(lats, lons, lat, lon)
+        expected = np.sort(distances)[:args.k]
+        got = [d for d, _ in index.nearest(lat, lon, args.k)]
+        assert np.allclose(expected, got), (lat, lon)
+        assert (distances <= args.radius).sum() == len(index.within(lat, lon, args.radius))
+    per_query = (time.perf_counter() - started) / len(sample) * 1e6
+    print(f"Brute-force NumPy scan (checked against the index): {per_query:.0f} us/query")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Fast JSON Response Benchmark
+Serializes synthetic records for each list endpoint the way FastAPI does with
+response_model=List[...] (validate every item, jsonable_encoder, json.dumps)
+and through the orjson fast path, checks both give the same JSON values and
+reports the time per response.
+
+"same JSON" compares the decoded values with ==, so it can't tell 0 from 0.0:
+the fast path sends stored numbers as stored (an int flow_rate of 0 or 150
+goes out as 0 / 150), while the validated path coerces them to the model's
+float (0.0 / 150.0). Clients parsing JSON see the same numbers either way.
+
+Usage:
+    python benchmarks/bench_fast_json.py --rows 500
+    python benchmarks/bench_fast_json.py --endpoints pumps,sensors
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.fast_json import get_record_encoder
+from api.models import models, schemas
+
+def water_usage_rows(count: int):
+    from api.routes.water_usage import WaterUsageResponse
+    now = datetime.now()
+    rows = [
+        {
+            "id": i, "field_name": f"Field {i % 40}", "crop_type": "Wheat",
+            "date": date.today() - timedelta(days=i % 30), "water_used": 5200.0 + i,
+            "start_time": "06:00", "end_time": "08:30", "flow_rate": 45.5, "source": "Borewell",
+            "notes": None, "status": "optimal", "cost": 312.0, "duration": "2h 30m",
+            "created_at": now, "updated_at": now
+        }
+        for i in range(count)
+    ]
+    return WaterUsageResponse, rows
+
+def pump_rows(count: int):
+    from api.routes.pump_stats import PumpResponse
+    now = datetime.now()
+    rows = [
+        {
+            "id": i, "name": f"Pump-{i:04d}", "location": "North Field - Borewell", "status": "running",
+            "power_rating": 7.5, "max_flow_rate": 250.0, "manufacturer": "Kirloskar", "model_number": "KS-75",
+            "installation_date": date(2022, 1, 15), "maintenance_interval": 90, "notes": None,
+            "flow_rate": 212.5, "voltage": 415.0, "current": 12.75, "power_consumption": 9.0,
+            "runtime_today": 3.5, "temperature": 42.0, "efficiency": 88.75,
+            "last_maintenance": date(2024, 1, 1), "next_maintenance": date(2024, 3, 31),
+            "energy_today": 31.5, "total_runtime": 1520.0, "created_at": now, "updated_at": now,
+            "last_telemetry_at": now
+        }
+        for i in range(count)
+    ]
+    return PumpResponse, rows
+
+def sensor_rows(count: int):
+    now = datetime.now()
+    rows = [
+        models.SensorData(
+            id=i, sensor_id=f"S-{i % 50}", temperature=24.5, ph_level=7.1,
+            turbidity=3.2, dissolved_oxygen=6.8, timestamp=now
+        )
+        for i in range(count)
+    ]
+    return schemas.SensorData, rows
+
+def hazard_rows(count: int):
+    now = datetime.now()
+    rows = [
+        models.HazardLog(id=i, severity="Warning", description="High turbidity", sensor_data_id=i, timestamp=now)
+        for i in range(count)
+    ]
+    return schemas.HazardLog, rows
+
+ENDPOINTS = {
+    "water-usage": water_usage_rows,
+    "pumps": pump_rows,
+    "sensors": sensor_rows,
+    "hazards": hazard_rows
+}
+
+def standard(field, records) -> bytes:
+    content = asyncio.run(serialize_response(field=field, response_content=records))
+    return JSONResponse(content).body
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<12} {'standard':>12} {'fast':>12} {'speedup':>8}  same JSON")
+    for name in args.endpoints.split(","):
+        model, records = ENDPOINTS[name](args.rows)
+        field = create_response_field(name="Response", type_=List[model])
+        encoder = get_record_encoder(model)
+
+        same = json.loads(standard(field, records)) == json.loads(encoder.encode(records))
+        slow = timed(lambda: standard(field, records), args.repeat)
+        fast = timed(lambda: encoder.encode(records), args.repeat)
+        print(f"{name:<12} {slow * 1000:>9.2f} ms {fast * 1000:>9.2f} ms {slow / fast:>7.1f}x  {same}")
+
+if __name__ == "__main__":
+    main()
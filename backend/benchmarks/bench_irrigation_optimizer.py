@@ -0,0 +1,85 @@
+"""
+Irrigation Optimizer Benchmark
+Plans a synthetic farm (fields with 5 days of demand, a share of them limited
+to a few nearby pumps) over a pump fleet, then times incremental re-plans
+for a handful of changed fields and for one pump going offline.
+
+Usage:
+    python benchmarks/bench_irrigation_optimizer.py --fields 500 --pumps 50
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.services.irrigation_optimizer import FieldDemand, IrrigationPlanner, PumpCapacity, HP_TO_KW
+
+DAYS = 5
+
+def build_instance(fields: int, pumps: int, load: float, restricted_share: float, seed: int):
+    """Fields whose total demand is `load` x fleet capacity"""
+    rng = np.random.default_rng(seed)
+    flow = rng.uniform(120, 400, pumps)
+    power_hp = flow / 35 * rng.uniform(0.9, 1.1, pumps)
+    pump_list = [PumpCapacity(i + 1, float(flow[i]), float(power_hp[i] * HP_TO_KW)) for i in range(pumps)]
+
+    daily_capacity = flow.sum() * 60 * 24 * 0.85
+    weights = rng.lognormal(0, 0.5, fields)
+    base = weights / weights.sum() * daily_capacity * load
+    weather = rng.uniform(0.8, 1.2, (fields, DAYS))
+
+    field_list = []
+    for i in range(fields):
+        pump_ids = None
+        if rng.random() < restricted_share:
+            pump_ids = [int(p) + 1 for p in rng.choice(pumps, size=3, replace=False)]
+        field_list.append(FieldDemand(f"field-{i + 1}", base[i] * weather[i], pump_ids))
+    return field_list, pump_list, rng
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the irrigation optimizer")
+    parser.add_argument("--fields", type=int, default=500, help="Number of fields")
+    parser.add_argument("--pumps", type=int, default=50, help="Number of pumps")
+    parser.add_argument("--load", type=float, default=0.7, help="Total demand as a share of pump capacity")
+    parser.add_argument("--restricted", type=float, default=0.2, help="Share of fields limited to three pumps")
+    parser.add_argument("--changes", type=int, default=10, help="Fields changed per re-plan")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+
+    fields, pumps, rng = build_instance(args.fields, args.pumps, args.load, args.restricted, args.seed)
+    # Cheaper night-time energy so the solver has something to optimize besides evaporation
+    prices = np.tile(np.where((np.arange(24) >= 22) | (np.arange(24) < 6), 6.0, 8.5), DAYS)
+    planner = IrrigationPlanner(date.today(), DAYS, prices)
+
+    started = time.perf_counter()
+    planner.solve(fields, pumps)
+    solve_time = time.perf_counter() - started
+    plan = planner.to_dict()
+    print(f"Solved {args.fields} fields x {args.pumps} pumps x {DAYS} days in {solve_time:.2f} s")
+    print(f"  energy {plan['total_energy_kwh']} kWh, cost Rs {plan['total_energy_cost']}, "
+          f"unmet {plan['total_unmet_liters']} L")
+
+    changed = [
+        FieldDemand(f.field_id, np.array(f.daily_liters) * rng.uniform(0.8, 1.2), f.pump_ids)
+        for f in rng.choice(fields, size=args.changes, replace=False)
+    ]
+    started = time.perf_counter()
+    replanned = planner.replan(fields=changed)
+    print(f"Re-planned {len(replanned)} changed fields in {time.perf_counter() - started:.3f} s")
+
+    started = time.perf_counter()
+    replanned = planner.replan(removed_pump_ids=[pumps[0].pump_id])
+    print(f"Pump {pumps[0].pump_id} offline: re-planned {len(replanned)} fields in {time.perf_counter() - started:.3f} s")
+
+    started = time.perf_counter()
+    planner.to_dict()
+    print(f"Rendered plan in {time.perf_counter() - started:.2f} s")
+
+if __name__ == "__main__":
+    main()
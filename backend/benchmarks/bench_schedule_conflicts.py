@@ -0,0 +1,76 @@
+"""
+Schedule Conflict Benchmark
+Loads synthetic irrigation windows (a year of dates, fields and pumps shared
+across schedules) into the per-field and per-pump interval trees and times
+the overlap check create/update run against a scan of every stored window,
+plus the conflicts report for one week.
+
+Usage:
+    python benchmarks/bench_schedule_conflicts.py --schedules 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.services.interval_tree import KeyedIntervalTrees
+
+MINUTES_PER_DAY = 1440
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark interval-tree schedule conflict checks")
+    parser.add_argument("--schedules", type=int, default=1000000, help="Number of stored schedules")
+    parser.add_argument("--fields", type=int, default=20000, help="Number of fields")
+    parser.add_argument("--pumps", type=int, default=5000, help="Number of pumps")
+    parser.add_argument("--checks", type=int, default=2000, help="Number of overlap checks to time")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    starts = (rng.integers(0, 365, args.schedules) * MINUTES_PER_DAY + rng.integers(4 * 60, 20 * 60, args.schedules)).tolist()
+    ends = (np.array(starts) + rng.integers(30, 180, args.schedules)).tolist()
+    fields = rng.integers(0, args.fields, args.schedules).tolist()
+    pumps = rng.integers(0, args.pumps, args.schedules).tolist()
+
+    field_windows, pump_windows = KeyedIntervalTrees(), KeyedIntervalTrees()
+    started = time.perf_counter()
+    for sid in range(args.schedules):
+        field_windows.add(fields[sid], starts[sid], ends[sid], sid)
+        pump_windows.add(pumps[sid], starts[sid], ends[sid], sid)
+    elapsed = time.perf_counter() - started
+    print(f"Indexed {args.schedules} windows in {elapsed:.2f} s ({elapsed / args.schedules * 1e6:.1f} us each)")
+
+    probes = rng.integers(0, args.schedules, args.checks).tolist()
+    started = time.perf_counter()
+    tree_hits = [
+        len(field_windows.overlapping(fields[p], starts[p], ends[p], exclude=p))
+        + len(pump_windows.overlapping(pumps[p], starts[p], ends[p], exclude=p))
+        for p in probes
+    ]
+    tree_time = (time.perf_counter() - started) / args.checks
+
+    # The alternative: compare the new window with every stored one
+    s, e, f, pu = np.array(starts), np.array(ends), np.array(fields), np.array(pumps)
+    ids = np.arange(args.schedules)
+    scan_probes = probes[:50]
+    started = time.perf_counter()
+    scan_hits = []
+    for p in scan_probes:
+        overlap = (s < ends[p]) & (e > starts[p]) & (ids != p)
+        scan_hits.append(int((overlap & (f == fields[p])).sum() + (overlap & (pu == pumps[p])).sum()))
+    scan_time = (time.perf_counter() - started) / len(scan_probes)
+    assert scan_hits == tree_hits[:len(scan_probes)]
+    print(f"Overlap check: {tree_time * 1e6:.1f} us vs {scan_time * 1e3:.1f} ms numpy scan")
+
+    week = (100 * MINUTES_PER_DAY, 107 * MINUTES_PER_DAY)
+    started = time.perf_counter()
+    pairs = sum(1 for _ in field_windows.overlapping_pairs(*week)) + sum(1 for _ in pump_windows.overlapping_pairs(*week))
+    print(f"Conflicts report for one week: {pairs} overlapping pairs in {(time.perf_counter() - started) * 1e3:.0f} ms")
+
+if __name__ == "__main__":
+    main()
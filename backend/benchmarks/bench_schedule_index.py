@@ -0,0 +1,109 @@
+"""
+Irrigation Schedule Index Benchmark
+Loads synthetic schedules (two years of dates, a few statuses and crops)
+into the schedule index and times the /irrigation-schedules filters and
+today's stats lookup against the list scans they replaced.
+
+Usage:
+    python benchmarks/bench_schedule_index.py --schedules 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.routes.irrigation import IrrigationSchedule
+from api.services.schedule_index import ScheduleIndex
+
+STATUSES = ["completed", "pending", "in progress"]
+CROPS = ["Rice", "Wheat", "Corn", "Cotton", "Sugarcane", "Potato", "Tomato", "Soybean"]
+
+def build(count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    first = date.today() - timedelta(days=365)
+    offsets = rng.integers(0, 730, count).tolist()
+    statuses = rng.choice(len(STATUSES), count, p=[0.7, 0.2, 0.1]).tolist()
+    crops = rng.integers(0, len(CROPS), count).tolist()
+    schedules = {}
+    for i in range(count):
+        sid = i + 1
+        schedules[sid] = IrrigationSchedule.construct(
+            id=sid,
+            cropName=CROPS[crops[i]],
+            fieldLocation=f"Field {i % 500}",
+            moistureLevel=40,
+            startTime="06:00",
+            endTime="07:00",
+            waterUsed=500,
+            date=first + timedelta(days=offsets[i]),
+            weather="Sunny",
+            workerName="Worker",
+            status=STATUSES[statuses[i]]
+        )
+    return schedules
+
+def scan(schedules, status=None, crop=None, start=None, end=None):
+    """The list-comprehension filters the index replaced"""
+    result = list(schedules.values())
+    if status:
+        result = [s for s in result if s.status.lower() == status.lower()]
+    if crop:
+        result = [s for s in result if s.cropName.lower() == crop.lower()]
+    if start:
+        result = [s for s in result if s.date >= start]
+    if end:
+        result = [s for s in result if s.date <= end]
+    return [s.id for s in result]
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the irrigation schedule index")
+    parser.add_argument("--schedules", type=int, default=1000000, help="Number of schedules")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query (best is reported)")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    schedules = build(args.schedules, args.seed)
+    print(f"Built {args.schedules} schedules in {time.perf_counter() - started:.1f} s")
+
+    index = ScheduleIndex()
+    started = time.perf_counter()
+    for schedule in schedules.values():
+        index.add(schedule)
+    print(f"Indexed in {time.perf_counter() - started:.1f} s ({len(index.dates)} distinct dates)")
+
+    today = date.today()
+    queries = {
+        "one day": dict(start=today, end=today),
+        "one week": dict(start=today - timedelta(days=7), end=today),
+        "status=in progress": dict(status="in progress"),
+        "crop + one month": dict(crop="rice", start=today - timedelta(days=30), end=today),
+        "status + crop + week": dict(status="pending", crop="wheat", start=today - timedelta(days=7), end=today)
+    }
+    print(f"{'query':24} {'rows':>8} {'index ms':>10} {'scan ms':>10}")
+    for name, filters in queries.items():
+        index_time, ids = timed(lambda: index.query(**filters), args.repeat)
+        scan_time, expected = timed(lambda: scan(schedules, **filters), 1)
+        assert ids == expected, name
+        print(f"{name:24} {len(ids):>8} {index_time * 1000:>10.2f} {scan_time * 1000:>10.1f}")
+
+    index_time, _ = timed(lambda: [schedules[sid] for sid in index.on(today)], args.repeat)
+    scan_time, _ = timed(lambda: [s for s in schedules.values() if s.date == today], 1)
+    print(f"{'today stats rows':24} {len(index.on(today)):>8} {index_time * 1000:>10.2f} {scan_time * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    main()
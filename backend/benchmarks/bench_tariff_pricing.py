@@ -0,0 +1,46 @@
+"""
+Tariff Pricing Benchmark
+Prices synthetic pump run intervals (random farms, 90 days, runs up to 6 hours)
+with the default time-of-use tariff: every interval is split across bands
+and billed through its farm's monthly slabs.
+
+Usage:
+    python benchmarks/bench_tariff_pricing.py --logs 5000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.services.tariff import DEFAULT_TARIFF
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized tariff pricing")
+    parser.add_argument("--logs", type=int, default=5000000, help="Number of pump log intervals")
+    parser.add_argument("--farms", type=int, default=10000, help="Number of billed farms")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    base = np.datetime64("2024-01-01T00:00:00").astype(np.int64)
+    starts = base + rng.integers(0, 90 * 86400, args.logs)
+    ends = starts + rng.integers(0, 6 * 3600, args.logs)
+    farms = rng.integers(1, args.farms + 1, args.logs)
+    energy = (ends - starts) / 3600 * rng.uniform(0.4, 4, args.logs)
+
+    started = time.perf_counter()
+    costs = DEFAULT_TARIFF.price(farms, starts, ends, energy)
+    elapsed = time.perf_counter() - started
+
+    print(f"Priced {args.logs} intervals for {args.farms} farms in {elapsed:.2f} s "
+          f"({args.logs / elapsed / 1e6:.1f} M/s)")
+    print(f"Energy {energy.sum():,.0f} kWh, cost Rs {costs.sum():,.0f}, "
+          f"average Rs {costs.sum() / energy.sum():.3f}/kWh")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,39 @@
 from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta
 from typing import Optional, List
 from dotenv import load_dotenv
+import logging
 import os
 
 # Load environment variables
 load_dotenv()
 
+# The api.* loggers (slow queries, failed background jobs) go to stderr; uvicorn configures only its own
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+# After load_dotenv: these read their settings from the environment at import
+from api.compression import CompressionMiddleware
+from api.etag import ETagMiddleware, ETagRule
+from api.metrics import MetricsMiddleware, registry
+from api.profiling import ProfilingMiddleware
+
 app = FastAPI(title="Water Monitoring System API")
 
+# Weak ETags for polled endpoints, from the versions of the stores each one reads.
+# Added before CORS so the CORS middleware wraps it and 304s get CORS headers too
+app.add_middleware(ETagMiddleware, rules=[
+    ETagRule("/api/pumps/live", ["pumps"]),
+    ETagRule("/api/pumps/status", ["pumps"]),
+    ETagRule("/api/water-usage", ["water_usage"]),
+    ETagRule("/api/water-usage/stats/*", ["water_usage"], daily=True),
+    ETagRule("/api/dashboard/cards*", ["dashboard_cards"]),
+    ETagRule("/api/dashboard/stats", ["dashboard_cards"]),
+    ETagRule("/api/irrigation-schedules/stats/*", ["irrigation_schedules"], daily=True),
+])
+
 # CORS middleware configuration
 origins = os.getenv("CORS_ORIGINS", "").split(",")
 app.add_middleware(
@@ -21,8 +44,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Wraps ETag and CORS, so every response from the app (304s aside, which have no body)
+# goes out compressed when accepted; only profiling and metrics sit outside it
+app.add_middleware(CompressionMiddleware)
+
+# Profiles requests carrying the admin token, or a sampled fraction of all requests
+app.add_middleware(ProfilingMiddleware)
+
+# Outermost of all, so latency and response sizes are what clients see
+app.add_middleware(MetricsMiddleware)
+
 # Import routers
-from api.routes import sensors, weather, hazards, alerts, auth, irrigation, dashboard, water_usage, pump_stats
+from api.routes import sensors, weather, hazards, alerts, auth, irrigation, dashboard, water_usage, pump_stats, farming, admin
+from api.services.weather_client import weather_client
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
@@ -34,11 +68,21 @@ app.include_router(irrigation.router, prefix="/api", tags=["Irrigation"])
 app.include_router(dashboard.router, prefix="/api", tags=["Dashboard"])
 app.include_router(water_usage.router, tags=["Water Usage"])
 app.include_router(pump_stats.router, tags=["Pump Stats"])
+app.include_router(farming.router, prefix="/api/farming", tags=["Farming"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+
+@app.on_event("shutdown")
+async def close_weather_client():
+    await weather_client.close()
 
 @app.get("/")
 async def root():
     return {"message": "Water Monitoring System API"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.exposition(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
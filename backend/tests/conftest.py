@@ -0,0 +1,8 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+# Tests import the app's modules (api.*) and the local tools as top-level modules
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "tools"))
@@ -0,0 +1,176 @@
+"""
+Schedule executor tests, driven by a simulated clock: the clock is moved by
+hand and the executor ticked, so no test sleeps
+"""
+
+from datetime import datetime, timedelta
+from api.services.schedule_executor import COMPLETED, IN_PROGRESS, MISSED, PENDING, ScheduleExecutor
+from api.services.timing_wheel import WHEEL_SLOTS, SimulatedClock, TimingWheel, to_ticks
+import asyncio
+
+START = datetime(2026, 6, 1, 6, 0, 0)
+PUMP = 7
+
+class Recorder:
+    """Pump actions and status changes, in the order the executor made them"""
+
+    def __init__(self):
+        self.events = []
+        self.statuses = {}
+
+    async def start_pump(self, pump_id: int) -> bool:
+        self.events.append(("start", pump_id))
+        return True
+
+    async def stop_pump(self, pump_id: int) -> bool:
+        self.events.append(("stop", pump_id))
+        return True
+
+    def set_status(self, schedule_id, status: str):
+        self.events.append(("status", schedule_id, status))
+        self.statuses[schedule_id] = status
+
+def make_executor(now: datetime = START):
+    clock = SimulatedClock(now)
+    recorder = Recorder()
+    executor = ScheduleExecutor(recorder.start_pump, recorder.stop_pump, recorder.set_status, clock=clock)
+    return executor, clock, recorder
+
+def window(start: datetime, minutes: int):
+    return to_ticks(start), to_ticks(start + timedelta(minutes=minutes))
+
+def test_starts_and_stops_with_status_changes():
+    async def run():
+        executor, clock, recorder = make_executor()
+        await executor.arm(1, *window(START + timedelta(minutes=10), 30), PUMP, PENDING)
+
+        clock.advance(minutes=9, seconds=59)
+        assert await executor.tick() == 0
+        assert recorder.events == []
+
+        clock.advance(seconds=1)
+        assert await executor.tick() == 1
+        assert recorder.events == [("start", PUMP), ("status", 1, IN_PROGRESS)]
+
+        clock.advance(minutes=30)
+        assert await executor.tick() == 1
+        assert recorder.events[2:] == [("stop", PUMP), ("status", 1, COMPLETED)]
+        assert executor.status()["armed_schedules"] == 0
+        assert len(executor.wheel) == 0
+    asyncio.run(run())
+
+def test_disarm_on_update_and_delete():
+    async def run():
+        executor, clock, recorder = make_executor()
+        await executor.arm(1, *window(START + timedelta(minutes=5), 10), PUMP, PENDING)
+        await executor.arm(2, *window(START + timedelta(minutes=5), 10), PUMP + 1, PENDING)
+
+        # An update that takes the schedule out of pending disarms it
+        await executor.arm(1, *window(START + timedelta(minutes=5), 10), PUMP, COMPLETED)
+        # Deleting disarms it too
+        await executor.disarm(2)
+        assert len(executor.wheel) == 0
+
+        clock.advance(hours=1)
+        assert await executor.tick() == 0
+        assert recorder.events == []
+    asyncio.run(run())
+
+def test_disarm_stops_a_running_pump():
+    async def run():
+        executor, clock, recorder = make_executor()
+        await executor.arm(1, *window(START, 30), PUMP, PENDING)
+        await executor.tick()
+        assert recorder.statuses[1] == IN_PROGRESS
+
+        clock.advance(minutes=10)
+        await executor.disarm(1)
+        assert recorder.events[-1] == ("stop", PUMP)
+        assert executor.status()["running_schedules"] == 0
+
+        clock.advance(hours=1)
+        assert await executor.tick() == 0
+    asyncio.run(run())
+
+def test_rearm_when_moved():
+    async def run():
+        executor, clock, recorder = make_executor()
+        await executor.arm(1, *window(START + timedelta(minutes=10), 10), PUMP, PENDING)
+        # Moved an hour later: the old timers must not fire
+        await executor.arm(1, *window(START + timedelta(hours=1, minutes=10), 10), PUMP, PENDING)
+        assert len(executor.wheel) == 2
+
+        clock.advance(minutes=30)
+        assert await executor.tick() == 0
+        assert recorder.events == []
+
+        clock.advance(minutes=40)
+        assert await executor.tick() == 1
+        assert recorder.statuses[1] == IN_PROGRESS
+        clock.advance(minutes=10)
+        assert await executor.tick() == 1
+        assert recorder.statuses[1] == COMPLETED
+    asyncio.run(run())
+
+def test_catch_up_when_armed_after_start():
+    async def run():
+        # As after a restart mid-window: a pending schedule that has already begun starts on the next tick
+        executor, clock, recorder = make_executor(START + timedelta(minutes=15))
+        await executor.arm(1, *window(START, 30), PUMP, PENDING)
+        assert await executor.tick() == 1
+        assert recorder.events == [("start", PUMP), ("status", 1, IN_PROGRESS)]
+
+        clock.advance(minutes=15)
+        assert await executor.tick() == 1
+        assert recorder.statuses[1] == COMPLETED
+    asyncio.run(run())
+
+def test_catch_up_when_armed_after_end():
+    async def run():
+        executor, clock, recorder = make_executor(START + timedelta(hours=2))
+        # Pending and over: missed, the pump never touched
+        await executor.arm(1, *window(START, 30), PUMP, PENDING)
+        assert recorder.events == [("status", 1, MISSED)]
+
+        # In progress when the process went down and over since: stopped on the next tick
+        await executor.arm(2, *window(START, 30), PUMP, IN_PROGRESS)
+        assert await executor.tick() == 1
+        assert recorder.events[1:] == [("stop", PUMP), ("status", 2, COMPLETED)]
+        assert executor.status()["stats"] == {"missed": 1, "completed": 1}
+    asyncio.run(run())
+
+def test_timers_cascade_from_higher_levels():
+    async def run():
+        executor, clock, recorder = make_executor()
+        # Two and three levels up the wheel (64**2 and 64**3 seconds are about 68 minutes and 3 days)
+        starts = {1: START + timedelta(hours=3), 2: START + timedelta(days=10, seconds=17)}
+        for schedule_id, start in starts.items():
+            await executor.arm(schedule_id, *window(start, 5), PUMP + schedule_id, PENDING)
+        assert executor.wheel.level_counts[0] == 0
+
+        clock.set(starts[1] - timedelta(seconds=1))
+        assert await executor.tick() == 0
+        clock.advance(seconds=1)
+        assert await executor.tick() == 1
+        assert recorder.statuses == {1: IN_PROGRESS}
+
+        clock.set(starts[2] - timedelta(seconds=1))
+        assert await executor.tick() == 1  # schedule 1's stop
+        clock.advance(seconds=1)
+        assert await executor.tick() == 1
+        assert recorder.statuses == {1: COMPLETED, 2: IN_PROGRESS}
+    asyncio.run(run())
+
+def test_wheel_fires_each_timer_at_its_deadline():
+    now = to_ticks(START)
+    wheel = TimingWheel(now)
+    offsets = [0, 1, WHEEL_SLOTS - 1, WHEEL_SLOTS, WHEEL_SLOTS ** 2 + 3, WHEEL_SLOTS ** 3 * 2 + 5, WHEEL_SLOTS ** 5 + 1]
+    for offset in offsets:
+        wheel.schedule(now + offset, offset)
+    fired = {}
+    for offset in sorted(offsets):
+        if offset:
+            assert wheel.advance(now + offset - 1) == []
+        fired[offset] = [t.payload for t in wheel.advance(now + offset)]
+    assert fired == {offset: [offset] for offset in offsets}
+    assert len(wheel) == 0
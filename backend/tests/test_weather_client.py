@@ -0,0 +1,102 @@
+"""
+Weather client tests against the fake weather server (tools/fake_weather_server.py),
+started in-process on a free port for each test
+"""
+
+from contextlib import asynccontextmanager
+from aiohttp import web
+from api.services.weather_client import WeatherClient
+from fake_weather_server import create_app
+import asyncio
+import time
+
+LATENCY = 0.1
+
+@asynccontextmanager
+async def weather_server(latency: float = LATENCY):
+    """Yield (client, upstream call counts) for a fake server on a free port"""
+    runner = web.AppRunner(create_app(latency))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    async def calls() -> dict:
+        async with client._get_session().get(f"{base_url}/stats") as response:
+            return await response.json()
+
+    client = WeatherClient(base_url=f"{base_url}/data/2.5", api_key="test", ttl=60, stale_ttl=600)
+    try:
+        yield client, calls
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+def test_grid_key_rounds_to_cell_centre():
+    client = WeatherClient(grid_degrees=0.1)
+    assert client.grid_key(23.0312, 72.5849) == (23.0, 72.6)
+    assert client.grid_key(23.0312, 72.5849) == client.grid_key(22.9751, 72.6449)
+    assert client.grid_key(-0.04, 0.14) == (0.0, 0.1)
+
+def test_cache_hit_within_ttl():
+    async def run():
+        async with weather_server() as (client, calls):
+            first = await client.get_current(23.03, 72.58)
+            started = time.perf_counter()
+            second = await client.get_current(23.03, 72.58)
+            elapsed = time.perf_counter() - started
+            assert second == first
+            assert elapsed < LATENCY
+            assert (await calls())["weather"] == 1
+    asyncio.run(run())
+
+def test_nearby_coordinates_share_a_grid_cell():
+    async def run():
+        async with weather_server() as (client, calls):
+            first = await client.get_current(23.031, 72.584)
+            second = await client.get_current(22.976, 72.644)
+            assert second == first
+            # The request goes out for the cell centre, not the caller's coordinate
+            assert first["coord"] == {"lat": 23.0, "lon": 72.6}
+            assert (await calls())["weather"] == 1
+            await client.get_current(23.2, 72.6)
+            assert (await calls())["weather"] == 2
+    asyncio.run(run())
+
+def test_concurrent_requests_make_one_upstream_call():
+    async def run():
+        async with weather_server() as (client, calls):
+            results = await asyncio.gather(*(client.get_current(23.03, 72.58) for _ in range(20)))
+            assert all(result == results[0] for result in results)
+            assert (await calls())["weather"] == 1
+            assert not client._inflight
+    asyncio.run(run())
+
+def test_stale_entry_is_served_while_revalidating():
+    async def run():
+        async with weather_server() as (client, calls):
+            client.ttl = 0.05
+            first = await client.get_current(23.03, 72.58)
+            await asyncio.sleep(0.1)
+            # Past the TTL but within the stale TTL: the old value comes back at once...
+            started = time.perf_counter()
+            stale = await client.get_current(23.03, 72.58)
+            assert stale == first
+            assert time.perf_counter() - started < LATENCY
+            # ...while a refresh runs in the background and replaces it
+            await asyncio.sleep(LATENCY * 3)
+            assert (await calls())["weather"] == 2
+            cached_at, _ = client._cache[("weather", 23.0, 72.6)]
+            assert time.monotonic() - cached_at < LATENCY * 3
+    asyncio.run(run())
+
+def test_expired_entry_is_fetched_again():
+    async def run():
+        async with weather_server() as (client, calls):
+            client.ttl = client.stale_ttl = 0.05
+            await client.get_current(23.03, 72.58)
+            await asyncio.sleep(0.1)
+            await client.get_current(23.03, 72.58)
+            assert (await calls())["weather"] == 2
+    asyncio.run(run())
@@ -0,0 +1,82 @@
+"""
+Fake Weather Server
+Local stand-in for the OpenWeather API, serving deterministic /weather and
+/forecast payloads derived from lat/lon and counting upstream calls, so the
+weather cache and coalescing can be exercised without an API key.
+
+Usage:
+    python tools/fake_weather_server.py --port 8081 --latency 0.2
+    OPENWEATHER_BASE_URL=http://localhost:8081/data/2.5 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import math
+import time
+from collections import Counter
+
+from aiohttp import web
+
+def conditions(lat: float, lon: float, offset_hours: float = 0) -> dict:
+    """Smooth, repeatable weather for a location and time offset"""
+    phase = (lat * 7 + lon * 3) % 24
+    hour = (time.time() / 3600 + offset_hours + phase) % 24
+    diurnal = math.sin((hour - 9) / 24 * 2 * math.pi)
+    temperature = 28 - abs(lat - 23) * 0.4 + 6 * diurnal
+    humidity = max(15, min(95, 60 - 20 * diurnal))
+    return {
+        "main": {
+            "temp": round(temperature, 1),
+            "temp_min": round(temperature - 3, 1),
+            "temp_max": round(temperature + 3, 1),
+            "humidity": round(humidity),
+            "pressure": 1008
+        },
+        "wind": {"speed": round(2 + abs(diurnal) * 3, 1)},
+        "clouds": {"all": round(40 + 30 * math.cos(phase))},
+        "weather": [{"main": "Clouds", "description": "scattered clouds"}],
+        "rain": {"1h": 0.8} if (int(phase) % 5 == 0 and diurnal < 0) else {}
+    }
+
+def create_app(latency: float) -> web.Application:
+    calls = Counter()
+
+    async def weather(request: web.Request):
+        calls["weather"] += 1
+        await asyncio.sleep(latency)
+        lat, lon = float(request.query["lat"]), float(request.query["lon"])
+        return web.json_response({"coord": {"lat": lat, "lon": lon}, **conditions(lat, lon)})
+
+    async def forecast(request: web.Request):
+        calls["forecast"] += 1
+        await asyncio.sleep(latency)
+        lat, lon = float(request.query["lat"]), float(request.query["lon"])
+        start = int(time.time()) // 10800 * 10800
+        entries = []
+        for step in range(40):  # 5 days of 3-hourly steps
+            entry = conditions(lat, lon, step * 3)
+            entry["dt"] = start + step * 10800
+            if entry["rain"]:
+                entry["rain"] = {"3h": entry["rain"]["1h"] * 3}
+            entries.append(entry)
+        return web.json_response({"city": {"coord": {"lat": lat, "lon": lon}}, "list": entries})
+
+    async def stats(request: web.Request):
+        return web.json_response(dict(calls))
+
+    app = web.Application()
+    app.router.add_get("/data/2.5/weather", weather)
+    app.router.add_get("/data/2.5/forecast", forecast)
+    app.router.add_get("/stats", stats)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenWeather server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.1, help="Artificial response delay in seconds")
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Pump Fleet Simulator
+Spins up a fleet of virtual pumps and drives the pump control and telemetry
+endpoints from a single asyncio process, then reports throughput and latency.
+
+Usage:
+    python tools/pump_simulator.py --pumps 2000 --rate 400 --duration 60
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import aiohttp
+
+NOMINAL_VOLTAGE = 415.0
+AMBIENT_TEMPERATURE = 28.0
+THERMAL_TIME_CONSTANT = 300.0  # seconds
+VOLTAGE_TIME_CONSTANT = 5.0  # seconds
+FLOW_TIME_CONSTANT = 10.0  # seconds
+
+FAULT_VOLTAGE_DROP = "voltage_drop"
+FAULT_OVERHEATING = "overheating"
+
+def _relax(value: float, target: float, dt: float, time_constant: float) -> float:
+    """First-order approach of value towards target over dt seconds"""
+    return target + (value - target) * math.exp(-dt / time_constant)
+
+class VirtualPump:
+    """
+    Physical model of a single pump. State is advanced lazily, only when a
+    reading is requested, so thousands of pumps cost nothing while idle.
+    """
+
+    def __init__(self, pump_id: int, power_rating: float, max_flow_rate: float, rng: random.Random):
+        self.pump_id = pump_id
+        self.power_rating = power_rating
+        self.max_flow_rate = max_flow_rate
+        self.rated_current = power_rating * 1.7
+        self.rng = rng
+
+        self.running = False
+        self.voltage = 0.0
+        self.current = 0.0
+        self.temperature = AMBIENT_TEMPERATURE
+        self.flow_rate = 0.0
+        self.fault: Optional[str] = None
+        self.fault_remaining = 0.0
+        self.last_step = time.monotonic()
+
+    def step(self, now: float, fault_rate: float):
+        """Advance the pump dynamics to monotonic time now"""
+        dt = max(0.0, now - self.last_step)
+        self.last_step = now
+        if dt == 0:
+            return
+
+        # Fault onset follows a Poisson process, faults clear after their duration
+        if self.fault:
+            self.fault_remaining -= dt
+            if self.fault_remaining <= 0:
+                self.fault = None
+        elif self.running and self.rng.random() < 1 - math.exp(-fault_rate * dt):
+            self.fault = self.rng.choice([FAULT_VOLTAGE_DROP, FAULT_OVERHEATING])
+            self.fault_remaining = self.rng.uniform(30, 300)
+
+        if not self.running:
+            self.voltage = 0.0
+            self.current = 0.0
+            self.flow_rate = _relax(self.flow_rate, 0.0, dt, FLOW_TIME_CONSTANT)
+            self.temperature = _relax(self.temperature, AMBIENT_TEMPERATURE, dt, THERMAL_TIME_CONSTANT)
+            return
+
+        # Supply voltage wanders around nominal and sags during a voltage drop
+        target_voltage = NOMINAL_VOLTAGE
+        if self.fault == FAULT_VOLTAGE_DROP:
+            target_voltage *= self.rng.uniform(0.78, 0.9)
+        if self.voltage == 0:
+            self.voltage = target_voltage
+        self.voltage = _relax(self.voltage, target_voltage, dt, VOLTAGE_TIME_CONSTANT)
+        self.voltage += self.rng.gauss(0, 2.0) * math.sqrt(min(dt, 1.0))
+
+        # Constant-power load draws more current when the supply sags
+        load = 1.15 if self.fault == FAULT_OVERHEATING else 1.0
+        self.current = self.rated_current * load * NOMINAL_VOLTAGE / max(self.voltage, 1.0)
+        self.current *= 1 + self.rng.gauss(0, 0.01)
+
+        # Copper losses heat the motor with I^2, overheating adds a cooling failure
+        loading = (self.current / self.rated_current) ** 2
+        target_temperature = AMBIENT_TEMPERATURE + 20 * loading
+        if self.fault == FAULT_OVERHEATING:
+            target_temperature += 30
+        self.temperature = _relax(self.temperature, target_temperature, dt, THERMAL_TIME_CONSTANT)
+
+        # Pump affinity: flow tracks motor speed, which drops with voltage
+        speed = min(1.0, self.voltage / NOMINAL_VOLTAGE)
+        target_flow = self.max_flow_rate * 0.85 * speed ** 2
+        self.flow_rate = _relax(self.flow_rate, target_flow, dt, FLOW_TIME_CONSTANT)
+
+    def reading(self) -> dict:
+        """Telemetry payload in the shape accepted by /api/pumps/telemetry"""
+        return {
+            "pump_id": self.pump_id,
+            "voltage": round(max(self.voltage, 0.0), 1),
+            "current": round(max(self.current, 0.0), 2),
+            "temperature": round(self.temperature, 1),
+            "flow_rate": round(max(self.flow_rate, 0.0), 1),
+            "timestamp": datetime.now().isoformat()
+        }
+
+class LoadStats:
+    """Latency samples and status counts per request kind"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.readings_sent = 0
+
+    def record(self, kind: str, latency: float, status: str):
+        self.latencies.setdefault(kind, []).append(latency)
+        counts = self.statuses.setdefault(kind, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        total = sum(len(v) for v in self.latencies.values())
+        report = {
+            "elapsed_seconds": round(elapsed, 2),
+            "total_requests": total,
+            "throughput_rps": round(total / elapsed, 1) if elapsed > 0 else 0,
+            "readings_per_second": round(self.readings_sent / elapsed, 1) if elapsed > 0 else 0,
+            "requests": {}
+        }
+        for kind, samples in self.latencies.items():
+            samples = sorted(samples)
+            report["requests"][kind] = {
+                "count": len(samples),
+                "statuses": self.statuses.get(kind, {}),
+                "p50_ms": percentile(samples, 50),
+                "p90_ms": percentile(samples, 90),
+                "p95_ms": percentile(samples, 95),
+                "p99_ms": percentile(samples, 99),
+                "max_ms": round(samples[-1] * 1000, 2) if samples else 0
+            }
+        return report
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile in milliseconds"""
+    if not sorted_samples:
+        return 0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_samples)))
+    return round(sorted_samples[rank - 1] * 1000, 2)
+
+class FleetSimulator:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.base_url = args.base_url.rstrip("/")
+        self.rng = random.Random(args.seed)
+        self.pumps: List[VirtualPump] = []
+        self.stats = LoadStats()
+        self.cursor = 0
+
+    async def register_pumps(self, session: aiohttp.ClientSession):
+        """Create the virtual fleet through /api/pumps/add"""
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def add(index: int):
+            power_rating = self.rng.choice([3.0, 4.0, 5.0, 5.5, 6.0, 7.5])
+            payload = {
+                "name": f"Sim-{index:05d}",
+                "location": f"Simulated Field {index // 50:03d}",
+                "power_rating": power_rating,
+                "max_flow_rate": round(power_rating * 33, 1),
+                "manufacturer": "Simulator",
+                "installation_date": datetime.now().date().isoformat(),
+                "notes": "Created by pump_simulator"
+            }
+            async with semaphore:
+                async with session.post(f"{self.base_url}/api/pumps/add", json=payload) as response:
+                    if response.status != 201:
+                        raise RuntimeError(f"Failed to register pump: HTTP {response.status}")
+                    pump = await response.json()
+            return VirtualPump(pump["id"], power_rating, payload["max_flow_rate"], random.Random(self.rng.random()))
+
+        self.pumps = await asyncio.gather(*(add(i) for i in range(self.args.pumps)))
+
+    async def start_initial(self, session: aiohttp.ClientSession):
+        """Start a share of the fleet so telemetry covers both running and idle pumps"""
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def start(pump: VirtualPump):
+            async with semaphore:
+                async with session.post(
+                    f"{self.base_url}/api/pumps/control",
+                    json={"pump_id": pump.pump_id, "action": "start"}
+                ) as response:
+                    pump.running = response.status == 200
+
+        selected = [p for p in self.pumps if self.rng.random() < self.args.initial_running]
+        await asyncio.gather(*(start(p) for p in selected))
+
+    def next_batch(self) -> List[VirtualPump]:
+        """Round-robin slice of the fleet for the next telemetry post"""
+        batch = []
+        for _ in range(min(self.args.batch_size, len(self.pumps))):
+            batch.append(self.pumps[self.cursor])
+            self.cursor = (self.cursor + 1) % len(self.pumps)
+        return batch
+
+    async def send_telemetry(self, session: aiohttp.ClientSession):
+        now = time.monotonic()
+        batch = self.next_batch()
+        for pump in batch:
+            pump.step(now, self.args.fault_rate)
+        payload = [pump.reading() for pump in batch]
+
+        started = time.perf_counter()
+        try:
+            async with session.post(f"{self.base_url}/api/pumps/telemetry", json=payload) as response:
+                await response.read()
+                status = str(response.status)
+        except aiohttp.ClientError as e:
+            status = type(e).__name__
+        self.stats.record("telemetry", time.perf_counter() - started, status)
+        self.stats.readings_sent += len(payload)
+
+    async def send_control(self, session: aiohttp.ClientSession):
+        pump = self.rng.choice(self.pumps)
+        action = "stop" if pump.running else "start"
+
+        started = time.perf_counter()
+        try:
+            async with session.post(
+                f"{self.base_url}/api/pumps/control",
+                json={"pump_id": pump.pump_id, "action": action}
+            ) as response:
+                await response.read()
+                status = str(response.status)
+        except aiohttp.ClientError as e:
+            status = type(e).__name__
+        self.stats.record(f"control_{action}", time.perf_counter() - started, status)
+
+        if status == "200":
+            pump.step(time.monotonic(), self.args.fault_rate)
+            pump.running = action == "start"
+
+    async def worker(self, session: aiohttp.ClientSession, queue: asyncio.Queue):
+        while True:
+            kind = await queue.get()
+            try:
+                if kind == "control":
+                    await self.send_control(session)
+                else:
+                    await self.send_telemetry(session)
+            finally:
+                queue.task_done()
+
+    async def produce(self, queue: asyncio.Queue, deadline: float):
+        """Enqueue requests at the configured rate, dropping ticks the workers can't absorb"""
+        interval = 1.0 / self.args.rate
+        next_at = time.monotonic()
+        dropped = 0
+        while next_at < deadline:
+            kind = "control" if self.rng.random() < self.args.control_ratio else "telemetry"
+            if queue.full():
+                dropped += 1
+            else:
+                queue.put_nowait(kind)
+            next_at += interval
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        return dropped
+
+    async def run(self) -> dict:
+        connector = aiohttp.TCPConnector(limit=self.args.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.args.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await self.register_pumps(session)
+
+            await self.start_initial(session)
+
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.args.concurrency * 2)
+            workers = [asyncio.create_task(self.worker(session, queue)) for _ in range(self.args.concurrency)]
+
+            started = time.monotonic()
+            dropped = await self.produce(queue, started + self.args.duration)
+            await queue.join()
+            elapsed = time.monotonic() - started
+
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        report = self.stats.summary(elapsed)
+        report["pumps"] = len(self.pumps)
+        report["target_rps"] = self.args.rate
+        report["dropped_ticks"] = dropped
+        report["faulted_pumps"] = sum(1 for p in self.pumps if p.fault)
+        return report
+
+def print_report(report: dict):
+    print(f"Pumps simulated:    {report['pumps']}")
+    print(f"Elapsed:            {report['elapsed_seconds']} s")
+    print(f"Requests:           {report['total_requests']} ({report['throughput_rps']} req/s, target {report['target_rps']})")
+    print(f"Telemetry readings: {report['readings_per_second']} /s")
+    print(f"Dropped ticks:      {report['dropped_ticks']}")
+    print(f"Pumps in fault:     {report['faulted_pumps']}")
+    print()
+    print(f"{'request':<16}{'count':>8}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}  statuses")
+    for kind, row in sorted(report["requests"].items()):
+        print(
+            f"{kind:<16}{row['count']:>8}{row['p50_ms']:>10}{row['p90_ms']:>10}"
+            f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}  {row['statuses']}"
+        )
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Virtual pump fleet load generator")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--pumps", type=int, default=1000, help="Number of virtual pumps")
+    parser.add_argument("--rate", type=float, default=200, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Load phase duration in seconds")
+    parser.add_argument("--batch-size", type=int, default=50, help="Readings per telemetry request")
+    parser.add_argument("--control-ratio", type=float, default=0.1, help="Share of requests that are control commands")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum in-flight requests")
+    parser.add_argument("--fault-rate", type=float, default=0.001, help="Faults per running pump per second")
+    parser.add_argument("--initial-running", type=float, default=0.5, help="Share of pumps started before the run")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    report = asyncio.run(FleetSimulator(args).run())
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()